@@ -4,10 +4,12 @@ Build script to create a standalone executable for the ai-tools package.
 This script uses PyInstaller to package the application into a single binary.
 
 Usage:
-    python build_binary.py [--platform=<platform>]
+    python build_binary.py [--platform=<platform>] [--clean]
     
     --platform: Optional argument to specify target platform (linux, win, macos)
                 If not specified, builds for the current platform
+    --clean:    Remove the PyInstaller work directory before building instead of
+                reusing its analysis cache
 
 Dependencies:
     PyInstaller must be installed: pip install pyinstaller
@@ -20,13 +22,59 @@ import subprocess
 import argparse
 from pathlib import Path
 
+# Modules that optional imports in the dependency tree pull into the analysis
+# but that aitools never uses at runtime; excluding them shortens analysis
+EXCLUDED_MODULES = [
+    "tkinter",
+    "matplotlib",
+    "IPython",
+    "notebook",
+    "pytest",
+]
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="Build standalone binary for ai-tools.")
     parser.add_argument('--platform', choices=['linux', 'win', 'macos'],
                       help='Target platform (linux, win, macos). Defaults to current platform.')
+    parser.add_argument('--clean', action='store_true',
+                      help='Discard the cached PyInstaller work directory before building.')
     return parser.parse_args()
 
+def get_pyinstaller_version(launcher):
+    """Return the (major, minor) version of the PyInstaller run by launcher, or None."""
+    try:
+        result = subprocess.run([*launcher, "--version"], capture_output=True, text=True)
+    except OSError:
+        return None
+    try:
+        major, minor = result.stdout.strip().split(".")[:2]
+        return int(major), int(minor)
+    except ValueError:
+        return None
+
+def remove_tree(path):
+    """Remove a directory tree, preferring the platform's native tool.
+    
+    rm -rf / rd /s /q delete large PyInstaller trees much faster than
+    shutil.rmtree; shutil is only used when the native tool is unavailable.
+    """
+    if sys.platform.startswith('win'):
+        native_cmd = ["cmd", "/c", "rd", "/s", "/q", str(path)]
+    elif shutil.which("rm"):
+        native_cmd = ["rm", "-rf", str(path)]
+    else:
+        native_cmd = None
+    
+    if native_cmd:
+        try:
+            subprocess.check_call(native_cmd)
+            if not path.exists():
+                return
+        except (OSError, subprocess.CalledProcessError):
+            pass
+    shutil.rmtree(path)
+
 def build_binary():
     """Build the aitools binary package."""
     # Parse command-line arguments
@@ -49,13 +97,24 @@ def build_binary():
     print(f"Building binary for {target_platform} platform")
     
     print("Checking for PyInstaller...")
-    try:
-        import PyInstaller
-        print(f"PyInstaller {PyInstaller.__version__} found.")
-    except ImportError:
-        print("PyInstaller not found. Installing...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
-        print("PyInstaller installed successfully.")
+    # The build runs PyInstaller as a subprocess, so there is no need to import
+    # it into this process just to confirm it is installed
+    pyinstaller_launcher = [sys.executable, "-m", "PyInstaller"]
+    if shutil.which("pyinstaller"):
+        pyinstaller_launcher = ["pyinstaller"]
+        print("PyInstaller found.")
+    else:
+        probe = subprocess.run(
+            [sys.executable, "-c", "import PyInstaller; print(PyInstaller.__version__)"],
+            capture_output=True,
+            text=True,
+        )
+        if probe.returncode == 0:
+            print(f"PyInstaller {probe.stdout.strip()} found.")
+        else:
+            print("PyInstaller not found. Installing...")
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
+            print("PyInstaller installed successfully.")
     
     # Directory setup
     root_dir = Path(__file__).parent.absolute()
@@ -65,11 +124,13 @@ def build_binary():
     # Clean previous builds if they exist
     if dist_dir.exists():
         print(f"Cleaning previous distribution in {dist_dir}")
-        shutil.rmtree(dist_dir)
+        remove_tree(dist_dir)
     
-    if build_dir.exists():
+    # The work directory holds PyInstaller's analysis cache; keep it between
+    # builds so unchanged dependencies are not re-analyzed
+    if args.clean and build_dir.exists():
         print(f"Cleaning previous build in {build_dir}")
-        shutil.rmtree(build_dir)
+        remove_tree(build_dir)
     
     # Define the PyInstaller command
     main_script = root_dir / "src" / "ai_tools" / "__main__.py"
@@ -83,12 +144,17 @@ def build_binary():
     
     # Build the PyInstaller command
     pyinstaller_cmd = [
-        "pyinstaller",
+        *pyinstaller_launcher,
         "--name=aitools",
         "--onefile",  # Create a single executable file
+        "--noconfirm",  # Overwrite previous output without prompting
+        "--workpath", str(build_dir),
+        "--distpath", str(dist_dir),
         "--hidden-import=gtts",  # Add hidden dependencies
         "--hidden-import=sentence_transformers",
     ]
+    for module in EXCLUDED_MODULES:
+        pyinstaller_cmd.append(f"--exclude-module={module}")
     
     # Add data files with correct path separator for target platform
     if target_platform == 'win':
@@ -103,14 +169,26 @@ def build_binary():
             "--add-data", f"{bash_script}{path_sep}ai_tools/shell/",
         ])
     
+    # Bundle optimized bytecode (asserts and docstrings removed). PyInstaller
+    # 6.6 added --optimize for this; older releases compile the bundled modules
+    # at the optimization level of the interpreter running them, so run that
+    # interpreter under -OO through PYTHONOPTIMIZE instead.
+    build_env = None
+    if (get_pyinstaller_version(pyinstaller_launcher) or (0, 0)) >= (6, 6):
+        pyinstaller_cmd.append("--optimize=2")
+    else:
+        build_env = {**os.environ, "PYTHONOPTIMIZE": "2"}
+    
     # Add main script and platform-specific options
     pyinstaller_cmd.append(str(main_script))
     
     if target_platform == 'win':
         pyinstaller_cmd.append("--console")  # Windows: console mode
+    else:
+        pyinstaller_cmd.append("--strip")  # Strip symbols from bundled shared libraries
     
     print(f"Building binary with command: {' '.join(pyinstaller_cmd)}")
-    subprocess.check_call(pyinstaller_cmd)
+    subprocess.check_call(pyinstaller_cmd, env=build_env)
     
     # Create platform-specific installer and prepare files
     if target_platform == 'win':
@@ -3,7 +3,12 @@
 Main entry point for the ai-tools package when run as a module.
 This allows users to run the package directly with: python -m ai_tools
 """
+import multiprocessing
+
 from ai_tools.main import main
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # The frozen binary is also the executable of the document loader's worker
+    # processes; this makes those run their task rather than the CLI
+    multiprocessing.freeze_support()
+    main()
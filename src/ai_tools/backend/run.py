@@ -2,9 +2,19 @@
 Command execution utility module.
 Provides functionality to run shell commands and capture their output.
 """
+import asyncio
+import os
+import re
+import shlex
+import shutil
+import signal
 import subprocess
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
+
+# Characters that need a shell: pipes, redirection, lists, expansion, globbing,
+# grouping, comments and escapes
+_SHELL_META_RE = re.compile(r'[|&;<>$`(){}*?\[\]~#\\\n]')
 
 
 @dataclass
@@ -15,10 +25,35 @@ class CommandResult:
     exit_code: int
 
 
+def split_simple_command(command: str) -> Optional[List[str]]:
+    """
+    Split a command that can run without a shell into its argv.
+    
+    Args:
+        command: The shell command line
+        
+    Returns:
+        The argv list, or None if the command uses shell syntax or doesn't
+        name an executable on PATH
+    """
+    if _SHELL_META_RE.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    # Variable assignments and builtins such as cd still need the shell
+    if argv and '=' not in argv[0] and shutil.which(argv[0]):
+        return argv
+    return None
+
+
 def run_command(command: str, timeout: int = 10) -> CommandResult:
     """
     Execute a shell command and return its output.
     
+    Simple commands are executed directly, without starting /bin/sh.
+    
     Args:
         command: The shell command to execute
         timeout: Maximum time to wait for the command to complete (seconds)
@@ -30,10 +65,11 @@ def run_command(command: str, timeout: int = 10) -> CommandResult:
         TimeoutError: If the command execution times out
         RuntimeError: If another exception occurs during execution
     """
+    argv = split_simple_command(command)
     try:
         result = subprocess.run(
-            command,
-            shell=True,
+            command if argv is None else argv,
+            shell=argv is None,
             capture_output=True,
             text=True,
             timeout=timeout,
@@ -48,3 +84,55 @@ def run_command(command: str, timeout: int = 10) -> CommandResult:
         raise TimeoutError(f"Command timed out after {timeout} seconds: {command}")
     except Exception as exc:
         raise RuntimeError(f"Error executing command: {str(exc)}")
+
+
+async def run_command_async(command: str, timeout: int = 10) -> CommandResult:
+    """
+    Execute a shell command without blocking the event loop.
+    
+    Async counterpart of run_command for callers running under asyncio, so
+    many commands can be awaited concurrently without a thread per command.
+    
+    Args:
+        command: The shell command to execute
+        timeout: Maximum time to wait for the command to complete (seconds)
+        
+    Returns:
+        CommandResult object containing stdout, stderr and exit code
+        
+    Raises:
+        TimeoutError: If the command execution times out
+        RuntimeError: If another exception occurs during execution
+    """
+    argv = split_simple_command(command)
+    pipes = dict(
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        # Own process group, so a timeout also stops the shell's children
+        start_new_session=(os.name == "posix")
+    )
+    try:
+        if argv is None:
+            process = await asyncio.create_subprocess_shell(command, **pipes)
+        else:
+            process = await asyncio.create_subprocess_exec(*argv, **pipes)
+    except Exception as exc:
+        raise RuntimeError(f"Error executing command: {str(exc)}")
+    
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        await process.wait()
+        raise TimeoutError(f"Command timed out after {timeout} seconds: {command}")
+    except Exception as exc:
+        raise RuntimeError(f"Error executing command: {str(exc)}")
+    
+    return CommandResult(
+        stdout=stdout.decode(errors="replace"),
+        stderr=stderr.decode(errors="replace"),
+        exit_code=process.returncode
+    )
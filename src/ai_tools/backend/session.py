@@ -0,0 +1,88 @@
+"""
+Shared HTTP session for requests to the Ollama server.
+Reusing one session keeps connections pooled across calls instead of
+opening a new socket for every request.
+"""
+import os
+import asyncio
+import logging
+import weakref
+import importlib.util
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connection pool settings; the pool size covers concurrent embedding requests
+OLLAMA_POOL_CONNECTIONS = 4
+OLLAMA_POOL_MAXSIZE = 16
+OLLAMA_MAX_RETRIES = 2
+# Seconds the async client waits to connect and for each read of a response,
+# so a stream may take longer overall as long as it keeps producing text
+OLLAMA_ASYNC_TIMEOUT = 10
+
+OLLAMA_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=OLLAMA_POOL_CONNECTIONS,
+    pool_maxsize=OLLAMA_POOL_MAXSIZE,
+    max_retries=Retry(total=OLLAMA_MAX_RETRIES, backoff_factor=0.1),
+)
+OLLAMA_SESSION.mount('http://', _adapter)
+OLLAMA_SESSION.mount('https://', _adapter)
+
+# Async clients are bound to the event loop they were created on
+_ASYNC_CLIENTS = weakref.WeakKeyDictionary()
+
+logger = logging.getLogger(__name__)
+
+
+def _use_http2() -> bool:
+    """ Whether OLLAMA_HTTP2 asks for HTTP/2 and the optional h2 package is installed """
+    if os.getenv('OLLAMA_HTTP2', 'false').lower() != 'true':
+        return False
+    if importlib.util.find_spec('h2') is None:
+        logger.warning("OLLAMA_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def get_async_ollama_client():
+    """ Get the pooled httpx.AsyncClient of the running event loop
+    
+    Requests made on the same loop, such as concurrent prompts, share its
+    connections. Run the coroutine with run_async so the client is closed.
+    
+    With OLLAMA_HTTP2=true the client speaks HTTP/2 with prior knowledge, so
+    concurrent requests are multiplexed over a single connection. Ollama
+    itself only serves HTTP/1.1; this is for an h2c-capable proxy in front.
+    """
+    import httpx
+    
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        http2 = _use_http2()
+        client = httpx.AsyncClient(
+            http1=not http2,
+            http2=http2,
+            timeout=OLLAMA_ASYNC_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=OLLAMA_POOL_MAXSIZE,
+                max_keepalive_connections=OLLAMA_POOL_CONNECTIONS,
+            ),
+        )
+        _ASYNC_CLIENTS[loop] = client
+    return client
+
+
+def run_async(coro):
+    """ Run a coroutine with asyncio.run, closing the loop's async client afterwards """
+    async def run():
+        try:
+            return await coro
+        finally:
+            client = _ASYNC_CLIENTS.pop(asyncio.get_running_loop(), None)
+            if client is not None:
+                await client.aclose()
+    
+    return asyncio.run(run())
@@ -1,5 +1,8 @@
 import os
 import json
+import time
+import atexit
+import weakref
 import datetime
 from typing import List, Dict, Tuple, Optional, Any, Union, Collection, cast
 from pathlib import Path
@@ -7,15 +10,57 @@ from pathlib import Path
 # Import the unified database configuration
 from ai_tools.config.database import db_config
 
+# History files are written as compact JSON, through orjson when it's installed
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+    _loads = json.loads
+
 # Use unified database configuration
 CHAT_HISTORY_PATH = db_config.history_db_path
 EXTERNAL_HISTORY_DB_ENABLED = db_config.history_db_enabled
 
+# Messages are appended one JSON object per line; sessions written before
+# that used a single JSON array, which is converted on load
+HISTORY_FILE = "history.jsonl"
+LEGACY_HISTORY_FILE = "history.json"
+
+# metadata.json is rewritten after this many messages, and when the session
+# changes or the manager is closed, rather than after every message
+METADATA_FLUSH_INTERVAL = 20
+
+# Timestamps have one-second resolution, so messages added within the same
+# second share one formatted string: (epoch second, ISO string)
+_LAST_TIMESTAMP: Tuple[int, str] = (0, "")
+
 # Determine if we're using the external DB
 def using_external_db():
     return EXTERNAL_HISTORY_DB_ENABLED
 
 
+def _now_iso() -> str:
+    """ Current local time as an ISO 8601 string, formatted at most once per second """
+    global _LAST_TIMESTAMP
+    now = int(time.time())
+    if now != _LAST_TIMESTAMP[0]:
+        _LAST_TIMESTAMP = (now, datetime.datetime.fromtimestamp(now).isoformat())
+    return _LAST_TIMESTAMP[1]
+
+
+def _close_at_exit(manager_ref: "weakref.ReferenceType[ChatHistoryManager]") -> None:
+    manager = manager_ref()
+    if manager is not None:
+        manager.close()
+
+
 class ChatHistoryManager:
     """
     Manages storage and retrieval of chat history
@@ -38,6 +83,11 @@ class ChatHistoryManager:
         self.current_history: List[Dict[str, Union[str, Dict[str, Any]]]] = []
         self.session_id: Optional[str] = None
         
+        # Metadata of the current local session, written back by _flush_metadata
+        self._metadata: Dict[str, Any] = {}
+        self._metadata_dirty = False
+        atexit.register(_close_at_exit, weakref.ref(self))
+        
         # Set up external DB connection if enabled
         if using_external_db():
             # Get database configuration from the unified config
@@ -55,13 +105,14 @@ class ChatHistoryManager:
         Returns:
             The session ID
         """
+        self._flush_metadata()
         self.current_history = []
         self.session_id = session_id or f"session_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         # Save initial session metadata
         metadata = {
             "id": self.session_id,
-            "created_at": datetime.datetime.now().isoformat(),
+            "created_at": _now_iso(),
             "message_count": 0
         }
         
@@ -73,8 +124,9 @@ class ChatHistoryManager:
             session_dir = os.path.join(self.history_dir, self.session_id)
             os.makedirs(session_dir, exist_ok=True)
             
-            with open(os.path.join(session_dir, "metadata.json"), "w") as f:
-                json.dump(metadata, f, indent=2)
+            self._metadata = metadata
+            self._metadata_dirty = True
+            self._flush_metadata()
         
         return self.session_id
     
@@ -95,7 +147,7 @@ class ChatHistoryManager:
         
         message = {
             "id": f"msg_{len(self.current_history)}",
-            "timestamp": datetime.datetime.now().isoformat(),
+            "timestamp": _now_iso(),
             "role": role,
             "content": content,
             "context": context or {}
@@ -104,7 +156,7 @@ class ChatHistoryManager:
         self.current_history.append(message)
         
         # Save the message to storage
-        self._save_current_history()
+        self._save_message(message)
         
         return len(self.current_history) - 1
     
@@ -161,6 +213,7 @@ class ChatHistoryManager:
             return self._load_session_external(session_id)
         
         # Using local file storage
+        self._flush_metadata()
         session_dir = os.path.join(self.history_dir, session_id)
         
         if not os.path.exists(session_dir):
@@ -168,15 +221,21 @@ class ChatHistoryManager:
             return False
         
         try:
-            history_file = os.path.join(session_dir, "history.json")
+            history_file = os.path.join(session_dir, HISTORY_FILE)
+            legacy_file = os.path.join(session_dir, LEGACY_HISTORY_FILE)
             if os.path.exists(history_file):
                 with open(history_file, "r") as f:
-                    self.current_history = json.load(f)
-                self.session_id = session_id
-                return True
+                    self.current_history = [_loads(line) for line in f if line.strip()]
+            elif os.path.exists(legacy_file):
+                with open(legacy_file, "r") as f:
+                    self.current_history = _loads(f.read())
+                self._convert_legacy_history(session_dir)
             else:
                 print(f"History file not found for session {session_id}")
                 return False
+            self.session_id = session_id
+            self._metadata = self._read_metadata(session_dir)
+            return True
         except Exception as e:
             print(f"Error loading session {session_id}: {str(e)}")
             return False
@@ -192,28 +251,44 @@ class ChatHistoryManager:
         if using_external_db():
             return self._list_sessions_external()
         
-        # Using local file storage
+        # Using local file storage, with the current session's metadata up to date
+        self._flush_metadata()
         sessions = []
         
-        for session_id in os.listdir(self.history_dir):
-            session_dir = os.path.join(self.history_dir, session_id)
-            if os.path.isdir(session_dir):
-                metadata_file = os.path.join(session_dir, "metadata.json")
-                if os.path.exists(metadata_file):
-                    try:
-                        with open(metadata_file, "r") as f:
-                            metadata = json.load(f)
-                        sessions.append(metadata)
-                    except Exception as e:
-                        print(f"Error loading metadata for session {session_id}: {str(e)}")
+        # scandir reports directory entries without a stat call per session, and
+        # a missing metadata file is detected by the open itself
+        with os.scandir(self.history_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                try:
+                    with open(os.path.join(entry.path, "metadata.json"), "rb") as f:
+                        sessions.append(_loads(f.read()))
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    print(f"Error loading metadata for session {entry.name}: {str(e)}")
         
         # Sort by creation date, newest first
         sessions.sort(key=lambda x: x.get("created_at", ""), reverse=True)
         return sessions
     
-    def _save_current_history(self) -> None:
+    def _convert_legacy_history(self, session_dir: str) -> None:
+        """
+        Rewrite a session's history.json as history.jsonl so new messages can be appended
+        """
+        history_file = os.path.join(session_dir, HISTORY_FILE)
+        with open(history_file + ".tmp", "w") as f:
+            f.writelines(_dumps(message) + "\n" for message in self.current_history)
+        os.replace(history_file + ".tmp", history_file)
+        os.remove(os.path.join(session_dir, LEGACY_HISTORY_FILE))
+    
+    def _save_message(self, message: Dict[str, Any]) -> None:
         """
-        Save the current history to storage
+        Save a newly added message to storage
+        
+        Locally the message is appended as one line, so each save writes only
+        the new message rather than the whole history.
         """
         if not self.session_id:
             return
@@ -227,24 +302,50 @@ class ChatHistoryManager:
         session_dir = os.path.join(self.history_dir, self.session_id)
         os.makedirs(session_dir, exist_ok=True)
         
-        # Save history
-        with open(os.path.join(session_dir, "history.json"), "w") as f:
-            json.dump(self.current_history, f, indent=2)
-        
-        # Update metadata
-        metadata_file = os.path.join(session_dir, "metadata.json")
-        if os.path.exists(metadata_file):
-            try:
-                with open(metadata_file, "r") as f:
-                    metadata = json.load(f)
-                
-                metadata["message_count"] = len(self.current_history)
-                metadata["last_updated"] = datetime.datetime.now().isoformat()
-                
-                with open(metadata_file, "w") as f:
-                    json.dump(metadata, f, indent=2)
-            except Exception as e:
-                print(f"Error updating metadata: {str(e)}")
+        # Append the message
+        with open(os.path.join(session_dir, HISTORY_FILE), "a") as f:
+            f.write(_dumps(message) + "\n")
+        
+        # Update metadata in memory; it is written out periodically
+        if self._metadata:
+            self._metadata["message_count"] = len(self.current_history)
+            self._metadata["last_updated"] = message["timestamp"]
+            self._metadata_dirty = True
+            if len(self.current_history) % METADATA_FLUSH_INTERVAL == 0:
+                self._flush_metadata()
+    
+    def _read_metadata(self, session_dir: str) -> Dict[str, Any]:
+        """
+        Read a session's metadata.json, or return an empty dict if it has none
+        """
+        try:
+            with open(os.path.join(session_dir, "metadata.json"), "rb") as f:
+                return _loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Error loading metadata: {str(e)}")
+            return {}
+    
+    def _flush_metadata(self) -> None:
+        """
+        Write the current session's metadata if it changed since the last write
+        """
+        if not self._metadata_dirty or not self.session_id:
+            return
+        try:
+            session_dir = os.path.join(self.history_dir, self.session_id)
+            with open(os.path.join(session_dir, "metadata.json"), "w") as f:
+                f.write(_dumps(self._metadata))
+            self._metadata_dirty = False
+        except Exception as e:
+            print(f"Error updating metadata: {str(e)}")
+    
+    def close(self) -> None:
+        """
+        Write any pending session metadata; called automatically at exit
+        """
+        self._flush_metadata()
     
     def _save_session_metadata_external(self, metadata: Dict[str, Any]) -> None:
         """
@@ -306,7 +407,7 @@ class ChatHistoryManager:
         self.current_history = [
             {
                 "id": "msg_0",
-                "timestamp": datetime.datetime.now().isoformat(),
+                "timestamp": _now_iso(),
                 "role": "system",
                 "content": "This is a mock message from the external database",
                 "context": {"source": "external_db"}
@@ -333,7 +434,7 @@ class ChatHistoryManager:
         return [
             {
                 "id": "mock_session_1",
-                "created_at": datetime.datetime.now().isoformat(),
+                "created_at": _now_iso(),
                 "message_count": 10,
                 "source": "external_db"
             }
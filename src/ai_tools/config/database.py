@@ -2,7 +2,101 @@
 Unified database configuration for both vector storage and chat history
 """
 import os
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+
+# Package data directory holding the default local databases, resolved once at import
+_DATA_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../data"))
+
+
+def _bool(value: str) -> bool:
+    """Parse a "true"/"false" environment value"""
+    return value.lower() == 'true'
+
+
+def _lower(value: str) -> str:
+    return value.lower()
+
+
+# Settings read directly from the environment: (attribute, variable, default, cast)
+_SPEC = (
+    # Database connection settings (shared unless overridden)
+    ('db_enabled', 'OLLAMA_DB_ENABLED', 'false', _bool),
+    ('db_host', 'OLLAMA_DB_HOST', 'localhost', str),
+    ('db_port', 'OLLAMA_DB_PORT', '5432', int),
+    ('db_user', 'OLLAMA_DB_USER', 'postgres', str),
+    ('db_password', 'OLLAMA_DB_PASSWORD', '', str),
+    ('db_name', 'OLLAMA_DB_NAME', 'ai_tools_db', str),
+    
+    # Local FAISS index type: "auto" picks by collection size, or "flat", "hnsw", "ivfpq", "sq8"
+    ('vector_index_type', 'VECTOR_INDEX_TYPE', 'auto', _lower),
+    # Search-time accuracy/speed trade-off of the approximate indexes: HNSW
+    # candidate list size and IVF lists probed per query
+    ('vector_hnsw_ef_search', 'VECTOR_HNSW_EF_SEARCH', '40', int),
+    ('vector_ivf_nprobe', 'VECTOR_IVF_NPROBE', '8', int),
+    
+    # Table/collection prefixes
+    ('vector_table_prefix', 'VECTOR_TABLE_PREFIX', 'vector_', str),
+    ('history_table_prefix', 'HISTORY_TABLE_PREFIX', 'chat_', str),
+    
+    # Question/answer turns the document retriever keeps as conversation context
+    ('chat_history_turns', 'CHAT_HISTORY_TURNS', '10', int),
+    
+    # LLM settings
+    ('llm_host', 'OLLAMA_HOST', 'localhost', str),
+    ('llm_port', 'OLLAMA_PORT', '11434', int),
+    ('llm_model', 'OLLAMA_MODEL', 'gemma3:27b', str),
+    ('llm_api_key', 'LLM_API_KEY', '', str),
+    
+    # Default embedding model
+    ('default_embedding_model', 'DEFAULT_EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2', str),
+    
+    # Embedding inference backend ("torch", "onnx" or "ollama") and the ONNX weights to use.
+    # The default file is the int8 dynamically quantized export shipped with MiniLM.
+    ('embedding_backend', 'EMBEDDING_BACKEND', 'torch', _lower),
+    ('embedding_onnx_file', 'EMBEDDING_ONNX_FILE', 'onnx/model_qint8_avx512_vnni.onnx', str),
+    
+    # LLM response cache: exact prompt matches, plus near matches at or above
+    # the given cosine similarity when it is non-zero. Responses older than the
+    # TTL in seconds are asked for again; 0 keeps them forever
+    ('prompt_cache_enabled', 'PROMPT_CACHE_ENABLED', 'false', _bool),
+    ('prompt_cache_similarity', 'PROMPT_CACHE_SIMILARITY', '0', float),
+    ('prompt_cache_ttl', 'PROMPT_CACHE_TTL', '0', float),
+    
+    # Keep document chunk embeddings on disk, so re-loading a directory only
+    # embeds the chunks that changed
+    ('embedding_cache_enabled', 'EMBEDDING_CACHE_ENABLED', 'true', _bool),
+    
+    # Load the embedding model, FAISS and compiled kernels in the background at startup
+    ('warmup_enabled', 'AI_TOOLS_WARMUP', 'false', _bool),
+    
+    ('verbose', 'VERBOSE_CONFIG', 'false', _bool),
+)
+
+# Vector and history settings that default to the shared db_* value:
+# (attribute, variable, shared attribute, cast)
+_FALLBACK_SPEC = tuple(
+    (f"{scope}_db_{field}", f"{scope.upper()}_DB_{field.upper()}", f"db_{field}", cast)
+    for scope in ('vector', 'history')
+    for field, cast in (
+        ('enabled', _bool),
+        ('host', str),
+        ('port', int),
+        ('user', str),
+        ('password', str),
+        ('name', str),
+    )
+)
+
+
+def _connection_string(config: Mapping[str, Any]) -> str:
+    """Build the connection string for a vector or history database config dict"""
+    if not config["enabled"]:
+        return f"local://{config['local_path']}"
+    
+    password_part = f":{config['password']}" if config["password"] else ""
+    return f"postgresql://{config['user']}{password_part}@{config['host']}:{config['port']}/{config['dbname']}"
 
 
 class DatabaseConfig:
@@ -28,66 +122,68 @@ class DatabaseConfig:
     
     def _initialize(self):
         """Initialize the database configuration from environment variables"""
-        # Database connection settings (shared unless overridden)
-        self.db_enabled = os.getenv('OLLAMA_DB_ENABLED', 'false').lower() == 'true'
-        self.db_host = os.getenv('OLLAMA_DB_HOST', 'localhost')
-        self.db_port = int(os.getenv('OLLAMA_DB_PORT', '5432'))
-        self.db_user = os.getenv('OLLAMA_DB_USER', 'postgres')
-        self.db_password = os.getenv('OLLAMA_DB_PASSWORD', '')
-        self.db_name = os.getenv('OLLAMA_DB_NAME', 'ai_tools_db')
-        
-        # Vector database specific settings - use OLLAMA_DB variables if specific ones aren't set
-        self.vector_db_enabled = os.getenv('VECTOR_DB_ENABLED', str(self.db_enabled)).lower() == 'true'
-        self.vector_db_host = os.getenv('VECTOR_DB_HOST', self.db_host)
-        self.vector_db_port = int(os.getenv('VECTOR_DB_PORT', str(self.db_port)))
-        self.vector_db_user = os.getenv('VECTOR_DB_USER', self.db_user)
-        self.vector_db_password = os.getenv('VECTOR_DB_PASSWORD', self.db_password)
-        self.vector_db_name = os.getenv('VECTOR_DB_NAME', self.db_name)
-        
-        # Vector database table/collection prefixes
-        self.vector_table_prefix = os.getenv('VECTOR_TABLE_PREFIX', 'vector_')
-        
-        # Local vector DB path
-        self.vector_db_path = os.getenv(
-            'VECTOR_DB_PATH', 
-            os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../data/vector_db")
-        )
+        # Read the environment once and apply the table-driven settings
+        env = os.environ
+        for attr, key, default, cast in _SPEC:
+            setattr(self, attr, cast(env.get(key, default)))
         
-        # Chat history settings - use OLLAMA_DB variables if specific ones aren't set
-        self.history_db_enabled = os.getenv('HISTORY_DB_ENABLED', str(self.db_enabled)).lower() == 'true'
-        self.history_db_host = os.getenv('HISTORY_DB_HOST', self.db_host)
-        self.history_db_port = int(os.getenv('HISTORY_DB_PORT', str(self.db_port)))
-        self.history_db_user = os.getenv('HISTORY_DB_USER', self.db_user)
-        self.history_db_password = os.getenv('HISTORY_DB_PASSWORD', self.db_password)
-        self.history_db_name = os.getenv('HISTORY_DB_NAME', self.db_name)
+        # Vector and history settings fall back to the shared OLLAMA_DB values
+        for attr, key, shared_attr, cast in _FALLBACK_SPEC:
+            value = env.get(key)
+            setattr(self, attr, getattr(self, shared_attr) if value is None else cast(value))
         
-        # Chat history table/collection prefixes
-        self.history_table_prefix = os.getenv('HISTORY_TABLE_PREFIX', 'chat_')
+        # Local vector and history DB paths; the package default is only
+        # resolved when the variable is not set
+        vector_db_path = env.get('VECTOR_DB_PATH')
+        self.vector_db_path = vector_db_path if vector_db_path is not None else os.path.join(_DATA_ROOT, "vector_db")
+        history_db_path = env.get('HISTORY_DB_PATH')
+        self.history_db_path = history_db_path if history_db_path is not None else os.path.join(_DATA_ROOT, "chat_history")
+        prompt_cache_path = env.get('PROMPT_CACHE_PATH')
+        self.prompt_cache_path = prompt_cache_path if prompt_cache_path is not None else os.path.join(_DATA_ROOT, "prompt_cache.sqlite3")
+        embedding_cache_path = env.get('EMBEDDING_CACHE_PATH')
+        self.embedding_cache_path = embedding_cache_path if embedding_cache_path is not None else os.path.join(_DATA_ROOT, "embedding_cache.sqlite3")
         
-        # Local history DB path
-        self.history_db_path = os.getenv(
-            'HISTORY_DB_PATH', 
-            os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../data/chat_history")
-        )
-        
-        # LLM settings
-        self.llm_host = os.getenv('OLLAMA_HOST', 'localhost')
-        self.llm_port = int(os.getenv('OLLAMA_PORT', '11434'))
-        self.llm_model = os.getenv('OLLAMA_MODEL', 'gemma3:27b')
-        self.llm_api_key = os.getenv('LLM_API_KEY', '')
-        
-        # Default embedding model
-        self.default_embedding_model = os.getenv(
-            'DEFAULT_EMBEDDING_MODEL',
-            "sentence-transformers/all-MiniLM-L6-v2"
-        )
+        self._build_derived()
         
         # Don't automatically print config on initialization
         # The log_config method can be called explicitly when needed
-        self.verbose = os.getenv('VERBOSE_CONFIG', 'false').lower() == 'true'
         if self.verbose:
             self._log_config()
     
+    def _build_derived(self):
+        """Build the config dicts and connection strings once; they only change on reinitialization"""
+        # Read-only views, since every caller shares the same instances
+        self._vector_cfg = MappingProxyType({
+            "enabled": self.vector_db_enabled,
+            "host": self.vector_db_host,
+            "port": self.vector_db_port,
+            "user": self.vector_db_user,
+            "password": self.vector_db_password,
+            "dbname": self.vector_db_name,
+            "table_prefix": self.vector_table_prefix,
+            "local_path": self.vector_db_path
+        })
+        self._history_cfg = MappingProxyType({
+            "enabled": self.history_db_enabled,
+            "host": self.history_db_host,
+            "port": self.history_db_port,
+            "user": self.history_db_user,
+            "password": self.history_db_password,
+            "dbname": self.history_db_name,
+            "table_prefix": self.history_table_prefix,
+            "local_path": self.history_db_path
+        })
+        self._llm_cfg = MappingProxyType({
+            "host": self.llm_host,
+            "port": self.llm_port,
+            "model": self.llm_model,
+            "api_key": self.llm_api_key
+        })
+        self._conn_strings = {
+            "vector": _connection_string(self._vector_cfg),
+            "history": _connection_string(self._history_cfg),
+        }
+    
     # Special method to reset the singleton instance (used only in tests)
     @classmethod
     def _reset_instance(cls):
@@ -119,6 +215,8 @@ class DatabaseConfig:
             print(f"Vector table prefix: {self.vector_table_prefix}")
         else:
             print(f"Vector DB Path: {self.vector_db_path}")
+            print(f"Vector index type: {self.vector_index_type}")
+            print(f"Vector search params: efSearch={self.vector_hnsw_ef_search}, nprobe={self.vector_ivf_nprobe}")
             
         # Chat history specific settings
         print(f"History DB: {'Enabled' if self.history_db_enabled else 'Disabled (using local files)'}")
@@ -130,43 +228,22 @@ class DatabaseConfig:
             
         # LLM settings
         print(f"LLM: {self.llm_host}:{self.llm_port} (Model: {self.llm_model})")
-        print(f"Embedding Model: {self.default_embedding_model}")
+        print(f"Embedding Model: {self.default_embedding_model} (backend: {self.embedding_backend})")
+        print(f"Prompt cache: {self.prompt_cache_path if self.prompt_cache_enabled else 'Disabled'}")
+        print(f"Embedding cache: {self.embedding_cache_path if self.embedding_cache_enabled else 'Disabled'}")
         print("=================================")
     
-    def get_vector_db_config(self) -> Dict[str, Any]:
-        """Get vector database configuration as a dictionary"""
-        return {
-            "enabled": self.vector_db_enabled,
-            "host": self.vector_db_host,
-            "port": self.vector_db_port,
-            "user": self.vector_db_user,
-            "password": self.vector_db_password,
-            "dbname": self.vector_db_name,
-            "table_prefix": self.vector_table_prefix,
-            "local_path": self.vector_db_path
-        }
+    def get_vector_db_config(self) -> Mapping[str, Any]:
+        """Get vector database configuration as a read-only mapping"""
+        return self._vector_cfg
     
-    def get_history_db_config(self) -> Dict[str, Any]:
-        """Get history database configuration as a dictionary"""
-        return {
-            "enabled": self.history_db_enabled,
-            "host": self.history_db_host,
-            "port": self.history_db_port,
-            "user": self.history_db_user,
-            "password": self.history_db_password,
-            "dbname": self.history_db_name,
-            "table_prefix": self.history_table_prefix,
-            "local_path": self.history_db_path
-        }
+    def get_history_db_config(self) -> Mapping[str, Any]:
+        """Get history database configuration as a read-only mapping"""
+        return self._history_cfg
     
-    def get_llm_config(self) -> Dict[str, Any]:
-        """Get LLM configuration as a dictionary"""
-        return {
-            "host": self.llm_host,
-            "port": self.llm_port,
-            "model": self.llm_model,
-            "api_key": self.llm_api_key
-        }
+    def get_llm_config(self) -> Mapping[str, Any]:
+        """Get LLM configuration as a read-only mapping"""
+        return self._llm_cfg
     
     def get_vector_table_name(self, db_name: str = "default") -> str:
         """
@@ -202,21 +279,9 @@ class DatabaseConfig:
         Returns:
             Connection string for the database
         """
-        if db_type == "vector":
-            if not self.vector_db_enabled:
-                return f"local://{self.vector_db_path}"
-            
-            password_part = f":{self.vector_db_password}" if self.vector_db_password else ""
-            return f"postgresql://{self.vector_db_user}{password_part}@{self.vector_db_host}:{self.vector_db_port}/{self.vector_db_name}"
-        
-        elif db_type == "history":
-            if not self.history_db_enabled:
-                return f"local://{self.history_db_path}"
-            
-            password_part = f":{self.history_db_password}" if self.history_db_password else ""
-            return f"postgresql://{self.history_db_user}{password_part}@{self.history_db_host}:{self.history_db_port}/{self.history_db_name}"
-        
-        else:
+        try:
+            return self._conn_strings[db_type]
+        except KeyError:
             raise ValueError(f"Unknown database type: {db_type}")
     
     def set_verbose(self, verbose: bool = True):
@@ -6,65 +6,60 @@ This script serves as the main entry point for the ai-tools application.
 import os
 import sys
 import argparse
+import functools
 import logging
 import signal
-import psutil
+import queue
+import threading
 import json
 import tempfile
-from pathlib import Path
-from ai_tools.mcp.actions import (
-    get_ollama_url,
-    get_ollama_model,
-    ask_llm_to_explain_error,
-    run_ai_command,
-    prompt_ollama_http,
-    MCP_ACTIONS
-)
 from ai_tools.config.database import db_config
-from ai_tools.modules.speech import SpeechToText
-from ai_tools.modules.shell_tools import install_shell_integration_command
-from ai_tools.modules.sim import GameSimAi
+
+# The MCP actions (HTTP client, document storage), the speech engine, the
+# simulator and the shell integration are imported by the code that uses
+# them, so light commands start quickly
 
 # Path to store information about running sim processes
 SIM_PROCESS_INFO_FILE = os.path.join(tempfile.gettempdir(), "aitools_sim_processes.json")
-
-# Special handling for error analysis mode to completely suppress help output
-if len(sys.argv) > 1 and sys.argv[1] == "error":
-    # Direct error handling path that bypasses argparse completely
-    if len(sys.argv) > 2:
-        command = sys.argv[2]
-        error = " ".join(sys.argv[3:]) if len(sys.argv) > 3 else "Command failed with no output"
-        print(f"Analyzing error for command: '{command}'")
-        output = ask_llm_to_explain_error(command, error)
-        print(f"\nExplanation:\n{output}")
-    else:
-        print("Error: Missing command to analyze")
-    sys.exit(0)
+# Last contents read or written, as (mtime_ns, processes), so the file is
+# only parsed again when another process has changed it
+_sim_processes_cache = None
 
 def print_environment_info():
     """Print current Ollama configuration from environment variables"""
-    print("\nOllama Configuration:")
-    print(f"  Host: {os.getenv('OLLAMA_HOST', 'localhost')}")
-    print(f"  Port: {os.getenv('OLLAMA_PORT', '11434')}")
-    print(f"  Model: {get_ollama_model()}")
-    print(f"  API URL: {get_ollama_url()}\n")
+    from ai_tools.mcp.actions import get_ollama_model, get_ollama_url
+    
+    # Written in one call rather than one print per line
+    sys.stdout.write(
+        "\nOllama Configuration:\n"
+        f"  Host: {os.getenv('OLLAMA_HOST', 'localhost')}\n"
+        f"  Port: {os.getenv('OLLAMA_PORT', '11434')}\n"
+        f"  Model: {get_ollama_model()}\n"
+        f"  API URL: {get_ollama_url()}\n\n"
+    )
 
 def handle_run_command(args):
     """Handle the 'run' command"""
+    from ai_tools.mcp.actions import run_ai_command
+    
     prompt = " ".join(args.prompt)
     print(f"Generating command for: '{prompt}'")
     command, output = run_ai_command(prompt)
-    print(f"\nCommand: {command}")
-    print(f"Output: {output}")
+    sys.stdout.write(f"\nCommand: {command}\nOutput: {output}\n")
 
 def handle_prompt_command(args):
     """Handle the 'prompt' command"""
+    from ai_tools.backend.session import run_async
+    from ai_tools.mcp.actions import prompt_ollama_http_async
+    
     # Set database configuration verbosity
     db_config.set_verbose(args.verbose)
     
     prompt = " ".join(args.prompt)
     print(f"Sending prompt to Ollama: '{prompt}'")
-    output = prompt_ollama_http(prompt, use_streaming=True, verbose=args.verbose)
+    output = run_async(
+        prompt_ollama_http_async(prompt, use_streaming=True, verbose=args.verbose, use_cache=not args.no_cache)
+    )
     # Don't print the response if using streaming mode because it's already printed directly
     if output:  # Only print if there's actual output (non-streaming mode)
         print(f"\nResponse:\n{output}")
@@ -75,6 +70,8 @@ def handle_error_command(args):
         print("Error: You must provide both a command and an error message.")
         return
     
+    from ai_tools.mcp.actions import ask_llm_to_explain_error
+    
     command = args.command
     error = " ".join(args.error)
     print(f"Analyzing error for command: '{command}'")
@@ -97,22 +94,32 @@ def handle_load_command(args):
     db_config.set_verbose(args.verbose)
     
     # Access the MCP action for vectorizing documents
+    from ai_tools.mcp.actions import MCP_ACTIONS
+    
     vectorize_action = MCP_ACTIONS.get("vectorize_documents")
     if not vectorize_action:
         print("Error: Document loading functionality is not available")
         return
     
-    result = vectorize_action(directory_path, db_name=KNOWLEDGE_DB_NAME)
+    result = vectorize_action(
+        directory_path, db_name=KNOWLEDGE_DB_NAME, batch_size=args.batch_size, use_cache=not args.no_cache
+    )
     
     if result.get("status") == "success":
-        print(f"Successfully loaded documents from '{directory_path}'")
-        print(f"Storage type: {result.get('storage_type', 'local')}")
-        print(f"Documents are now available to the AI as reference knowledge")
+        sys.stdout.write(
+            f"Successfully loaded documents from '{directory_path}'\n"
+            f"Storage type: {result.get('storage_type', 'local')}\n"
+            "Documents are now available to the AI as reference knowledge\n"
+        )
     else:
         print(f"Error: {result.get('message', 'Failed to load documents')}")
 
 def handle_speak_command(args):
     """Handle the 'speak' command that sends a prompt to Ollama and speaks the response with a natural voice"""
+    from ai_tools.backend.session import run_async
+    from ai_tools.mcp.actions import prompt_ollama_http_async
+    from ai_tools.modules.speech import SpeechToText
+    
     # Set database configuration verbosity
     db_config.set_verbose(args.verbose)
     
@@ -120,18 +127,47 @@ def handle_speak_command(args):
     speech_engine = SpeechToText()
     
     prompt = " ".join(args.prompt)
-    print(f"Sending prompt to Ollama: '{prompt}'")
-    print("Please wait while getting response...")
+    sys.stdout.write(f"Sending prompt to Ollama: '{prompt}'\nPlease wait while getting response...\n")
     
-    # Using non-streaming mode to get the full response at once for speech synthesis
-    output = prompt_ollama_http(prompt, use_streaming=False, verbose=args.verbose)
+    # Speak each sentence while the rest of the response is still being generated
+    chunks = queue.Queue()
+    speaker = threading.Thread(
+        target=speech_engine.speech_stream, args=(iter(chunks.get, None),), name="speak", daemon=True
+    )
+    speaker.start()
+    
+    streamed = []
     
-    print(f"\nResponse:\n{output}")
+    def on_chunk(text):
+        if not streamed:
+            print("Speaking response...")
+        streamed.append(text)
+        chunks.put(text)
     
-    print("\nSpeaking response...")
-    speech_engine.speech(output)
+    try:
+        output = run_async(
+            prompt_ollama_http_async(
+                prompt, use_streaming=True, verbose=args.verbose, on_chunk=on_chunk, use_cache=not args.no_cache
+            )
+        )
+        # Errors come back as the return value without being streamed; speak them too
+        if not streamed and output:
+            on_chunk(output)
+    finally:
+        chunks.put(None)
+    
+    speaker.join()
     print("Done speaking.")
 
+def handle_warmup_command(args):
+    """Handle the 'warmup' command that prepares the search stack, e.g. in an image build"""
+    from ai_tools.storage.warmup import warmup
+    
+    print("Warming up search components...")
+    if not warmup(verbose=True):
+        sys.exit(1)
+    print("Warm-up complete.")
+
 def handle_sim_command(args):
     """Handle the 'sim' command for game simulator data ingestion"""
     game_type = args.game_type
@@ -147,22 +183,17 @@ def handle_sim_command(args):
                 print(f"Use 'aitools sim {game_type} stop' to stop it first")
                 return
 
-            # Fork a new process for the game simulator
-            pid = os.fork()
-            if pid == 0:  # Child process
-                try:
-                    # Initialize the game simulator with the specified game type
-                    game_sim = GameSimAi(game_type=game_type)
-                    # Start the game simulator
-                    game_sim.start()
-                    sys.exit(0)
-                except Exception as e:
-                    print(f"Error in child process: {str(e)}")
-                    sys.exit(1)
-            else:  # Parent process
-                print(f"Started {game_type} simulator process with PID: {pid}")
-                # Save the process information
-                _save_sim_process(game_type, pid)
+            # Fail here rather than in a detached child whose PID would be saved
+            _check_sim_game_type(game_type)
+            
+            # Start the simulator in a fresh interpreter rather than a fork of
+            # this one; only that process loads the game, audio and AI stack
+            import subprocess
+            
+            pid = subprocess.Popen(_sim_worker_argv(game_type), start_new_session=True).pid
+            print(f"Started {game_type} simulator process with PID: {pid}")
+            # Save the process information
+            _save_sim_process(game_type, pid)
         except NotImplementedError as e:
             print(f"Error: {str(e)}")
         except ValueError as e:
@@ -193,114 +224,275 @@ def handle_sim_command(args):
     else:
         print(f"Unknown action '{action}' for sim command. Available actions: start, stop")
 
+def _check_sim_game_type(game_type):
+    """Raise the error the simulator would for a game type it can't run"""
+    if game_type == 'iracing':
+        raise NotImplementedError("iRacing support is not yet implemented")
+    if game_type not in SIM_GAME_TYPES:
+        raise ValueError(f"Unsupported game type: {game_type}")
+
+def _sim_worker_argv(game_type):
+    """Command line that runs the simulator for a game type in a new process"""
+    if getattr(sys, "frozen", False):
+        # A PyInstaller binary is its own sys.executable and ignores -m
+        return [sys.executable, SIM_WORKER_COMMAND, game_type]
+    return [sys.executable, "-m", "ai_tools.modules.sim", game_type]
+
 def _get_sim_processes():
     """Get information about running sim processes"""
-    if not os.path.exists(SIM_PROCESS_INFO_FILE):
+    global _sim_processes_cache
+    try:
+        mtime = os.stat(SIM_PROCESS_INFO_FILE).st_mtime_ns
+    except OSError:
         return {}
     
+    if _sim_processes_cache is None or _sim_processes_cache[0] != mtime:
+        try:
+            with open(SIM_PROCESS_INFO_FILE, 'r') as f:
+                _sim_processes_cache = (mtime, json.load(f))
+        except (json.JSONDecodeError, IOError):
+            return {}
+    return dict(_sim_processes_cache[1])
+
+def _write_sim_processes(processes, failure_message):
+    """Replace the sim process file atomically, so readers never see a partial write"""
+    global _sim_processes_cache
+    temp_file = f"{SIM_PROCESS_INFO_FILE}.{os.getpid()}.tmp"
     try:
-        with open(SIM_PROCESS_INFO_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(SIM_PROCESS_INFO_FILE), exist_ok=True)
+        with open(temp_file, 'w') as f:
+            f.write(json.dumps(processes, separators=(',', ':')))
+        os.replace(temp_file, SIM_PROCESS_INFO_FILE)
+        _sim_processes_cache = (os.stat(SIM_PROCESS_INFO_FILE).st_mtime_ns, dict(processes))
+    except OSError as e:
+        print(f"Warning: {failure_message}: {str(e)}")
 
 def _save_sim_process(game_type, pid):
     """Save information about a running sim process"""
     processes = _get_sim_processes()
     processes[game_type] = pid
-    
-    # Ensure the directory exists
-    os.makedirs(os.path.dirname(SIM_PROCESS_INFO_FILE), exist_ok=True)
-    
-    try:
-        with open(SIM_PROCESS_INFO_FILE, 'w') as f:
-            json.dump(processes, f)
-    except IOError as e:
-        print(f"Warning: Could not save process information: {str(e)}")
+    _write_sim_processes(processes, "Could not save process information")
 
 def _remove_sim_process(game_type):
     """Remove information about a sim process"""
     processes = _get_sim_processes()
     if game_type in processes:
         del processes[game_type]
-    
-    try:
-        with open(SIM_PROCESS_INFO_FILE, 'w') as f:
-            json.dump(processes, f)
-    except IOError as e:
-        print(f"Warning: Could not update process information: {str(e)}")
+    _write_sim_processes(processes, "Could not update process information")
 
 def _is_process_running(pid):
     """Check if a process with the given PID is running"""
+    if os.name != "posix":
+        # On Windows os.kill(pid, 0) sends CTRL_C_EVENT instead of probing,
+        # so the process is looked up with OpenProcess through psutil
+        import psutil
+        
+        try:
+            process = psutil.Process(pid)
+            return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+    
     try:
-        # Check if the process exists and is not a zombie
-        process = psutil.Process(pid)
-        return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        # Signal 0 only checks that the process exists
+        os.kill(pid, 0)
+    except ProcessLookupError:
         return False
-
-def parse_args(argv=None):
-    """Parse and return command line arguments"""
-    # Create parser with add_help=False to suppress automatic help/usage messages
-    parser = argparse.ArgumentParser(
-        description="ai-tools Ollama interface for AI-powered command generation.",
-        add_help=False  # Suppress automatic help message on error
-    )
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
     
-    # Add help option manually so it still shows up with -h/--help
-    parser.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
-                      help='show this help message and exit')
-    
-    # Global arguments
-    parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose output')
-    parser.add_argument('--config', help='Path to configuration file')
-    
-    subparsers = parser.add_subparsers(dest="command", help="Command to execute")
-    
-    # Run command parser
+    # A zombie still has a PID until its parent reaps it; the state is the
+    # field after the parenthesised command name in /proc/<pid>/stat
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            return f.read().rpartition(b")")[2].split(None, 1)[0] != b"Z"
+    except (OSError, IndexError):
+        # No procfs (e.g. macOS); the signal check has to do
+        return True
+
+def _add_run_parser(subparsers):
     run_parser = subparsers.add_parser("run", help="Generate and run a command based on natural language")
     run_parser.add_argument("prompt", nargs="+", help="Natural language description of the command to generate")
-    
-    # Prompt command parser
+
+def _add_prompt_parser(subparsers):
     prompt_parser = subparsers.add_parser("prompt", help="Send a direct prompt to Ollama")
     prompt_parser.add_argument("prompt", nargs="+", help="Prompt to send to Ollama")
     prompt_parser.add_argument("-v", "--verbose", action="store_true", help="Show additional connection information")
-    
-    # Error command parser
+    prompt_parser.add_argument("--no-cache", action="store_true", help="Ask Ollama even if a cached response exists")
+
+def _add_error_parser(subparsers):
     error_parser = subparsers.add_parser("error", help="Get an explanation for a command error")
     error_parser.add_argument("command", help="The command that generated the error")
     error_parser.add_argument("error", nargs="+", help="The error message to analyze")
-    
-    # Document loading parser
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
+def _add_load_parser(subparsers):
     load_parser = subparsers.add_parser("load", help="Load documents into the knowledge base")
     load_parser.add_argument("directory", help="Directory containing documents to load")
+    load_parser.add_argument("--batch-size", type=_positive_int, default=None,
+                             help="Number of text chunks embedded per batch (default: 64)")
+    load_parser.add_argument("--no-cache", action="store_true",
+                             help="Embed every document again instead of reusing cached embeddings")
     load_parser.add_argument("-v", "--verbose", action="store_true", help="Show additional processing information")
-    
-    # Info command parser
-    info_parser = subparsers.add_parser("info", help="Display configuration information")
-    
-    # Speak command parser
+
+def _add_info_parser(subparsers):
+    subparsers.add_parser("info", help="Display configuration information")
+
+def _add_speak_parser(subparsers):
     speak_parser = subparsers.add_parser("speak", help="Send a prompt to Ollama and speak the response")
     speak_parser.add_argument("prompt", nargs="+", help="Prompt to send to Ollama")
     speak_parser.add_argument("-v", "--verbose", action="store_true", help="Show additional connection information")
-    
-    # Shell integration parser
+    speak_parser.add_argument("--no-cache", action="store_true", help="Ask Ollama even if a cached response exists")
+
+def _add_install_shell_parser(subparsers):
     shell_parser = subparsers.add_parser("install-shell", help="Install shell integration for terminal capabilities")
     shell_parser.add_argument("--auto", action="store_true", help="Automatically add source command to shell config")
-    
-    # Sim command parser
+
+def _add_warmup_parser(subparsers):
+    subparsers.add_parser("warmup", help="Load the embedding model and compile search kernels ahead of use")
+
+SIM_GAME_TYPES = ('msfs', 'iracing', 'dummy')
+SIM_ACTIONS = ('start', 'stop')
+# Hidden subcommand that runs the simulator in the foreground, used by 'sim start'
+SIM_WORKER_COMMAND = "__sim-worker"
+
+def _add_sim_parser(subparsers):
     sim_parser = subparsers.add_parser("sim", help="Start in-game data ingestion and voice assistant")
-    sim_parser.add_argument("game_type", choices=['msfs', 'iracing', 'dummy'], default='dummy', nargs='?', 
+    sim_parser.add_argument("game_type", choices=SIM_GAME_TYPES, default='dummy', nargs='?', 
                           help="Type of game simulator (default: dummy)")
-    sim_parser.add_argument("action", choices=['start', 'stop'], help="Action to perform")
+    sim_parser.add_argument("action", choices=SIM_ACTIONS, help="Action to perform")
+
+# Subcommand parser builders, in the order they are listed in the help
+_SUBPARSER_BUILDERS = {
+    "run": _add_run_parser,
+    "prompt": _add_prompt_parser,
+    "error": _add_error_parser,
+    "load": _add_load_parser,
+    "info": _add_info_parser,
+    "speak": _add_speak_parser,
+    "install-shell": _add_install_shell_parser,
+    "warmup": _add_warmup_parser,
+    "sim": _add_sim_parser,
+}
+
+@functools.lru_cache(maxsize=None)
+def _build_parser(command):
+    """Build the command line parser, with only the given subcommand's parser, or all of them for None"""
+    # Create parser with add_help=False to suppress automatic help/usage messages
+    parser = argparse.ArgumentParser(
+        description="ai-tools Ollama interface for AI-powered command generation.",
+        add_help=False  # Suppress automatic help message on error
+    )
+    
+    # Add help option manually so it still shows up with -h/--help
+    parser.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
+                      help='show this help message and exit')
+    
+    # Global arguments
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose output')
+    parser.add_argument('--config', help='Path to configuration file')
+    
+    subparsers = parser.add_subparsers(dest="command", help="Command to execute")
+    if command is not None:
+        _SUBPARSER_BUILDERS[command](subparsers)
+    else:
+        for add_parser in _SUBPARSER_BUILDERS.values():
+            add_parser(subparsers)
+    
+    return parser
+
+# Subcommands that _parse_simple_args handles, whether they take prompt words,
+# and the defaults of their other options
+_SIMPLE_COMMANDS = {
+    "run": (True, {}),
+    "prompt": (True, {"no_cache": False}),
+    "speak": (True, {"no_cache": False}),
+    "info": (False, {}),
+    "warmup": (False, {}),
+}
+
+def _parse_simple_args(argv):
+    """Parse a plain '<command> [words...]' without argparse, or return None if argv needs the parser"""
+    if argv and argv[0] == "sim":
+        return _parse_simple_sim_args(argv[1:])
+    if not argv or argv[0] not in _SIMPLE_COMMANDS:
+        return None
+    command, words = argv[0], argv[1:]
+    # Options, help, and missing or unexpected words are left to argparse
+    takes_words, defaults = _SIMPLE_COMMANDS[command]
+    if any(word.startswith("-") for word in words) or bool(words) != takes_words:
+        return None
+    args = argparse.Namespace(command=command, verbose=False, config=None, **defaults)
+    if words:
+        args.prompt = words
+    return args
+
+def _parse_simple_sim_args(words):
+    """Parse 'sim [game_type] action' without argparse, or return None if it isn't valid"""
+    if not 1 <= len(words) <= 2 or words[-1] not in SIM_ACTIONS:
+        return None
+    game_type = words[0] if len(words) == 2 else 'dummy'
+    if game_type not in SIM_GAME_TYPES:
+        return None
+    return argparse.Namespace(command="sim", verbose=False, config=None, game_type=game_type, action=words[-1])
+
+def _find_subcommand(argv):
+    """Return the subcommand named in argv, or None if there isn't a known one before any help option"""
+    args = iter(argv)
+    for arg in args:
+        if arg in ("-h", "--help"):
+            return None
+        if arg == "--config":
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg if arg in _SUBPARSER_BUILDERS else None
+    return None
+
+def parse_args(argv=None):
+    """Parse and return command line arguments"""
+    if argv is None:
+        argv = sys.argv[1:]
+    # Only the invoked subcommand's parser is built; help and errors get the full parser
+    return _build_parser(_find_subcommand(argv)).parse_args(argv)
+
+def _handle_error_argv(argv):
+    """Handle 'error <command> [error...]' directly, so argparse never prints usage for it"""
+    if not argv:
+        print("Error: Missing command to analyze")
+        return
     
-    # Parse arguments
-    return parser.parse_args(argv)
+    error = argv[1:] or ["Command failed with no output"]
+    handle_error_command(argparse.Namespace(command=argv[0], error=error))
 
 def main(argv=None):
     """Main entry point for the application"""
-    # Use the parse_args function to get command line arguments
-    args = parse_args(argv)
+    if argv is None:
+        argv = sys.argv[1:]
+    
+    if argv and argv[0] == SIM_WORKER_COMMAND:
+        from ai_tools.modules.sim import main as sim_main
+        
+        sys.exit(sim_main(argv[1:]))
+    
+    # The shell integration calls 'error' on every failed command, even without output
+    if argv and argv[0] == "error":
+        _handle_error_argv(argv[1:])
+        return
+    
+    # Plain commands are dispatched without building a parser; otherwise keep
+    # the parser that handled argv, so help is printed by the same instance
+    parser = None
+    args = _parse_simple_args(argv)
+    if args is None:
+        parser = _build_parser(_find_subcommand(argv))
+        args = parser.parse_args(argv)
     
     if args.verbose:
         # Configure logging with reasonable defaults
@@ -309,19 +501,18 @@ def main(argv=None):
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         print("Starting AI Tools in verbose mode")
-    else:
-        # Setup minimal logging
-        logging.basicConfig(level=logging.INFO)
+    # Otherwise logging stays unconfigured: warnings and errors still reach
+    # stderr through logging's last-resort handler
     
     if args.config:
         print(f"Note: Config file '{args.config}' specified but config loading is not implemented")
     
+    if db_config.warmup_enabled and args.command not in (None, "warmup", "install-shell"):
+        from ai_tools.storage.warmup import warm_up_in_background
+        
+        warm_up_in_background()
+    
     if not args.command:
-        # Create parser object for print_help()
-        parser = argparse.ArgumentParser(
-            description="ai-tools Ollama interface for AI-powered command generation.",
-            add_help=False
-        )
         parser.print_help()
         return
     
@@ -338,16 +529,15 @@ def main(argv=None):
     elif args.command == "speak":
         handle_speak_command(args)
     elif args.command == "install-shell":
+        from ai_tools.modules.shell_tools import install_shell_integration_command
+        
         install_shell_integration_command()
     elif args.command == "sim":
         handle_sim_command(args)
+    elif args.command == "warmup":
+        handle_warmup_command(args)
     else:
-        # Create parser object for print_help()
-        parser = argparse.ArgumentParser(
-            description="ai-tools Ollama interface for AI-powered command generation.",
-            add_help=False
-        )
-        parser.print_help()
+        (parser or _build_parser(None)).print_help()
 
 if __name__ == "__main__":
     try:
@@ -1,84 +1,254 @@
 """ Run a command in the terminal using a local LLM """
 import os
+import signal
+import asyncio
+import functools
+import threading
 import subprocess
 import requests
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Tuple
+
+from ai_tools.backend.run import split_simple_command
+from ai_tools.backend.session import (
+    OLLAMA_ASYNC_TIMEOUT, OLLAMA_POOL_MAXSIZE, OLLAMA_SESSION, get_async_ollama_client, run_async,
+)
+from ai_tools.storage.prompt_cache import get_prompt_cache
+
+# Only the tail of a command's output is kept: it's shown to the user and may
+# end up in a prompt, where megabytes of output are of no use
+_COMMAND_OUTPUT_LIMIT = 65536
+_COMMAND_READ_SIZE = 4096
+_COMMAND_TIMEOUT = 5
+# Seconds to wait for a whole non-streamed response to a prompt
+_PROMPT_TIMEOUT = 60
+
+# Stream lines are parsed straight from bytes, through orjson when it's installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+@functools.lru_cache(maxsize=8)
+def _ollama_urls(host: str, port: str) -> Tuple[str, str]:
+    base_url = f"http://{host}:{port}/api"
+    return f"{base_url}/generate", f"{base_url}/tags"
+
+def _get_ollama_urls() -> Tuple[str, str]:
+    """Get the generate and tags URLs of the Ollama server named by the environment
+    
+    The variables are read on every call, so changes take effect, but the URLs
+    are only formatted once per host and port.
+    """
+    return _ollama_urls(os.getenv('OLLAMA_HOST', 'localhost'), os.getenv('OLLAMA_PORT', '11434'))
 
 def get_ollama_url() -> str:
     """Construct the Ollama API URL from environment variables"""
-    host = os.getenv('OLLAMA_HOST', 'localhost')
-    port = os.getenv('OLLAMA_PORT', '11434')
-    return f"http://{host}:{port}/api/generate"
+    return _get_ollama_urls()[0]
+
+def get_ollama_tags_url() -> str:
+    """Get the URL listing the server's models, used to check that Ollama is up"""
+    return _get_ollama_urls()[1]
 
 def get_ollama_model() -> str:
     """Get the Ollama model from environment variables"""
     return os.getenv('OLLAMA_MODEL', 'gemma3:27b')
 
-def ask_llm_to_explain_error(command: str, error: str) -> str:
-    """ Ask the local LLM to explain an error """
-    system_instruction = "Provide a very brief explanation of the following error message. " \
-                         "Limit your response to 3-5 short lines total. " \
-                         "Include only the most likely cause and one simple solution. " \
-                         "Format your response as console output. " \
-                         "Be extremely concise. No extra details or explanations. " \
-                         "No markdown formatting."
-    full_prompt = f"{system_instruction}\n\nCommand: {command}\n\nError: {error}\nExplanation:"
+def get_ollama_keep_alive() -> str:
+    """Get how long Ollama should keep the model loaded after a request"""
+    return os.getenv('OLLAMA_KEEP_ALIVE', '1h')
+
+# System instructions, built once rather than on every request
+_EXPLAIN_ERROR_INSTRUCTION = "Provide a very brief explanation of the following error message. " \
+                             "Limit your response to 3-5 short lines total. " \
+                             "Include only the most likely cause and one simple solution. " \
+                             "Format your response as console output. " \
+                             "Be extremely concise. No extra details or explanations. " \
+                             "No markdown formatting."
+_COMMAND_INSTRUCTION = "Translate the following user request " \
+                       "into a safe Linux terminal command. Only return " \
+                       "a command that can be executed directly in the terminal. " \
+                       "Do not include shell function syntax like 'return' statements. " \
+                       "Do not include any explanations or extra text."
+
+# Deletes backticks, including ``` fences, in a single pass
+_STRIP_BACKTICKS = str.maketrans('', '', '`')
+
+_TIMEOUT_MESSAGE = "Error: The request to the Ollama server timed out."
+
+
+def _post_ollama(prompt: str, timeout: float, handle_errors: bool = True, use_cache: bool = True,
+                 cache_query: Optional[str] = None) -> str:
+    """ Send a non-streaming prompt to Ollama and return the stripped response text
+    
+    Connection errors and timeouts are returned as error strings unless
+    handle_errors is False, in which case they propagate to the caller.
+    Responses are served from and saved to the prompt cache when it is enabled
+    and use_cache is True; cache_query is the part of the prompt compared for
+    near matches, leaving out fixed instructions (default: the whole prompt).
+    """
+    model = get_ollama_model()
+    cache = get_prompt_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(model, prompt, cache_query)
+        if cached is not None:
+            return cached
+    
     try:
-        response = requests.post(
+        response = OLLAMA_SESSION.post(
             get_ollama_url(),
             json={
-                'model': get_ollama_model(),
-                'prompt': full_prompt,
-                'stream': False
+                'model': model,
+                'prompt': prompt,
+                'stream': False,
+                'keep_alive': get_ollama_keep_alive()
             },
-            timeout=30,
+            timeout=timeout,
         )
         response.raise_for_status()
         response_json = response.json()
         if 'response' not in response_json:
             raise KeyError(f"'response' key not found in API response: {response_json}")
-        
-        # Clean up any Markdown formatting that might remain
         response_text = str(response_json['response']).strip()  # Explicit str() cast to satisfy mypy
-        response_text = response_text.replace("```", "")
-        response_text = response_text.replace("`", "")
-        
+        if cache is not None:
+            cache.put(model, prompt, response_text, cache_query)
         return response_text
     except requests.exceptions.ReadTimeout:
-        return "Error: The request to the Ollama server timed out."
+        if not handle_errors:
+            raise
+        return _TIMEOUT_MESSAGE
     except requests.exceptions.RequestException as e:
+        if not handle_errors:
+            raise
         return f"Error: Failed to connect to the Ollama server. {str(e)}"
 
 
+async def _astream_ollama(client, prompt: str) -> AsyncIterator[str]:
+    """ Send a streaming prompt to Ollama and yield the response text as it is generated
+    
+    Request errors propagate to the caller.
+    """
+    async with client.stream(
+        'POST',
+        get_ollama_url(),
+        json={
+            'model': get_ollama_model(),
+            'prompt': prompt,
+            'stream': True,
+            'keep_alive': get_ollama_keep_alive()
+        },
+    ) as response:
+        response.raise_for_status()
+        buffer = bytearray()
+        async for block in response.aiter_bytes():
+            buffer += block
+            for line in _pop_lines(buffer):
+                text = _chunk_text(line)
+                if text is not None:
+                    yield text
+        text = _chunk_text(bytes(buffer))
+        if text is not None:
+            yield text
+
+
+def _pop_lines(buffer: bytearray) -> List[bytes]:
+    """ Remove the complete lines from the start of buffer and return them """
+    lines = []
+    start = 0
+    # bytearray.find scans with memchr rather than byte by byte in Python
+    end = buffer.find(b"\n")
+    while end != -1:
+        lines.append(bytes(buffer[start:end]))
+        start = end + 1
+        end = buffer.find(b"\n", start)
+    del buffer[:start]
+    return lines
+
+
+def _chunk_text(line: bytes) -> Optional[str]:
+    """ Response text of one NDJSON line of an Ollama stream, or None if it has none """
+    try:
+        chunk_data = _json_loads(line)
+    except ValueError:
+        # Skip malformed chunks, including blank lines and invalid UTF-8
+        return None
+    return chunk_data.get('response') if isinstance(chunk_data, dict) else None
+
+
+def ask_llm_to_explain_error(command: str, error: str) -> str:
+    """ Ask the local LLM to explain an error """
+    query = f"Command: {command}\n\nError: {error}"
+    full_prompt = f"{_EXPLAIN_ERROR_INSTRUCTION}\n\n{query}\nExplanation:"
+    response_text = _post_ollama(full_prompt, timeout=30, cache_query=query)
+    
+    # Clean up any Markdown formatting that might remain
+    return response_text.translate(_STRIP_BACKTICKS)
+
+
 def ask_llm_for_command(prompt: str) -> str:
     """ Ask the local LLM to generate a safe terminal command """
-    system_instruction = "Translate the following user request " \
-                         "into a safe Linux terminal command. Only return " \
-                         "a command that can be executed directly in the terminal. " \
-                         "Do not include shell function syntax like 'return' statements. " \
-                         "Do not include any explanations or extra text."
-    full_prompt = f"{system_instruction}\n\nUser: {prompt}\nCommand:"
+    full_prompt = f"{_COMMAND_INSTRUCTION}\n\nUser: {prompt}\nCommand:"
+    # Never cached: the command gets executed, and a near match from the
+    # similarity tier ("delete a.txt" for "delete b.txt") would run the wrong one
+    return _post_ollama(full_prompt, timeout=15, use_cache=False)
 
-    try:
-        response = requests.post(
-            get_ollama_url(),
-            json={
-                'model': get_ollama_model(),
-                'prompt': full_prompt,
-                'stream': False
-            },
-            timeout=15,  # Increased timeout
-        )
-        response.raise_for_status()
-        response_json = response.json()
-        if 'response' not in response_json:
-            raise KeyError(f"'response' key not found in API response: {response_json}")
-        return str(response_json['response']).strip()  # Explicit str() cast to satisfy mypy
-    except requests.exceptions.ReadTimeout:
-        return "Error: The request to the Ollama server timed out."
-    except requests.exceptions.RequestException as e:
-        return f"Error: Failed to connect to the Ollama server. {str(e)}"
+
+def _command_argv(command: str) -> List[str]:
+    """ Build the argv for a command, only going through bash when it is needed
+    
+    Simple commands that name an executable on PATH are run directly, which
+    saves starting a shell for each one.
+    """
+    return split_simple_command(command) or ['/bin/bash', '-c', command]
+
+
+def _read_command_output(argv: List[str], timeout: float) -> Tuple[int, str]:
+    """ Run a command and read the tail of its combined stdout and stderr as it is produced
+    
+    Raises:
+        subprocess.TimeoutExpired: If the command was killed for running too long
+    """
+    # Own process group, so a timeout also stops the shell's children, which
+    # would otherwise keep the output pipe open
+    with subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          start_new_session=(os.name == "posix")) as proc:
+        timed_out = threading.Event()
+        
+        def kill():
+            timed_out.set()
+            try:
+                if os.name == "posix":
+                    os.killpg(proc.pid, signal.SIGKILL)
+                else:
+                    proc.kill()
+            except OSError:
+                # Already gone
+                pass
+        
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        output = bytearray()
+        truncated = False
+        try:
+            while True:
+                block = proc.stdout.read1(_COMMAND_READ_SIZE)
+                if not block:
+                    break
+                output += block
+                if len(output) > _COMMAND_OUTPUT_LIMIT:
+                    del output[:-_COMMAND_OUTPUT_LIMIT]
+                    truncated = True
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+    # The timer can fire after the command has already exited on its own; only
+    # a command ended by the kill signal timed out
+    if timed_out.is_set() and returncode < 0:
+        raise subprocess.TimeoutExpired(argv, timeout)
+    text = output.decode("utf-8", errors="replace")
+    if truncated:
+        text = f"[output truncated to the last {_COMMAND_OUTPUT_LIMIT} bytes]\n{text}"
+    return returncode, text
 
 
 def run_command(command: str) -> str:
@@ -90,12 +260,10 @@ def run_command(command: str) -> str:
             
         # Print command for debugging
         print(f"Executing command: {command}")
-        result = subprocess.check_output(['/bin/bash', '-c', command],
-                                         stderr=subprocess.STDOUT,
-                                         text=True, timeout=5)
-        return result.strip()
-    except subprocess.CalledProcessError as e:
-        return f"Command error:\n{e.output.strip()}"
+        returncode, output = _read_command_output(_command_argv(command), _COMMAND_TIMEOUT)
+        if returncode != 0:
+            return f"Command error:\n{output.strip()}"
+        return output.strip()
     except Exception as e:
         return f"Unexpected error: {str(e)}"
 
@@ -110,113 +278,180 @@ def run_ai_command(natural_prompt: str) -> tuple[str, str]:
     return np_command, np_output
 
 
-def prompt_ollama_http(prompt: str, use_streaming: bool = True, verbose: bool = False) -> str:
+def prompt_ollama_http(prompt: str, use_streaming: bool = True, verbose: bool = False,
+                       on_chunk: Optional[Callable[[str], None]] = None, use_cache: bool = True) -> str:
     """ Send a prompt to the local Ollama server and get the response 
     
     Args:
         prompt: The prompt to send to Ollama
         use_streaming: Whether to use streaming mode (default: True)
         verbose: Whether to print debug information (default: False)
+        on_chunk: Called with each piece of response text as it arrives (streaming mode only)
+        use_cache: Whether to use the prompt cache when it is enabled (default: True)
         
     Returns:
         The response string from the Ollama server
     """
+    if use_streaming:
+        # Streams are read by prompt_ollama_http_async on an event loop
+        return run_async(prompt_ollama_http_async(prompt, True, verbose, on_chunk, use_cache))
+    
     try:
-        # Log the request details for debugging
-        ollama_url = get_ollama_url()
-        ollama_model = get_ollama_model()
-        
         if verbose:
-            print(f"Connecting to Ollama at: {ollama_url}")
-            print(f"Using model: {ollama_model}")
-            print(f"Request timeout: 60 seconds")
-            print(f"Streaming mode: {'enabled' if use_streaming else 'disabled'}")
+            print(f"Connecting to Ollama at: {get_ollama_url()}")
+            print(f"Using model: {get_ollama_model()}")
+            print(f"Request timeout: {_PROMPT_TIMEOUT} seconds")
+            print("Streaming mode: disabled")
         
-        # If streaming is enabled, use a different approach that's less likely to timeout
-        if use_streaming:
-            # Use streaming API
-            full_response = ""
-            
-            # First, check if Ollama is accessible
-            try:
-                check_url = ollama_url.replace('/api/generate', '/api/tags')
-                requests.get(check_url, timeout=5)
-            except requests.exceptions.RequestException:
-                return "Error: Could not connect to Ollama server. Make sure Ollama is running and accessible."
-            
-            if verbose:
-                print("Connection to Ollama successful. Starting stream...\n")
-                print("Response:")
-            
-            response = requests.post(
-                ollama_url,
-                json={
-                    'model': ollama_model,
-                    'prompt': prompt,
-                    'stream': True
-                },
-                timeout=10,  # Just for initial connection
-                stream=True
-            )
-            
-            response.raise_for_status()
-            
-            # Process the streaming response and print it in real-time
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        chunk = line.decode('utf-8')
-                        # Skip empty chunks
-                        if not chunk.strip() or chunk == "data: [DONE]":
-                            continue
-                        
-                        # Remove the "data: " prefix if present
-                        if chunk.startswith('data: '):
-                            chunk = chunk[6:]
-                            
-                        # Parse the JSON chunk
-                        try:
-                            chunk_data = json.loads(chunk)
-                            if 'response' in chunk_data:
-                                chunk_text = chunk_data['response']
-                                # Print the chunk text directly as it arrives
-                                print(chunk_text, end="", flush=True)
-                                full_response += chunk_text
-                        except json.JSONDecodeError:
-                            # Skip malformed chunks
-                            continue
-                    except Exception as e:
-                        print(f"\nError processing chunk: {str(e)}")
-            
-            if verbose:
-                print("\n\nResponse complete.")
-            else:
-                print("\n")  # Just add a newline for better formatting
-                
-            # Return full_response instead of empty string to fix mypy error
-            return full_response if full_response else ""
-        else:
-            # Non-streaming approach (original method)
-            response = requests.post(
-                ollama_url,
-                json={
-                    'model': ollama_model,
-                    'prompt': prompt,
-                    'stream': False
-                },
-                timeout=60,  # 60 second timeout
-            )
-            response.raise_for_status()
-            response_json = response.json()
-            if 'response' not in response_json:
-                raise KeyError(f"'response' key not found in API response: {response_json}")
-            return str(response_json['response']).strip()  # Explicit str() cast to satisfy mypy
+        return _post_ollama(prompt, timeout=_PROMPT_TIMEOUT, handle_errors=False, use_cache=use_cache)
     except requests.exceptions.ReadTimeout:
-        return f"Error: The request to the Ollama server timed out. Try a simpler query or check your Ollama server configuration.\n\nTroubleshooting tips:\n1. Check if Ollama is running (curl {get_ollama_url().replace('/api/generate', '/api/tags')})\n2. Try a smaller model\n3. Check server resources\n4. Consider using the 'error' command which uses a different prompt format"
+        return _prompt_timeout_message()
     except requests.exceptions.RequestException as e:
         return f"Error: Failed to connect to the Ollama server. {str(e)}"
 
 
+async def prompt_ollama_http_async(prompt: str, use_streaming: bool = True, verbose: bool = False,
+                                   on_chunk: Optional[Callable[[str], None]] = None,
+                                   use_cache: bool = True) -> str:
+    """ Send a prompt to the local Ollama server without blocking the event loop
+    
+    Takes the same arguments and returns the same text as prompt_ollama_http.
+    The streamed response is read with the event loop's pooled
+    httpx.AsyncClient, so several prompts can be in flight at once with
+    asyncio.gather; run it with run_async so the client is closed.
+    """
+    if not use_streaming:
+        # The blocking request runs on a worker thread
+        return await asyncio.to_thread(prompt_ollama_http, prompt, False, verbose, None, use_cache)
+    
+    import httpx
+    
+    ollama_url = get_ollama_url()
+    ollama_model = get_ollama_model()
+    
+    if verbose:
+        print(f"Connecting to Ollama at: {ollama_url}")
+        print(f"Using model: {ollama_model}")
+        print(f"Request timeout: {OLLAMA_ASYNC_TIMEOUT} seconds per read")
+        print("Streaming mode: enabled")
+    
+    cache = get_prompt_cache() if use_cache else None
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, ollama_model, prompt)
+        if cached is not None:
+            print(cached, end="\n\n", flush=True)
+            if on_chunk is not None:
+                on_chunk(cached)
+            return cached
+    
+    client = get_async_ollama_client()
+    response_parts = []
+    try:
+        if verbose:
+            print("Starting stream...\n")
+            print("Response:")
+        
+        async for chunk_text in _astream_ollama(client, prompt):
+            print(chunk_text, end="", flush=True)
+            response_parts.append(chunk_text)
+            if on_chunk is not None:
+                on_chunk(chunk_text)
+    except httpx.ReadTimeout:
+        return _prompt_timeout_message()
+    except (httpx.ConnectError, httpx.ConnectTimeout):
+        return _OLLAMA_UNREACHABLE
+    except httpx.HTTPError as e:
+        return f"Error: Failed to connect to the Ollama server. {str(e)}"
+    
+    if verbose:
+        print("\n\nResponse complete.")
+    else:
+        print("\n")  # Just add a newline for better formatting
+    
+    full_response = "".join(response_parts)
+    if cache is not None and full_response:
+        await asyncio.to_thread(cache.put, ollama_model, prompt, full_response)
+    return full_response
+
+
+async def aprompt_ollama(prompt: str, timeout: float = _PROMPT_TIMEOUT, use_cache: bool = True) -> str:
+    """ Async version of _post_ollama: send a non-streaming prompt and return the stripped response text
+    
+    Errors are returned as error strings, so one failed prompt doesn't cancel
+    the others in a batch.
+    """
+    import httpx
+    
+    model = get_ollama_model()
+    cache = get_prompt_cache() if use_cache else None
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, model, prompt)
+        if cached is not None:
+            return cached
+    
+    try:
+        response = await get_async_ollama_client().post(
+            get_ollama_url(),
+            json={
+                'model': model,
+                'prompt': prompt,
+                'stream': False,
+                'keep_alive': get_ollama_keep_alive()
+            },
+            timeout=timeout,
+        )
+        response.raise_for_status()
+    except httpx.ReadTimeout:
+        return _TIMEOUT_MESSAGE
+    except httpx.HTTPError as e:
+        return f"Error: Failed to connect to the Ollama server. {str(e)}"
+    
+    response_json = response.json()
+    if 'response' not in response_json:
+        return f"Error: 'response' key not found in API response: {response_json}"
+    response_text = str(response_json['response']).strip()
+    if cache is not None:
+        await asyncio.to_thread(cache.put, model, prompt, response_text)
+    return response_text
+
+
+async def aprompt_many(prompts: List[str], max_concurrency: int = OLLAMA_POOL_MAXSIZE) -> List[str]:
+    """ Send several prompts to Ollama concurrently
+    
+    Identical prompts are sent once and share the response. Ollama only
+    generates them in parallel up to its OLLAMA_NUM_PARALLEL setting; further
+    requests wait in the server's queue.
+    
+    Args:
+        prompts: Prompts to send
+        max_concurrency: Most requests in flight at once (default: the connection pool size)
+        
+    Returns:
+        One response (or error string) per prompt, in order
+    """
+    limit = asyncio.Semaphore(max_concurrency)
+    
+    async def prompt_one(prompt):
+        async with limit:
+            return await aprompt_ollama(prompt)
+    
+    unique = list(dict.fromkeys(prompts))
+    responses = dict(zip(unique, await asyncio.gather(*(prompt_one(prompt) for prompt in unique))))
+    return [responses[prompt] for prompt in prompts]
+
+
+def prompt_ollama_batch(prompts: List[str]) -> List[str]:
+    """ Send several prompts to Ollama concurrently from synchronous code """
+    return run_async(aprompt_many(prompts))
+
+
+_OLLAMA_UNREACHABLE = "Error: Could not connect to Ollama server. Make sure Ollama is running and accessible."
+
+
+def _prompt_timeout_message() -> str:
+    return f"Error: The request to the Ollama server timed out. Try a simpler query or check your Ollama server configuration.\n\nTroubleshooting tips:\n1. Check if Ollama is running (curl {get_ollama_tags_url()})\n2. Try a smaller model\n3. Check server resources\n4. Consider using the 'error' command which uses a different prompt format"
+
+
 # Import database connector functions
 db_functions_available = False
 try:
@@ -265,6 +500,7 @@ MCP_ACTIONS = {
     "run_ai_command": run_ai_command,
     "ask_llm_to_explain_error": ask_llm_to_explain_error,
     "prompt_ollama": prompt_ollama_http,
+    "prompt_ollama_batch": prompt_ollama_batch,
     
     # Database connector actions - Vector database operations
     "vectorize_documents": mcp_vectorize_documents,
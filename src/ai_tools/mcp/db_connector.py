@@ -61,13 +61,16 @@ def get_vector_db():
         )
         return _vector_db_instance
 
-def mcp_vectorize_documents(directory_path: str, db_name: str = "default") -> Dict[str, Any]:
+def mcp_vectorize_documents(directory_path: str, db_name: str = "default",
+                            batch_size: Optional[int] = None, use_cache: bool = True) -> Dict[str, Any]:
     """
     MCP action to vectorize documents from a directory
     
     Args:
         directory_path: Path to directory containing documents
         db_name: Name to give the vector database
+        batch_size: Chunks embedded per batch (default: the embedder's batch size)
+        use_cache: Reuse embeddings of unchanged documents (default: True)
         
     Returns:
         Status information about the vectorization process
@@ -81,7 +84,9 @@ def mcp_vectorize_documents(directory_path: str, db_name: str = "default") -> Di
         print(f"Using LLM at {llm_config['host']}:{llm_config['port']} with model {llm_config['model']}")
         print(f"Vector storage: {'External database' if vector_config['enabled'] else 'Local files'}")
         
-        db_path = vectorize_documents(directory_path, db_name=db_name)
+        db_path = vectorize_documents(
+            directory_path, db_name=db_name, batch_size=batch_size, use_cache=use_cache
+        )
         
         if db_path:
             return {
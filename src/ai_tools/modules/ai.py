@@ -1,24 +1,37 @@
 import os
 import logging
-from openai import OpenAI
-from ai_tools.mcp.db_connector import get_vector_db
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Connection pool settings for the shared OpenAI client
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 10
+OPENAI_KEEPALIVE_EXPIRY = 60.0
+OPENAI_TIMEOUT = 30.0
+OPENAI_CONNECT_TIMEOUT = 5.0
+
 class AiWrapper:
     """Wrapper for AI model interactions with support for multiple models and knowledge retrieval"""
-    def __init__(self):
+    # OpenAI client shared by all instances so its connection pool stays warm
+    _shared_client = None
+    
+    def __init__(self, model=None):
         self.client = None
         self.system_base_data = ""
         self.system_content = ""
         self.user_content = ""
         self.ai_response = ""
-        self.model = os.getenv("AI_MODEL", "gpt-4o")  # Default to GPT-4o if not specified
+        # Small, fast model by default; the assistant answers in a few spoken sentences
+        self.model = model or os.getenv("AI_MODEL", "gpt-4o-mini")
         self.use_ollama = os.getenv("USE_OLLAMA", "false").lower() == "true"
         self.ollama_model = os.getenv("OLLAMA_MODEL", "gemma3:27b")
         self.ollama_host = os.getenv("OLLAMA_HOST", "localhost")
         self.ollama_port = os.getenv("OLLAMA_PORT", "11434")
+        # Keep the model resident between requests so queries don't pay a model reload
+        self.ollama_keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "1h")
         self.temperature = float(os.getenv("AI_TEMPERATURE", "0.7"))
+        # Cap on generated tokens; responses are short and decode time grows with length
+        self.max_tokens = int(os.getenv("AI_MAX_TOKENS", "256"))
         self.use_rag = os.getenv("USE_RAG", "true").lower() == "true"
         
     def set_system_content(self, system_content):
@@ -39,14 +52,50 @@ class AiWrapper:
             # For Ollama, we don't need to create a client here
             # We'll use the appropriate method in ai_request
             logger.info(f"Using Ollama with model {self.ollama_model}")
-            pass
+            # Load the model in the background so the first question doesn't wait for it
+            threading.Thread(target=self._preload_ollama_model, daemon=True).start()
         else:
-            # Initialize OpenAI client
-            self.client = OpenAI(
+            self.client = self._get_openai_client()
+            logger.info(f"Initialized OpenAI client with model {self.model}")
+
+    def _preload_ollama_model(self):
+        """Ask Ollama to load the model; a chat request without messages only loads it"""
+        import requests
+        from ai_tools.backend.session import OLLAMA_SESSION
+        
+        try:
+            OLLAMA_SESSION.post(
+                f"http://{self.ollama_host}:{self.ollama_port}/api/chat",
+                json={
+                    "model": self.ollama_model,
+                    "messages": [],
+                    "keep_alive": self.ollama_keep_alive
+                },
+                timeout=120
+            )
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Could not preload Ollama model: {e}")
+
+    @classmethod
+    def _get_openai_client(cls):
+        """Get the shared OpenAI client, creating it on first use"""
+        if cls._shared_client is None:
+            # Imported here so Ollama-only runs never load the OpenAI SDK
+            import httpx
+            from openai import OpenAI
+            
+            cls._shared_client = OpenAI(
                 api_key=os.getenv("OPENAI_API_KEY"),
                 organization=os.getenv("OPENAI_ORG", None),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+                http_client=httpx.Client(
+                    limits=httpx.Limits(
+                        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                    ),
+                ),
             )
-            logger.info(f"Initialized OpenAI client with model {self.model}")
+        return cls._shared_client
 
     def _get_relevant_context(self, query):
         """Retrieve relevant context from vector database if available"""
@@ -54,25 +103,30 @@ class AiWrapper:
             return ""
             
         try:
+            from ai_tools.mcp.db_connector import get_vector_db
+            
             vector_db = get_vector_db()
             if vector_db and vector_db.initialized:
                 results = vector_db.search(query, limit=3)
                 if results:
-                    context = "\nRelevant information from knowledge base:\n"
-                    for i, result in enumerate(results):
-                        context += f"[{i+1}] {result.content}\n"
-                    return context
+                    return "\nRelevant information from knowledge base:\n" + "".join(
+                        f"[{i+1}] {result.content}\n" for i, result in enumerate(results)
+                    )
         except Exception as e:
             logger.warning(f"Failed to retrieve context from vector DB: {e}")
             
         return ""
 
-    def ai_request(self):
-        """Send the request to the appropriate AI model and return the response"""
-        messages = [
+    def _build_messages(self):
+        """Build the chat messages for the current system and user content"""
+        return [
             {"role": "system", "content": self.system_base_data + self.system_content},
             {"role": "user", "content": self.user_content}
         ]
+
+    def ai_request(self):
+        """Send the request to the appropriate AI model and return the response"""
+        messages = self._build_messages()
         
         try:
             if self.use_ollama:
@@ -92,26 +146,30 @@ class AiWrapper:
             model=self.model,
             messages=messages,
             temperature=self.temperature,
+            max_tokens=self.max_tokens,
         )
-        self.ai_response = str(response.choices[0].message.content)
+        content = response.choices[0].message.content
+        self.ai_response = content if content is not None else ""
         return self.ai_response
         
     def _ollama_request(self, messages):
         """Make a request to the Ollama API"""
         import requests
-        import json
+        from ai_tools.backend.session import OLLAMA_SESSION
         
         ollama_url = f"http://{self.ollama_host}:{self.ollama_port}/api/chat"
         
         try:
-            response = requests.post(
+            response = OLLAMA_SESSION.post(
                 ollama_url,
                 json={
                     "model": self.ollama_model,
                     "messages": messages,
                     "stream": False,
+                    "keep_alive": self.ollama_keep_alive,
                     "options": {
-                        "temperature": self.temperature
+                        "temperature": self.temperature,
+                        "num_predict": self.max_tokens
                     }
                 },
                 timeout=60
@@ -123,8 +181,94 @@ class AiWrapper:
             logger.error(f"Error communicating with Ollama: {e}")
             raise Exception(f"Failed to communicate with Ollama: {e}")
 
-    def get_ai_response(self, message, system_content=None):
-        """Get a response from the AI for the given message and optional system content"""
+    def stream_ai_request(self):
+        """
+        Stream the response from the appropriate AI model
+        
+        Returns an iterator of text chunks as the model generates them, so
+        callers can start speaking or printing before generation finishes.
+        The messages are built now, so the iterator can be consumed on another
+        thread while the next request is prepared. The complete text is stored
+        in ai_response once the stream ends; on an error the error message is
+        yielded and stored instead.
+        """
+        messages = self._build_messages()
+        chunks = self._ollama_stream(messages) if self.use_ollama else self._openai_stream(messages)
+        return self._collect_stream(chunks)
+
+    def _collect_stream(self, chunks):
+        """Yield streamed chunks and store the complete text in ai_response"""
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error in AI request: {e}")
+            self.ai_response = f"Error communicating with AI service: {str(e)}"
+            yield self.ai_response
+            return
+        self.ai_response = "".join(parts)
+
+    def _openai_stream(self, messages):
+        """Stream text chunks from the OpenAI API"""
+        if not self.client:
+            self.initi_ai()
+        
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _ollama_stream(self, messages):
+        """Stream text chunks from the Ollama API"""
+        import requests
+        import json
+        from ai_tools.backend.session import OLLAMA_SESSION
+        
+        ollama_url = f"http://{self.ollama_host}:{self.ollama_port}/api/chat"
+        
+        try:
+            with OLLAMA_SESSION.post(
+                ollama_url,
+                json={
+                    "model": self.ollama_model,
+                    "messages": messages,
+                    "stream": True,
+                    "keep_alive": self.ollama_keep_alive,
+                    "options": {
+                        "temperature": self.temperature,
+                        "num_predict": self.max_tokens
+                    }
+                },
+                stream=True,
+                timeout=60
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    # Errors after the response has started arrive as a chunk of their own
+                    if "error" in data:
+                        raise Exception(f"Ollama error: {data['error']}")
+                    content = data.get("message", {}).get("content")
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        break
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error communicating with Ollama: {e}")
+            raise Exception(f"Failed to communicate with Ollama: {e}")
+
+    def _prepare_user_content(self, message, system_content=None):
+        """Set the system content and the user message enriched with RAG context"""
         if system_content is not None:
             self.set_system_content(system_content)
             
@@ -134,5 +278,14 @@ class AiWrapper:
             message = f"{message}\n{context}"
             
         self.set_user_content(message)
+
+    def get_ai_response_stream(self, message, system_content=None):
+        """Stream a response from the AI for the given message, yielding text chunks"""
+        self._prepare_user_content(message, system_content)
+        return self.stream_ai_request()
+
+    def get_ai_response(self, message, system_content=None):
+        """Get a response from the AI for the given message and optional system content"""
+        self._prepare_user_content(message, system_content)
         self.ai_request()
         return self.ai_response
@@ -1,8 +1,9 @@
 """ A Python script to interact with game simulators and OpenAI GPT """
 # Custom Libraries
-from importlib import import_module
+import sys
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from ai_tools.modules.speech import SpeechToText
 from ai_tools.modules.audio import Audio
 from ai_tools.modules.ai import AiWrapper
@@ -237,6 +238,13 @@ class GameSimAi:
         latest_game_data = None
         latest_context = None
         
+        # Speech plays on its own thread so listening resumes while a reply is spoken;
+        # a single worker keeps announcements in order
+        speaker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sim-speech")
+        # Last announcement queued; with a single worker, everything is spoken once it's done
+        last_speech = None
+        finished = False
+        
         print(f"Listening for {self.game_type} commands...", flush=True)
         try:
             while True:
@@ -263,40 +271,65 @@ class GameSimAi:
                     if has_warning and warning_message:
                         print(f"\nWARNING: {warning_message}", flush=True)
                         # Use text-to-speech to announce the warning
-                        self.speech.speech(warning_message)
+                        last_speech = speaker.submit(self.speech.speech, warning_message)
                     last_warning_check = current_time
                 
-                # Check for audio input (non-blocking)
+                # Check for audio input; reading a chunk blocks until the
+                # microphone has delivered it, which paces this loop. Without
+                # an open stream nothing does, so wait a little instead
                 has_audio = self.audio.check_for_audio()
+                if not self.audio.stream:
+                    time.sleep(0.1)
+                text = self.audio.recognized_text if has_audio else ""
+                
+                # The microphone picks up our own voice; keep reading it so the
+                # audio doesn't back up, but ignore what it recognizes
+                if text and last_speech is not None and not last_speech.done():
+                    text = ""
                 
-                if has_audio and self.audio.recognized_text != "":
-                    print(f"\nRecognized: '{self.audio.recognized_text}'", flush=True)
+                if text:
+                    print(f"\nRecognized: '{text}'", flush=True)
                     
                     # Set the latest system content
                     self.ai.set_system_content(latest_context)
                     
-                    # Get the AI response
-                    response = self.ai.get_ai_response(self.audio.recognized_text)
-                    
-                    # Speak the response
-                    self.speech.speech(response)
+                    # Speak the AI response sentence by sentence as it streams
+                    response = self.ai.get_ai_response_stream(text)
+                    last_speech = speaker.submit(self.speech.speech_stream, response)
 
                     # Check for exit command
-                    if "finalizar" in self.audio.recognized_text.lower() or "exit" in self.audio.recognized_text.lower():
+                    text_lower = text.lower()
+                    if "finalizar" in text_lower or "exit" in text_lower:
                         print("Termination keyword detected. Stopping...", flush=True)
                         break
-                
-                # Small sleep to prevent CPU hogging
-                time.sleep(0.1)
             
+            finished = True
             return True
         except KeyboardInterrupt:
             print("\nInterrupted by user.")
             return False
         finally:
+            # Let the last reply finish on a normal exit, drop queued speech otherwise
+            speaker.shutdown(wait=finished, cancel_futures=not finished)
             self.cleanup()
     
     def cleanup(self):
         """Clean up resources when stopping"""
         if hasattr(self.game_interface, 'stop_data_loop'):
             self.game_interface.stop_data_loop()
+
+
+def main(argv=None):
+    """ Run a simulator assistant in this process: python -m ai_tools.modules.sim [game_type] """
+    argv = sys.argv[1:] if argv is None else argv
+    game_type = argv[0] if argv else 'dummy'
+    try:
+        GameSimAi(game_type=game_type).start()
+    except Exception as e:
+        print(f"Error in simulator process: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,109 @@
 import re
-import time
 import os
+import queue
+import shutil
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from gtts import gTTS
 import subprocess
 import logging
 
+# Code point ranges removed as emoji
+_EMOJI_RANGES = (
+    (0x1F600, 0x1F64F),  # emoticons
+    (0x1F300, 0x1F5FF),  # symbols & pictographs
+    (0x1F680, 0x1F6FF),  # transport & map symbols
+    (0x1F700, 0x1F77F),  # alchemical symbols
+    (0x1F780, 0x1F7FF),  # Geometric Shapes
+    (0x1F800, 0x1F8FF),  # Supplemental Arrows-C
+    (0x1F900, 0x1F9FF),  # Supplemental Symbols and Pictographs
+    (0x1FA00, 0x1FA6F),  # Chess Symbols
+    (0x1FA70, 0x1FAFF),  # Symbols and Pictographs Extended-A
+    (0x02702, 0x027B0),  # Dingbats
+    (0x024C2, 0x1F251),
+)
+
+# Text clean-up patterns, compiled once for all calls
+_EMOJI_RE = re.compile(
+    "[" + "".join(f"{chr(lo)}-{chr(hi)}" for lo, hi in _EMOJI_RANGES) + "]+",
+    flags=re.UNICODE
+)
+# Above this many characters emoji are filtered with NumPy, which beats the
+# regex engine once the array conversion cost is amortized
+_EMOJI_NUMPY_MIN_CHARS = 10000
+# Single characters that might be read aloud: markup and em/en dashes become
+# a space and common symbols are spelled out
+_CHAR_MAP = str.maketrans({
+    **{char: ' ' for char in '*_~`#|<>{}[]\\—–'},
+    '+': ' plus ',
+    '=': ' equals ',
+    '@': ' at ',
+    '&': ' and ',
+    '%': ' percent ',
+    '/': ' slash ',
+})
+# Ellipses and double dashes become a pause
+_PAUSE_RE = re.compile(r'\.{3}|--')
+# Punctuation likely to be spoken, applied per sentence once splitting no
+# longer depends on it: becomes a space, quotes are dropped
+_PUNCT_MAP = str.maketrans({
+    **{char: ' ' for char in ',;:!?()'},
+    '"': None,
+    "'": None,
+})
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Common abbreviations that don't need regex handling of their own
+_ABBREVIATIONS = {
+    'vs.': 'versus',
+    'e.g.': 'for example',
+    'i.e.': 'that is',
+    'etc.': 'etcetera',
+    'Dr.': 'Doctor',
+    'Mr.': 'Mister',
+    'Mrs.': 'Misses',
+    'AI': 'Artificial Intelligence',
+    'UI': 'User Interface',
+    'API': 'A P I',
+}
+# Longest first so e.g. "Mrs." wins over "Mr."
+_ABBR_RE = re.compile('|'.join(
+    re.escape(abbr) for abbr in sorted(_ABBREVIATIONS, key=len, reverse=True)
+))
+
+
+def _expand_abbreviation(match):
+    return _ABBREVIATIONS[match.group(0)]
+
+
+# Where streamed text can be cut without splitting a sentence, unless the
+# period belongs to one of these abbreviations; an ellipsis is a pause, not a
+# sentence end, as in _clean_text
+_SENTENCE_END_RE = re.compile(r'(?<!\.\.)[.!?]\s+')
+_DOTTED_ABBREVIATIONS = tuple(abbr for abbr in _ABBREVIATIONS if abbr.endswith('.'))
+
+
+def _remove_emojis_numpy(text):
+    """Remove emoji code points from a long text with vectorized range checks"""
+    import numpy as np
+    
+    codepoints = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    mask = np.zeros(codepoints.shape, dtype=bool)
+    for lo, hi in _EMOJI_RANGES:
+        mask |= (codepoints >= lo) & (codepoints <= hi)
+    return codepoints[~mask].tobytes().decode('utf-32-le')
+
+
+# Audio players in order of preference
+_PLAYERS = ('ffplay', 'mpg123', 'mpg321', 'mplayer')
+
+
 class SpeechToText:
     """ Class to convert text to speech with a natural-sounding voice using Google TTS """
+    # Audio player found on PATH, probed on first playback ("" if none is installed)
+    _player = None
+    
     def __init__(self):
         """ Initialize the Google TTS engine with optimal settings for natural speech """
         # Set default language to English
@@ -18,89 +114,182 @@ class SpeechToText:
         self.temp_dir = tempfile.gettempdir()
         # Speed factor for playback (1.0 is normal, >1.0 is faster)
         self.speed_factor = 1.15  # 15% faster than normal
+        # Synthesis workers, started on first use and kept for the engine's lifetime
+        self._executor = None
+        # Serializes speech() calls from different threads so utterances don't overlap
+        self._lock = threading.Lock()
 
     def speech(self, text):
-        """ Convert text to speech using Google TTS """
+        """ Convert text to speech using Google TTS
+        
+        Sentences are synthesized in a background worker while the previous
+        one plays, so each network round-trip hides behind playback.
+        """
+        with self._lock:
+            try:
+                futures = [self._submit(sentence) for sentence in self._prepare_sentences(text)]
+            except Exception as e:
+                logging.error(f"Error during speech synthesis: {str(e)}")
+                return
+            self._play_in_order(futures)
+
+    def speech_stream(self, chunks):
+        """ Speak text that arrives in pieces, such as tokens streamed from an LLM
+        
+        Each sentence is synthesized as soon as it is complete, so speaking
+        starts long before the whole text has arrived.
+        """
+        pending = queue.Queue()
+        stop = threading.Event()
+        
+        def produce():
+            try:
+                for sentence in self._iter_stream_sentences(chunks):
+                    if stop.is_set():
+                        break
+                    pending.put(self._submit(sentence))
+            except Exception as e:
+                logging.error(f"Error during speech synthesis: {str(e)}")
+            finally:
+                pending.put(None)
+        
+        with self._lock:
+            producer = threading.Thread(target=produce, name="tts-stream", daemon=True)
+            producer.start()
+            self._play_in_order(iter(pending.get, None), stop)
+            producer.join()
+
+    def _iter_stream_sentences(self, chunks):
+        """ Yield cleaned sentences from streamed text as each one is completed """
+        buffer = ""
+        for chunk in chunks:
+            buffer += chunk
+            end = self._last_sentence_end(buffer)
+            if end:
+                yield from self._prepare_sentences(buffer[:end])
+                buffer = buffer[end:]
+        yield from self._prepare_sentences(buffer)
+
+    @staticmethod
+    def _last_sentence_end(text):
+        """ Index just past the last sentence break in text, or 0 if there is none """
+        end = 0
+        for match in _SENTENCE_END_RE.finditer(text):
+            if not text.endswith(_DOTTED_ABBREVIATIONS, 0, match.start() + 1):
+                end = match.end()
+        return end
+
+    def _prepare_sentences(self, text):
+        """ Clean a text and break it into the sentences to synthesize """
+        # Clean and pre-process text to improve natural flow
+        processed_text = self._clean_text(text)
+        
+        # Break into sentences for better pacing, removing any remaining
+        # punctuation that might be read aloud
+        sentences = []
+        for sentence in self._split_into_sentences(processed_text):
+            if not sentence.strip():
+                continue
+            cleaned_sentence = self._remove_punctuation_for_speech(sentence)
+            if cleaned_sentence:
+                sentences.append(cleaned_sentence)
+        return sentences
+
+    def _submit(self, sentence):
+        """ Queue a sentence for synthesis on the worker pool """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tts")
+        return self._executor.submit(self._synthesize, sentence)
+
+    def _play_in_order(self, futures, stop=None):
+        """ Play the audio of synthesis futures in order as each one completes
+        
+        On failure the stop event, if given, is set so producers stop queueing.
+        """
+        futures = iter(futures)
         try:
-            # Clean and pre-process text to improve natural flow
-            processed_text = self._clean_text(text)
-            
-            # Break into sentences for better pacing
-            sentences = self._split_into_sentences(processed_text)
-            
-            for i, sentence in enumerate(sentences):
-                if not sentence.strip():
-                    continue
-                
-                # Remove any remaining punctuation that might be read aloud
-                cleaned_sentence = self._remove_punctuation_for_speech(sentence)
-                
-                if cleaned_sentence:
-                    # Create a temporary file for the audio
-                    temp_file = os.path.join(self.temp_dir, f"tts_output_{i}.mp3")
-                    
-                    # Generate the speech audio using Google TTS
-                    tts = gTTS(text=cleaned_sentence, lang=self.lang, slow=self.slow)
-                    tts.save(temp_file)
-                    
+            for future in futures:
+                audio_file = future.result()
+                try:
                     # Play the audio using the system's default audio player at faster speed
-                    self._play_audio(temp_file)
-                    
-                    # Remove the temporary file
-                    try:
-                        os.remove(temp_file)
-                    except:
-                        pass
-                    
-                    # Reduced pause between sentences for faster overall speech
-                    time.sleep(0.05)
-                
+                    self._play_audio(audio_file)
+                finally:
+                    self._remove_file(audio_file)
         except Exception as e:
             logging.error(f"Error during speech synthesis: {str(e)}")
+        finally:
+            if stop is not None:
+                stop.set()
+            # Discard audio that was or will be synthesized but never played
+            for future in futures:
+                if not future.cancel():
+                    future.add_done_callback(self._discard_audio)
+
+    def _discard_audio(self, future):
+        """ Remove the file produced by a synthesis future that won't be played """
+        if future.exception() is None:
+            self._remove_file(future.result())
+
+    def _synthesize(self, sentence):
+        """ Generate the speech audio for a sentence into a temporary mp3 file """
+        with tempfile.NamedTemporaryFile(dir=self.temp_dir, prefix="tts_output_", suffix=".mp3", delete=False) as temp_file:
+            audio_file = temp_file.name
+        try:
+            tts = gTTS(text=sentence, lang=self.lang, slow=self.slow)
+            tts.save(audio_file)
+        except Exception:
+            self._remove_file(audio_file)
+            raise
+        return audio_file
+
+    @staticmethod
+    def _remove_file(path):
+        """ Remove a temporary audio file, ignoring files that are already gone """
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    @classmethod
+    def _find_player(cls):
+        """Find the preferred audio player on PATH once per process"""
+        if cls._player is None:
+            cls._player = next((player for player in _PLAYERS if shutil.which(player)), "")
+        return cls._player
+
+    def _player_command(self, player, audio_file):
+        """Build the playback command for a player, with speed adjustment where supported"""
+        if player == 'ffplay':
+            # ffplay supports tempo adjustment with atempo filter
+            return [
+                player, 
+                '-nodisp', 
+                '-autoexit', 
+                '-loglevel', 'quiet',
+                '-af', f'atempo={self.speed_factor}',  # Speed up audio
+                audio_file
+            ]
+        if player == 'mpg123':
+            # mpg123 supports speed with --pitch option (percentage)
+            speed_percent = int(self.speed_factor * 100)
+            return [player, '--pitch', str(speed_percent), audio_file]
+        if player == 'mplayer':
+            # mplayer supports speed with -speed option
+            return [player, '-speed', str(self.speed_factor), audio_file]
+        # For players that don't support speed adjustment
+        return [player, audio_file]
 
     def _play_audio(self, audio_file):
         """Play an audio file using appropriate system command with speed adjustment"""
         try:
             # Determine the platform and use the appropriate player
             if os.name == 'posix':  # Linux or Mac
-                # Try multiple players in order of preference, with speed adjustment where supported
-                players = ['ffplay', 'mpg123', 'mpg321', 'mplayer']
-                
-                for player in players:
-                    try:
-                        # Check if the player is available
-                        subprocess.run(['which', player], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-                        
-                        # Set up command based on the player with speed adjustment
-                        if player == 'ffplay':
-                            # ffplay supports tempo adjustment with atempo filter
-                            cmd = [
-                                player, 
-                                '-nodisp', 
-                                '-autoexit', 
-                                '-loglevel', 'quiet',
-                                '-af', f'atempo={self.speed_factor}',  # Speed up audio
-                                audio_file
-                            ]
-                        elif player == 'mpg123':
-                            # mpg123 supports speed with --pitch option (percentage)
-                            speed_percent = int(self.speed_factor * 100)
-                            cmd = [player, '--pitch', str(speed_percent), audio_file]
-                        elif player == 'mplayer':
-                            # mplayer supports speed with -speed option
-                            cmd = [player, '-speed', str(self.speed_factor), audio_file]
-                        else:
-                            # For players that don't support speed adjustment
-                            cmd = [player, audio_file]
-                        
-                        # Play the file
-                        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                        return
-                    except subprocess.SubprocessError:
-                        continue
-                
-                # If no player worked, try aplay as last resort (no speed adjustment)
-                subprocess.run(['aplay', audio_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                player = self._find_player()
+                if player:
+                    subprocess.run(self._player_command(player, audio_file), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                else:
+                    # If no player is available, try aplay as last resort (no speed adjustment)
+                    subprocess.run(['aplay', audio_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             
             elif os.name == 'nt':  # Windows
                 os.startfile(audio_file)
@@ -118,84 +307,39 @@ class SpeechToText:
         # First, remove all emojis
         text = self._remove_emojis(text)
         
-        # Replace multiple spaces with a single space
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Replace unwanted characters that might be read aloud with spaces
-        text = re.sub(r'[*_~`#|<>{}[\]\\]', ' ', text)
+        # Replace markup and dashes that might be read aloud with spaces and
+        # spell out symbols, all in one pass
+        text = text.translate(_CHAR_MAP)
         
-        # Handle common non-alphanumeric characters properly
-        replacements = {
-            '+': ' plus ',
-            '=': ' equals ',
-            '@': ' at ',
-            '&': ' and ',
-            '%': ' percent ',
-            '/': ' slash ',
-            '...': ' ',  # Replacing ellipsis with a pause
-            '--': ' ',   # Replacing double dash
-            '—': ' ',    # Replacing em dash
-            '–': ' ',    # Replacing en dash
-        }
+        # Replace ellipses and double dashes with a pause in one pass
+        text = _PAUSE_RE.sub(' ', text)
         
-        for char, replacement in replacements.items():
-            text = text.replace(char, replacement)
-        
-        # Expand common abbreviations that don't need regex
-        common_abbr = {
-            'vs.': 'versus',
-            'e.g.': 'for example',
-            'i.e.': 'that is',
-            'etc.': 'etcetera',
-            'Dr.': 'Doctor',
-            'Mr.': 'Mister',
-            'Mrs.': 'Misses',
-            'AI': 'Artificial Intelligence',
-            'UI': 'User Interface',
-            'API': 'A P I',
-        }
-        
-        for abbr, expansion in common_abbr.items():
-            text = text.replace(abbr, expansion)
+        # Expand common abbreviations in one pass
+        text = _ABBR_RE.sub(_expand_abbreviation, text)
         
         return text
     
     def _remove_emojis(self, text):
         """Remove all emoji characters from text"""
-        # Pattern to match emoji characters
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # emoticons
-            "\U0001F300-\U0001F5FF"  # symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # transport & map symbols
-            "\U0001F700-\U0001F77F"  # alchemical symbols
-            "\U0001F780-\U0001F7FF"  # Geometric Shapes
-            "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
-            "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
-            "\U0001FA00-\U0001FA6F"  # Chess Symbols
-            "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
-            "\U00002702-\U000027B0"  # Dingbats
-            "\U000024C2-\U0001F251" 
-            "]+", flags=re.UNICODE
-        )
-        
-        # Remove the emojis
-        return emoji_pattern.sub(r'', text)
+        if len(text) >= _EMOJI_NUMPY_MIN_CHARS:
+            try:
+                return _remove_emojis_numpy(text)
+            except (ImportError, UnicodeError):
+                # NumPy missing, or lone surrogates that can't be encoded
+                pass
+        return _EMOJI_RE.sub('', text)
 
     def _remove_punctuation_for_speech(self, text):
         """Remove punctuation that might be read aloud"""
         # Replace punctuation likely to be spoken with spaces or nothing
-        # Keep periods, question marks, etc. as they affect pacing but aren't usually spoken
-        text = re.sub(r'[,;:!?()]', ' ', text)
-        text = text.replace('"', '')
-        text = text.replace("'", '')
+        # Keep periods as they affect pacing but aren't usually spoken
+        text = text.translate(_PUNCT_MAP)
         
-        # Clean up any resulting multiple spaces
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
+        # Collapse and trim whitespace, including runs left by earlier clean-up
+        return ' '.join(text.split())
 
     def _split_into_sentences(self, text):
         """Split text into sentences for better pacing"""
         # Basic sentence splitting - handles periods, question marks, and exclamation points
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        sentences = _SENTENCE_RE.split(text)
         return sentences
@@ -1,23 +1,28 @@
 import os
+import re
+import sys
 import json
+import math
+import hashlib
 import datetime
-from typing import List, Dict, Tuple, Optional, Any, Union
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import Deque, List, Dict, Tuple, Optional, Any, Union
 from pathlib import Path
-from langchain_community.document_loaders import TextLoader, DirectoryLoader, PyPDFLoader
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import (
-    create_history_aware_retriever,
-    create_retrieval_chain,
-)
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+
+# LangChain, FAISS and the embedding stack are imported inside the functions
+# that use them, so importing this module (e.g. from the CLI) stays cheap
 
 # Import the unified database configuration
 from ai_tools.config.database import db_config
+from ai_tools.storage.embeddings import get_embedder
+from ai_tools.storage.embedding_cache import get_embedding_cache
 
-# Add type annotation for CHAT_HISTORY
-CHAT_HISTORY: List[Tuple[str, str]] = []
+# Only the most recent turns are replayed to the retrieval chain, so prompt size
+# stays bounded over a long session
+CHAT_HISTORY: Deque[Tuple[str, str]] = deque(maxlen=db_config.chat_history_turns)
 RET_CHAIN = None
 
 # Use the unified database configuration
@@ -25,38 +30,361 @@ VECTOR_DB_PATH = db_config.vector_db_path
 DEFAULT_EMBEDDING_MODEL = db_config.default_embedding_model
 EXTERNAL_VECTOR_DB_ENABLED = db_config.vector_db_enabled
 
+# Documents are split into chunks of this many characters before embedding;
+# whole files would be silently truncated at the model's token limit
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 64
+
+# Small collections keep the exact flat index; mid-sized ones use an HNSW graph
+HNSW_MIN_VECTORS = 5000
+HNSW_NEIGHBORS = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = db_config.vector_hnsw_ef_search
+
+# IVF-PQ needs enough vectors to train its coarse clusters and PQ codebooks,
+# and only pays off in memory once collections get large
+IVFPQ_MIN_VECTORS = 100000
+IVFPQ_MAX_SUBQUANTIZERS = 48
+IVFPQ_BITS_PER_CODE = 8
+IVFPQ_NPROBE = db_config.vector_ivf_nprobe
+# Training a codebook of 2^bits centroids needs at least that many vectors
+IVFPQ_MIN_TRAINING_VECTORS = 2 ** IVFPQ_BITS_PER_CODE
+
+# Embeddings are L2-normalized, so inner product equals cosine similarity and
+# scores come back as "higher is more relevant" without a per-query sqrt
+INDEX_METRIC = "inner_product"
+
+# Vector stores already loaded in this process, keyed by (db_path, model_name)
+# and validated against the index file's mtime
+_VECTOR_STORE_CACHE: Dict[Tuple[str, str], Tuple[int, Any]] = {}
+
 # Determine if we're using the external DB or local FAISS
 def using_external_db():
     return EXTERNAL_VECTOR_DB_ENABLED
 
 
+def _select_index_type(vector_count):
+    """ Resolve the configured index type for a collection of the given size. """
+    index_type = db_config.vector_index_type
+    if index_type == "auto":
+        if vector_count >= IVFPQ_MIN_VECTORS:
+            return "ivfpq"
+        return "hnsw" if vector_count >= HNSW_MIN_VECTORS else "flat"
+    if index_type == "ivfpq" and vector_count < IVFPQ_MIN_TRAINING_VECTORS:
+        fallback = "hnsw" if vector_count >= HNSW_MIN_VECTORS else "flat"
+        print(f"Warning: an ivfpq index needs at least {IVFPQ_MIN_TRAINING_VECTORS} vectors "
+              f"to train, found {vector_count}; using a {fallback} index instead")
+        return fallback
+    return index_type
+
+
+def _create_flat_index(vectors):
+    """ Create an exact inner-product index for the given embedding matrix. """
+    import faiss
+    
+    return faiss.IndexFlatIP(vectors.shape[1])
+
+
+def _create_hnsw_index(vectors):
+    """ Create an HNSW graph index for the given embedding matrix. """
+    import faiss
+    
+    index = faiss.IndexHNSWFlat(vectors.shape[1], HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+def _create_ivfpq_index(vectors):
+    """
+    Create and train an IVF-PQ index for the given embedding matrix
+    
+    Uses sqrt(N) inverted lists and the largest sub-quantizer count (up to 48)
+    that evenly divides the embedding dimension.
+    """
+    import faiss
+    
+    count, dimension = vectors.shape
+    nlist = max(1, int(math.sqrt(count)))
+    subquantizers = next(
+        m for m in range(min(IVFPQ_MAX_SUBQUANTIZERS, dimension), 0, -1)
+        if dimension % m == 0
+    )
+    
+    quantizer = faiss.IndexFlatIP(dimension)
+    index = faiss.IndexIVFPQ(
+        quantizer, dimension, nlist, subquantizers, IVFPQ_BITS_PER_CODE,
+        faiss.METRIC_INNER_PRODUCT,
+    )
+    index.train(vectors)
+    index.nprobe = min(IVFPQ_NPROBE, nlist)
+    return index
+
+
+def _create_sq8_index(vectors):
+    """
+    Create and train an exact-scan index storing each dimension as one byte
+    
+    A quarter of the memory of the flat index, which makes brute-force search
+    correspondingly less memory-bound, at a small cost in score precision.
+    """
+    import faiss
+    
+    index = faiss.IndexScalarQuantizer(
+        vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT,
+    )
+    index.train(vectors)
+    return index
+
+
+def _apply_search_params(index):
+    """
+    Apply the configured search parameters to a loaded index
+    
+    FAISS saves efSearch and nprobe with the index, so this lets them be tuned
+    without rebuilding it.
+    """
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif hasattr(index, "nprobe"):
+        index.nprobe = min(IVFPQ_NPROBE, index.nlist)
+
+
+# Index builders, keyed by VECTOR_INDEX_TYPE
+_INDEX_BUILDERS = {
+    "flat": _create_flat_index,
+    "hnsw": _create_hnsw_index,
+    "ivfpq": _create_ivfpq_index,
+    "sq8": _create_sq8_index,
+}
+
+
+def build_vector_store(documents, embedding_model, embed_documents=None):
+    """
+    Embed documents and build a FAISS vector store for them
+    
+    Args:
+        documents: Documents to index
+        embedding_model: Embedding model used for the documents and later queries
+        embed_documents: Function embedding the document texts, such as a cache
+            lookup (default: embedding_model.embed_documents)
+        
+    Returns:
+        Tuple of (vector store, index type used)
+    """
+    index_type = _select_index_type(len(documents))
+    if index_type not in _INDEX_BUILDERS:
+        raise ValueError(f"Unknown vector index type: {index_type}")
+    
+    import faiss
+    import numpy as np
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+    
+    texts = [doc.page_content for doc in documents]
+    vectors = np.ascontiguousarray(
+        (embed_documents or embedding_model.embed_documents)(texts), dtype=np.float32
+    )
+    # Normalized once at insert time, so inner product ranks by cosine similarity
+    faiss.normalize_L2(vectors)
+    
+    vector_store = FAISS(
+        embedding_function=embedding_model,
+        index=_INDEX_BUILDERS[index_type](vectors),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+    vector_store.add_embeddings(
+        zip(texts, vectors),
+        metadatas=[doc.metadata for doc in documents],
+    )
+    return vector_store, index_type
+
+
+# Markup stripped from EPUB chapters before indexing
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class EpubLoader:
+    """ Load the text of an EPUB book as a single document. """
+    
+    def __init__(self, file_path):
+        self.file_path = file_path
+    
+    def load(self):
+        import ebooklib
+        from ebooklib import epub
+        from langchain_core.documents import Document
+        
+        book = epub.read_epub(self.file_path)
+        # Collect chapters and join once; appending to a str copies the whole book per chapter
+        parts = [
+            _HTML_TAG_RE.sub("", item.get_content().decode("utf-8", errors="replace"))
+            for item in book.get_items()
+            if item.get_type() == ebooklib.ITEM_DOCUMENT
+        ]
+        return [Document(page_content="\n".join(parts), metadata={"source": self.file_path})]
+
+
+def _text_loader(file_path):
+    from langchain_community.document_loaders import TextLoader
+    return TextLoader(file_path)
+
+
+def _pdf_loader(file_path):
+    from langchain_community.document_loaders import PyPDFLoader
+    return PyPDFLoader(file_path)
+
+
+# Loader factories for each supported file extension
+LOADERS = {
+    ".txt": _text_loader,
+    ".pdf": _pdf_loader,
+    ".epub": EpubLoader,
+    # Add other loaders for different file types as needed
+}
+
+
+def _iter_supported_files(directory_path):
+    """
+    Yield directory entries for the files that have a registered loader
+    
+    os.scandir reports the entry type from the directory listing itself, so
+    no extra stat call is needed per file.
+    """
+    with os.scandir(directory_path) as it:
+        for entry in it:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in LOADERS:
+                yield entry
+
+
+def _load_one(file_path):
+    """
+    Load the documents of a single file
+    
+    Runs in a worker process, so errors are returned instead of raised.
+    
+    Returns:
+        Tuple of (documents, error message or None)
+    """
+    file_extension = os.path.splitext(file_path)[1].lower()
+    try:
+        return LOADERS[file_extension](file_path).load(), None
+    except Exception as e:
+        return [], str(e)
+
+
+def _prefetch(file_paths):
+    """
+    Ask the kernel to start reading files into the page cache in the background
+    
+    The reads of all files are queued at once, so the disk works on later
+    files while the loaders parse earlier ones. Does nothing where
+    posix_fadvise is unavailable (e.g. macOS).
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for file_path in file_paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
 def load_documents_from_directory(directory_path):
     """ Load all documents from a specified directory. """
     documents = []
     
-    # Create loaders for different file types
-    loaders = {
-        ".txt": TextLoader,
-        ".pdf": PyPDFLoader,
-        # Add other loaders for different file types as needed
-    }
+    paths = sorted(entry.path for entry in _iter_supported_files(directory_path))
+    
+    if not paths:
+        return documents
+    
+    _prefetch(paths)
+    
+    # Parse files in worker processes; a single file is not worth the pool start-up
+    if len(paths) == 1:
+        results = [_load_one(paths[0])]
+    else:
+        max_workers = min(len(paths), os.cpu_count() or 1)
+        # Spawned rather than forked: the background warm-up may be importing
+        # torch or FAISS on another thread, and a fork taken mid-import can
+        # leave the workers waiting on a lock that thread held
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=spawn) as pool:
+            results = list(pool.map(_load_one, paths))
     
-    for filename in os.listdir(directory_path):
-        file_path = os.path.join(directory_path, filename)
-        if os.path.isfile(file_path):
-            file_extension = os.path.splitext(filename)[1].lower()
-            if file_extension in loaders:
-                try:
-                    loader = loaders[file_extension](file_path)
-                    documents.extend(loader.load())
-                    print(f"Loaded document: {filename}")
-                except Exception as e:
-                    print(f"Error loading {filename}: {str(e)}")
+    for file_path, (file_documents, error) in zip(paths, results):
+        filename = os.path.basename(file_path)
+        if error is None:
+            documents.extend(file_documents)
+            print(f"Loaded document: {filename}")
+        else:
+            print(f"Error loading {filename}: {error}")
     
     return documents
 
 
-def vectorize_documents(directory_path, model_name=None, db_name="default"):
+def split_documents(documents):
+    """ Split loaded documents into overlapping chunks sized for the embedding model. """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return splitter.split_documents(documents)
+
+
+def _directory_fingerprint(directory_path):
+    """
+    Hash the state of the supported files in a directory
+    
+    Uses the sorted (filename, mtime, size) of each file so an unchanged corpus
+    can be detected without reading or embedding any document.
+    """
+    entries = []
+    for entry in _iter_supported_files(directory_path):
+        stat = entry.stat()
+        entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    
+    digest = hashlib.sha256()
+    for filename, mtime, size in sorted(entries):
+        digest.update(f"{filename}\0{mtime}\0{size}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _index_settings(model_name):
+    """ Settings the stored index was built with; it is only reused while they all match """
+    return {
+        "model": model_name,
+        "metric": INDEX_METRIC,
+        "index_setting": db_config.vector_index_type,
+        "embedding_backend": db_config.embedding_backend,
+        "embedding_onnx_file": db_config.embedding_onnx_file if db_config.embedding_backend == "onnx" else None,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+
+
+def _read_metadata(db_path):
+    """ Read the metadata.json sidecar of a vector database, if present. """
+    metadata_path = os.path.join(db_path, "metadata.json")
+    if not os.path.exists(metadata_path):
+        return None
+    try:
+        with open(metadata_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def vectorize_documents(directory_path, model_name=None, db_name="default", batch_size=None, use_cache=True):
     """
     Vectorize documents from a directory and save the vector database
     
@@ -64,6 +392,9 @@ def vectorize_documents(directory_path, model_name=None, db_name="default"):
         directory_path: Path to the directory containing documents
         model_name: Name of the embedding model to use
         db_name: Name of the database to save
+        batch_size: Chunks embedded per batch (default: EMBEDDING_BATCH_SIZE)
+        use_cache: Reuse the existing index or cached embeddings of unchanged
+            chunks; False re-embeds everything
         
     Returns:
         Path to the saved vector database
@@ -74,11 +405,24 @@ def vectorize_documents(directory_path, model_name=None, db_name="default"):
         
     # Check if using external vector database
     if using_external_db():
-        return _vectorize_documents_external(directory_path, model_name, db_name)
+        return _vectorize_documents_external(directory_path, model_name, db_name, batch_size)
     
     # Using local FAISS database
     # Create the vector database directory if it doesn't exist
     os.makedirs(VECTOR_DB_PATH, exist_ok=True)
+    db_path = os.path.join(VECTOR_DB_PATH, db_name)
+    
+    # Skip re-embedding when the source files and index settings are unchanged
+    source_hash = _directory_fingerprint(directory_path)
+    settings = _index_settings(model_name)
+    existing = _read_metadata(db_path)
+    if (use_cache
+            and existing
+            and existing.get("source_hash") == source_hash
+            and all(existing.get(key) == value for key, value in settings.items())
+            and os.path.exists(os.path.join(db_path, "index.faiss"))):
+        print(f"Documents in {directory_path} are unchanged, reusing {db_path}")
+        return db_path
     
     # Load documents
     documents = load_documents_from_directory(directory_path)
@@ -86,32 +430,48 @@ def vectorize_documents(directory_path, model_name=None, db_name="default"):
         print(f"No documents found in {directory_path}")
         return None
     
+    # Split into chunks so each piece fits the embedding model's input
+    chunks = split_documents(documents)
+    
     # Create embeddings
-    embedding_model = HuggingFaceEmbeddings(model_name=model_name)
+    embedding_model = get_embedder(model_name, batch_size)
+    
+    # Only chunks whose text is new to the embedding cache are embedded
+    embedding_cache = get_embedding_cache() if use_cache else None
+    embed_documents = None
+    if embedding_cache is not None:
+        embed_documents = functools.partial(embedding_cache.embed_documents, embedding_model, model_name)
     
     # Create vector store
-    vector_store = FAISS.from_documents(documents, embedding_model)
+    vector_store, index_type = build_vector_store(chunks, embedding_model, embed_documents)
     
     # Save vector store
-    db_path = os.path.join(VECTOR_DB_PATH, db_name)
     vector_store.save_local(db_path)
     
+    # Hand the freshly built store to load_vector_db instead of reading it back from disk
+    _VECTOR_STORE_CACHE[(db_path, model_name)] = (
+        os.stat(os.path.join(db_path, "index.faiss")).st_mtime_ns, vector_store
+    )
+    
     # Save metadata
     metadata = {
         "created_at": datetime.datetime.now().isoformat(),
         "document_count": len(documents),
-        "model": model_name,
-        "source_directory": directory_path
+        "chunk_count": len(chunks),
+        "index_type": index_type,
+        "source_directory": directory_path,
+        "source_hash": source_hash,
+        **settings,
     }
     
     with open(os.path.join(db_path, "metadata.json"), "w") as f:
         json.dump(metadata, f, indent=2)
     
-    print(f"Vectorized {len(documents)} documents and saved to {db_path}")
+    print(f"Vectorized {len(documents)} documents ({len(chunks)} chunks) and saved to {db_path}")
     return db_path
 
 
-def _vectorize_documents_external(directory_path, model_name, db_name):
+def _vectorize_documents_external(directory_path, model_name, db_name, batch_size=None):
     """
     Vectorize documents and store in external vector database
     
@@ -135,7 +495,7 @@ def _vectorize_documents_external(directory_path, model_name, db_name):
         print(f"Target table: {table_name}")
         
         # Create embeddings
-        embedding_model = HuggingFaceEmbeddings(model_name=model_name)
+        embedding_model = get_embedder(model_name, batch_size)
         
         # In a real implementation, you would:
         # 1. Connect to your external vector database 
@@ -179,18 +539,43 @@ def load_vector_db(db_name="default", model_name=None):
         print(f"Vector database {db_name} not found at {db_path}")
         return None
     
-    embedding_model = HuggingFaceEmbeddings(model_name=model_name)
+    # Reuse the store loaded earlier in this process unless the index was rebuilt since
+    index_path = os.path.join(db_path, "index.faiss")
+    cache_key = (db_path, model_name)
+    try:
+        index_mtime = os.stat(index_path).st_mtime_ns
+    except OSError:
+        index_mtime = None
+    cached = _VECTOR_STORE_CACHE.get(cache_key)
+    if cached is not None and index_mtime is not None and cached[0] == index_mtime:
+        return cached[1]
+    
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+    
+    embedding_model = get_embedder(model_name)
     
     try:
-        vector_store = FAISS.load_local(db_path, embedding_model)
+        # Databases built before the metric was recorded use FAISS's default L2 index
+        metadata = _read_metadata(db_path) or {}
+        if metadata.get("metric") == "inner_product":
+            distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+        else:
+            distance_strategy = DistanceStrategy.EUCLIDEAN_DISTANCE
+        
+        # The index was written by vectorize_documents, so its pickled docstore is trusted
+        vector_store = FAISS.load_local(
+            db_path, embedding_model,
+            allow_dangerous_deserialization=True,
+            distance_strategy=distance_strategy,
+        )
+        _apply_search_params(vector_store.index)
         print(f"Loaded vector database from {db_path}")
+        if index_mtime is not None:
+            _VECTOR_STORE_CACHE[cache_key] = (index_mtime, vector_store)
         
-        # Load metadata if available
-        metadata_path = os.path.join(db_path, "metadata.json")
-        if os.path.exists(metadata_path):
-            with open(metadata_path, "r") as f:
-                metadata = json.load(f)
-                print(f"Database contains {metadata.get('document_count', 'unknown')} documents")
+        if metadata:
+            print(f"Database contains {metadata.get('document_count', 'unknown')} documents")
         
         return vector_store
     except Exception as e:
@@ -218,9 +603,9 @@ def _load_vector_db_external(db_name, model_name):
         
         # For this demo, create a mock FAISS vector store
         from langchain_core.documents import Document
-        from langchain_core.vectorstores import VectorStoreRetriever
+        from langchain_community.vectorstores import FAISS
         
-        embedding_model = HuggingFaceEmbeddings(model_name=model_name)
+        embedding_model = get_embedder(model_name)
         
         # Create a simple mock document
         mock_docs = [
@@ -270,6 +655,13 @@ def generate_retriever(
     if not llm:
         return retriever
 
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain.chains import (
+        create_history_aware_retriever,
+        create_retrieval_chain,
+    )
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    
     # Get LLM configuration
     llm_config = db_config.get_llm_config()
     print(f"Using LLM at {llm_config['host']}:{llm_config['port']} with model {llm_config['model']}")
@@ -317,14 +709,51 @@ def generate_retriever(
         history_aware_retriever, question_answer_chain
     )
 
-    def ask_question(question):
-        """ Ask a question using the retrieval chain. """
-        response = RET_CHAIN({"input": question, "chat_history": CHAT_HISTORY})
-        CHAT_HISTORY.append((question, response["output"]))
-        return response["output"]
+    def ask_question(question, stream=True):
+        """
+        Ask a question using the retrieval chain
+        
+        With stream=True the answer is written to stdout as tokens arrive.
+        """
+        parts = []
+        for chunk in RET_CHAIN.stream({"input": question, "chat_history": list(CHAT_HISTORY)}):
+            token = chunk.get("answer", "")
+            if token:
+                parts.append(token)
+                if stream:
+                    sys.stdout.write(token)
+                    sys.stdout.flush()
+        if stream:
+            sys.stdout.write("\n")
+        answer = "".join(parts)
+        CHAT_HISTORY.append((question, answer))
+        return answer
     return ask_question
 
 
+@functools.lru_cache(maxsize=32)
+def _embed_query(model_name, query):
+    """ Embed a search query, reusing the vector when several databases are searched for it """
+    import numpy as np
+    
+    # Normalized here too, so inner-product scores are cosine similarities
+    # whatever the embedding backend returns
+    vector = np.asarray(get_embedder(model_name).embed_query(query), dtype=np.float32)
+    vector /= np.linalg.norm(vector) or 1.0
+    return tuple(vector.tolist())
+
+
+def _relevance_score(vector_store, score):
+    """ Convert a FAISS score to cosine similarity, higher being more relevant """
+    from langchain_community.vectorstores.utils import DistanceStrategy
+    
+    # Databases built before the switch to inner product return squared L2
+    # distances, which for unit vectors are 2 - 2 * cosine
+    if vector_store.distance_strategy == DistanceStrategy.EUCLIDEAN_DISTANCE:
+        return 1.0 - float(score) / 2.0
+    return float(score)
+
+
 def search_documents(query, db_name="default", model_name=None, k=5):
     """
     Search for documents in the vector database
@@ -336,7 +765,7 @@ def search_documents(query, db_name="default", model_name=None, k=5):
         k: Number of results to return
         
     Returns:
-        List of documents and their scores
+        List of documents and their cosine-similarity scores, most relevant first
     """
     # Use default model if not specified
     if model_name is None:
@@ -346,14 +775,16 @@ def search_documents(query, db_name="default", model_name=None, k=5):
     if not vector_store:
         return []
     
-    docs_with_scores = vector_store.similarity_search_with_score(query, k=k)
+    docs_with_scores = vector_store.similarity_search_with_score_by_vector(
+        list(_embed_query(model_name, query)), k=k
+    )
     results = []
     
     for doc, score in docs_with_scores:
         results.append({
             "content": doc.page_content,
             "metadata": doc.metadata,
-            "relevance_score": float(score)
+            "relevance_score": _relevance_score(vector_store, score)
         })
     
     return results
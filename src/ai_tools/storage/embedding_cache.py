@@ -0,0 +1,112 @@
+"""
+Persistent cache of document chunk embeddings, keyed by model and text
+"""
+import os
+import sqlite3
+import hashlib
+import threading
+from typing import TYPE_CHECKING, List, Optional
+
+from ai_tools.config.database import db_config
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL
+)
+"""
+
+# SQLite limits the number of parameters in one statement
+_LOOKUP_BATCH = 500
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+class EmbeddingCache:
+    """
+    Embeddings stored in SQLite as float32 bytes
+
+    Re-loading a directory only embeds the chunks whose text changed; the
+    others are read back from the cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+        return self._conn
+
+    def embed_documents(self, embedder, model_name: str, texts: List[str]) -> "np.ndarray":
+        """
+        Embed texts, only passing those not cached yet to the embedding model
+
+        Args:
+            embedder: Embedding model used for cache misses
+            model_name: Name of the model, part of the cache key
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix with one row per text, in order
+        """
+        import numpy as np
+
+        # The backend is part of the key: ONNX and torch give slightly different
+        # vectors, as do different ONNX weight files
+        backend = db_config.embedding_backend
+        if backend == "onnx":
+            backend = f"onnx:{db_config.embedding_onnx_file}"
+        namespace = f"{backend}\0{model_name}\0".encode("utf-8")
+        keys = [hashlib.sha256(namespace + text.encode("utf-8")).hexdigest() for text in texts]
+
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start:start + _LOOKUP_BATCH]
+                found.update(conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = np.asarray(embedder.embed_documents(list(missing.values())), dtype=np.float32)
+            new_rows = [(key, vector.tobytes()) for key, vector in zip(missing, vectors)]
+            with self._lock, self._connect():
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", new_rows)
+            found.update(new_rows)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([np.frombuffer(found[key], dtype=np.float32) for key in keys])
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the shared embedding cache
+
+    Returns:
+        The cache, or None when EMBEDDING_CACHE_ENABLED is off
+    """
+    global _CACHE
+    if not db_config.embedding_cache_enabled:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = EmbeddingCache(db_config.embedding_cache_path)
+    return _CACHE
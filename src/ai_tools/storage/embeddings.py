@@ -0,0 +1,74 @@
+"""
+Embedding model helpers shared by the document storage functions
+"""
+import functools
+from typing import TYPE_CHECKING, Optional, Union
+
+from ai_tools.config.database import db_config
+
+if TYPE_CHECKING:
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from ai_tools.storage.ollama_embeddings import OllamaEmbeddings
+
+# Number of texts encoded per forward pass when embedding documents
+EMBEDDING_BATCH_SIZE = 64
+
+
+def get_embedder(model_name: str, batch_size: Optional[int] = None) -> Union["HuggingFaceEmbeddings", "OllamaEmbeddings"]:
+    """
+    Get the embedding model for the given name, loading it only once per process
+
+    With EMBEDDING_BACKEND=onnx the model runs through ONNX Runtime using the
+    quantized weights named by EMBEDDING_ONNX_FILE (requires optimum[onnxruntime]).
+    With EMBEDDING_BACKEND=ollama the model is served by the configured Ollama
+    server. Otherwise it runs on the GPU in fp16 when CUDA is available.
+
+    Args:
+        model_name: Name of the sentence-transformers (or Ollama) model to load
+        batch_size: Texts encoded per forward pass, or sent per Ollama request
+            (default: EMBEDDING_BATCH_SIZE)
+
+    Returns:
+        Cached embedding model instance
+    """
+    # Resolved here so the default and an explicit 64 share one cached model
+    return _load_embedder(model_name, batch_size or EMBEDDING_BATCH_SIZE)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_embedder(model_name, batch_size):
+    if db_config.embedding_backend == "ollama":
+        from ai_tools.storage.ollama_embeddings import OllamaEmbeddings
+        
+        return OllamaEmbeddings(
+            model=model_name,
+            base_url=f"http://{db_config.llm_host}:{db_config.llm_port}",
+            batch_size=batch_size,
+        )
+    
+    # Deferred: loading sentence-transformers and torch takes seconds
+    from langchain_huggingface import HuggingFaceEmbeddings
+    
+    model_kwargs = {}
+    if db_config.embedding_backend == "onnx":
+        model_kwargs = {
+            "backend": "onnx",
+            "model_kwargs": {"file_name": db_config.embedding_onnx_file},
+        }
+    else:
+        import torch
+        
+        if torch.cuda.is_available():
+            model_kwargs = {
+                "device": "cuda",
+                "model_kwargs": {"torch_dtype": torch.float16},
+            }
+
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={
+            "batch_size": batch_size,
+            "normalize_embeddings": True,
+        },
+    )
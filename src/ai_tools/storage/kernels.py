@@ -0,0 +1,67 @@
+"""
+Numeric kernels for small in-process vector searches that don't use FAISS
+"""
+import threading
+from typing import Tuple
+
+import numpy as np
+
+# Numba is optional; without it the kernels fall back to NumPy
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _row_scores(query, matrix):
+        scores = np.empty(matrix.shape[0], np.float32)
+        for i in prange(matrix.shape[0]):
+            total = np.float32(0.0)
+            for j in range(matrix.shape[1]):
+                total += query[j] * matrix[i, j]
+            scores[i] = total
+        return scores
+else:
+    def _row_scores(query, matrix):
+        return matrix @ query
+
+
+def topk_cosine(query: np.ndarray, matrix: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the rows of a matrix most similar to a query vector
+
+    Both the query and the rows must already be L2-normalized, so the inner
+    product is their cosine similarity.
+
+    Args:
+        query: Query vector of shape (dim,)
+        matrix: float32 matrix of shape (n, dim)
+        k: Number of rows to return
+
+    Returns:
+        Tuple of (row indices, scores), best match first
+    """
+    scores = _row_scores(
+        np.ascontiguousarray(query, dtype=np.float32),
+        np.ascontiguousarray(matrix, dtype=np.float32),
+    )
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return top, scores[top]
+
+
+def warm_up_in_background() -> None:
+    """ Compile the Numba kernels on a background thread so the first real search doesn't wait """
+    if njit is None:
+        return
+    threading.Thread(
+        target=topk_cosine,
+        args=(np.ones(1, np.float32), np.ones((1, 1), np.float32), 1),
+        name="kernel-warmup",
+        daemon=True,
+    ).start()
@@ -0,0 +1,96 @@
+"""
+Embedding model served by an Ollama server
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ai_tools.backend.session import OLLAMA_POOL_MAXSIZE, OLLAMA_SESSION
+
+# Default number of texts sent per /api/embed request
+OLLAMA_EMBED_BATCH_SIZE = 64
+# Concurrent per-text requests when the server lacks the batch endpoint
+OLLAMA_EMBED_WORKERS = OLLAMA_POOL_MAXSIZE
+
+
+class OllamaEmbeddings(Embeddings):
+    """ Embed texts with an Ollama embedding model such as nomic-embed-text """
+
+    def __init__(self, model: str, base_url: str, timeout: float = 60,
+                 batch_size: int = OLLAMA_EMBED_BATCH_SIZE):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.batch_size = batch_size
+        # None until the first request shows whether /api/embed is available
+        self._batch_supported = None
+        self._session = OLLAMA_SESSION
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """ Embed a list of texts, in batches where the server supports it """
+        if not texts:
+            return []
+
+        vectors = None
+        if self._batch_supported is not False:
+            vectors = self._embed_batches(texts)
+        if vectors is None:
+            with ThreadPoolExecutor(max_workers=min(OLLAMA_EMBED_WORKERS, len(texts))) as pool:
+                vectors = list(pool.map(self._embed_one, texts))
+        return _normalize(vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        """ Embed a single query text """
+        return self.embed_documents([text])[0]
+
+    def _embed_batches(self, texts):
+        """ Embed texts through /api/embed, or return None if the server doesn't support it """
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self._session.post(
+                f"{self.base_url}/api/embed",
+                json={"model": self.model, "input": texts[start:start + self.batch_size]},
+                timeout=self.timeout,
+            )
+            # Servers older than Ollama 0.3 only have the per-text endpoint
+            if (response.status_code == 404 and self._batch_supported is None
+                    and _is_missing_endpoint(response)):
+                self._batch_supported = False
+                return None
+            response.raise_for_status()
+            self._batch_supported = True
+            vectors.extend(response.json()["embeddings"])
+        return vectors
+
+    def _embed_one(self, text):
+        """ Embed one text through the legacy /api/embeddings endpoint """
+        response = self._session.post(
+            f"{self.base_url}/api/embeddings",
+            json={"model": self.model, "prompt": text},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()["embedding"]
+
+
+def _is_missing_endpoint(response):
+    """ Whether a 404 is for the endpoint itself rather than, say, a model that isn't pulled
+    
+    Ollama answers errors of endpoints it has with a JSON body holding an
+    "error" message; an unknown path gets a plain-text page.
+    """
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return not (isinstance(body, dict) and "error" in body)
+
+
+def _normalize(vectors):
+    """ Scale vectors to unit length, as the inner-product indexes expect """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).tolist()
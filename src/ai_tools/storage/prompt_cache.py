@@ -0,0 +1,221 @@
+"""
+Persistent cache of LLM responses, keyed by model and prompt
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+
+from ai_tools.config.database import db_config
+
+# Prompt embeddings are kept out of SQLite, as rows of a float32 matrix file
+# per embedding dimension that is memory-mapped for semantic lookups;
+# vector_row is the entry's row in that file. template identifies the fixed
+# text around the part of the prompt that was embedded
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    template TEXT NOT NULL,
+    response TEXT NOT NULL,
+    vector_dim INTEGER,
+    vector_row INTEGER,
+    created_at REAL NOT NULL
+)
+"""
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _prompt_key(model: str, prompt: str) -> str:
+    # Hashed in parts rather than from a joined copy of a possibly long prompt
+    key = hashlib.sha256(model.encode("utf-8"))
+    key.update(b"\0")
+    key.update(prompt.encode("utf-8"))
+    return key.hexdigest()
+
+
+def _template_key(prompt: str, query: str) -> str:
+    # The prompt with its query cut out, so prompts built from the same
+    # instructions share a key whatever the user asked
+    return hashlib.sha256(prompt.replace(query, "\0", 1).encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    Two-tier response cache stored in SQLite
+
+    Exact prompt matches are looked up by hash. When a similarity threshold is
+    set, a miss falls back to comparing the embedding of the prompt's query
+    (the part that varies, such as the user's question) with those of earlier
+    prompts built from the same template for the same model. Embedding a
+    long fixed instruction as well would make every prompt using it look
+    alike. With a TTL, entries older than that
+    many seconds are ignored until a new response replaces them.
+    """
+
+    def __init__(self, path: str, similarity: float = 0.0, ttl: float = 0.0):
+        self.path = path
+        self.similarity = similarity
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        # (key, embedding) of the last prompt looked up, reused when its
+        # response is stored; always replaced and read as a whole tuple, since
+        # several threads can use the cache at once
+        self._last_embedding = (None, None)
+        if similarity > 0:
+            from ai_tools.storage.kernels import warm_up_in_background
+            
+            warm_up_in_background()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            # WAL lets lookups from other processes run while a response is
+            # written, and each commit only appends to the log; losing the last
+            # entries on power failure is acceptable for a cache
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+            if columns and not {"vector_row", "template"} <= columns:
+                # Written by an older version; it's only a cache
+                self._conn.execute("DROP TABLE responses")
+            self._conn.execute(_SCHEMA)
+        return self._conn
+    
+    def _vectors_path(self, dim):
+        return f"{self.path}.{dim}d.f32"
+    
+    def _append_vector(self, vector) -> int:
+        """ Append an embedding to its matrix file and return its row number
+        
+        Must be called inside a write transaction, which keeps other processes
+        from appending to the same file at the same time.
+        """
+        with open(self._vectors_path(len(vector)), "ab") as f:
+            row = f.tell() // vector.nbytes
+            # Realign if a previous write was cut short
+            f.truncate(row * vector.nbytes)
+            f.write(vector.tobytes())
+        return row
+    
+    def _load_vectors(self, dim):
+        """ Memory-map the embedding matrix for the given dimension """
+        import numpy as np
+        
+        path = self._vectors_path(dim)
+        try:
+            rows = os.path.getsize(path) // (4 * dim)
+        except OSError:
+            return None
+        if rows == 0:
+            return None
+        return np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
+
+    def get(self, model: str, prompt: str, query: Optional[str] = None) -> Optional[str]:
+        """
+        Get the cached response for a prompt
+
+        Args:
+            model: Model the response was generated with
+            prompt: Full prompt text
+            query: Part of the prompt compared for near matches (default: the whole prompt)
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        query = prompt if query is None else query
+        key = _prompt_key(model, prompt)
+        oldest = time.time() - self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?", (key, oldest)
+            ).fetchone()
+            if row is not None:
+                return row[0]
+            if self.similarity <= 0:
+                return None
+
+        embedding = self._embed(key, query)
+        with self._lock:
+            # Entries embedded with a different dimension live in another file
+            rows = self._conn.execute(
+                "SELECT response, vector_row FROM responses "
+                "WHERE model = ? AND template = ? AND vector_dim = ? AND created_at >= ?",
+                (model, _template_key(prompt, query), len(embedding), oldest),
+            ).fetchall()
+            vectors = self._load_vectors(len(embedding)) if rows else None
+        if vectors is None:
+            return None
+        rows = [row for row in rows if row[1] < len(vectors)]
+        if not rows:
+            return None
+
+        from ai_tools.storage.kernels import topk_cosine
+
+        best, scores = topk_cosine(embedding, vectors[[row[1] for row in rows]], 1)
+        return rows[best[0]][0] if scores[0] >= self.similarity else None
+
+    def put(self, model: str, prompt: str, response: str, query: Optional[str] = None) -> None:
+        """ Store the response generated for a prompt, with the same query as passed to get """
+        query = prompt if query is None else query
+        key = _prompt_key(model, prompt)
+        embedding = self._embed(key, query) if self.similarity > 0 else None
+        with self._lock:
+            conn = self._connect()
+            # SQLite's write lock is held from the row assignment through the
+            # insert, so caches in other processes can't take the same row or
+            # truncate a vector that is still being written
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                vector_dim = vector_row = None
+                if embedding is not None:
+                    vector_dim, vector_row = len(embedding), self._append_vector(embedding)
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, _template_key(prompt, query), response, vector_dim, vector_row, time.time()),
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def _embed(self, key, query):
+        """ Normalized embedding of a prompt's query, computed once per lookup and store """
+        # One read, so the key and vector can't come from different threads' prompts
+        last_key, last_vector = self._last_embedding
+        if last_key == key:
+            return last_vector
+
+        import numpy as np
+        from ai_tools.storage.embeddings import get_embedder
+
+        vector = np.asarray(
+            get_embedder(db_config.default_embedding_model).embed_query(query), dtype=np.float32
+        )
+        vector /= np.linalg.norm(vector) or 1.0
+        self._last_embedding = (key, vector)
+        return vector
+
+
+def get_prompt_cache() -> Optional[PromptCache]:
+    """
+    Get the shared prompt cache
+
+    Returns:
+        The cache, or None when PROMPT_CACHE_ENABLED is off
+    """
+    global _CACHE
+    if not db_config.prompt_cache_enabled:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = PromptCache(
+                db_config.prompt_cache_path, db_config.prompt_cache_similarity, db_config.prompt_cache_ttl
+            )
+    return _CACHE
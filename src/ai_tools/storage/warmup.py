@@ -0,0 +1,77 @@
+"""
+Warm-up of the slow-to-initialize search components
+"""
+import logging
+import threading
+
+from ai_tools.config.database import db_config
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_kernels():
+    import numpy as np
+    from ai_tools.storage.kernels import topk_cosine
+
+    # Compiles (and caches on disk) the Numba kernels when Numba is installed
+    topk_cosine(np.ones(8, np.float32), np.ones((2, 8), np.float32), 1)
+
+
+def _warm_faiss():
+    import faiss
+
+    faiss.IndexFlatIP(8)
+
+
+def _warm_embedder():
+    from ai_tools.storage.embeddings import get_embedder
+
+    get_embedder(db_config.default_embedding_model).embed_query("warmup")
+
+
+def _warm_prompt_cache():
+    from ai_tools.storage.prompt_cache import get_prompt_cache
+
+    cache = get_prompt_cache()
+    if cache is not None:
+        cache._connect()
+
+
+# Warm-up steps, in the order they run
+_STEPS = (
+    ("kernels", _warm_kernels),
+    ("faiss", _warm_faiss),
+    ("embedding model", _warm_embedder),
+    ("prompt cache", _warm_prompt_cache),
+)
+
+
+def warmup(verbose: bool = False) -> bool:
+    """
+    Import, load and compile everything the first search would otherwise wait for
+
+    Args:
+        verbose: Whether to print each step as it completes
+
+    Returns:
+        True if every step succeeded
+    """
+    ok = True
+    for name, step in _STEPS:
+        try:
+            step()
+            if verbose:
+                print(f"Warmed up {name}")
+        except Exception as e:
+            ok = False
+            logger.warning(f"Warm-up of {name} failed: {e}")
+            if verbose:
+                print(f"Could not warm up {name}: {str(e)}")
+    return ok
+
+
+def warm_up_in_background() -> threading.Thread:
+    """ Run warmup() on a daemon thread and return the thread """
+    thread = threading.Thread(target=warmup, name="warmup", daemon=True)
+    thread.start()
+    return thread
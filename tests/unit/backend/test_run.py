@@ -1,9 +1,10 @@
 """Unit tests for the backend run module."""
+import asyncio
 import pytest
 import subprocess
 from unittest.mock import patch, MagicMock
 
-from ai_tools.backend.run import run_command, CommandResult
+from ai_tools.backend.run import run_command, run_command_async, split_simple_command, CommandResult
 
 
 def test_command_result_dataclass():
@@ -14,8 +15,9 @@ def test_command_result_dataclass():
     assert result.exit_code == 0
 
 
+@patch("ai_tools.backend.run.shutil.which", return_value="/bin/echo")
 @patch("subprocess.run")
-def test_run_command_success(mock_run):
+def test_run_command_success(mock_run, mock_which):
     """Test run_command with a successful command."""
     # Setup mock
     mock_result = MagicMock()
@@ -27,10 +29,10 @@ def test_run_command_success(mock_run):
     # Call function
     response = run_command("echo hello")
 
-    # Verify
+    # Verify the simple command was run without a shell
     mock_run.assert_called_once_with(
-        "echo hello",
-        shell=True,
+        ["echo", "hello"],
+        shell=False,
         capture_output=True,
         text=True,
         timeout=10,
@@ -41,6 +43,39 @@ def test_run_command_success(mock_run):
     assert response.exit_code == 0
 
 
+@patch("subprocess.run")
+def test_run_command_uses_shell_when_needed(mock_run):
+    """Test run_command falls back to the shell for commands using shell syntax."""
+    mock_run.return_value = MagicMock(stdout="3\n", stderr="", returncode=0)
+
+    response = run_command("ls | wc -l")
+
+    mock_run.assert_called_once_with(
+        "ls | wc -l",
+        shell=True,
+        capture_output=True,
+        text=True,
+        timeout=10,
+        check=False
+    )
+    assert response.stdout == "3\n"
+
+
+@pytest.mark.parametrize("command, expected", [
+    ("ls -la '/tmp/my dir'", ["ls", "-la", "/tmp/my dir"]),
+    ("ls *.py", None),
+    ("echo $HOME", None),
+    ("FOO=1 ls", None),
+    ("definitely_not_a_real_command_xyz", None),
+    ("echo 'unterminated", None),
+])
+def test_split_simple_command(command, expected):
+    """Test which commands are split into an argv rather than run through the shell."""
+    with patch("ai_tools.backend.run.shutil.which",
+               side_effect=lambda name: None if name.startswith("definitely") else f"/bin/{name}"):
+        assert split_simple_command(command) == expected
+
+
 @patch("subprocess.run")
 def test_run_command_error(mock_run):
     """Test run_command with a command that returns an error."""
@@ -90,4 +125,30 @@ def test_run_command_exception(mock_run):
     # Verify
     mock_run.assert_called_once()
     assert "Error executing command" in str(excinfo.value)
-    assert "Unknown error" in str(excinfo.value)
\ No newline at end of file
+    assert "Unknown error" in str(excinfo.value)
+
+
+def test_run_command_async_success():
+    """Test run_command_async with a successful command."""
+    response = asyncio.run(run_command_async("echo hello"))
+
+    assert response.stdout == "hello\n"
+    assert response.stderr == ""
+    assert response.exit_code == 0
+
+
+def test_run_command_async_error():
+    """Test run_command_async with a command that returns an error."""
+    response = asyncio.run(run_command_async("echo failed >&2; exit 3"))
+
+    assert response.stdout == ""
+    assert response.stderr == "failed\n"
+    assert response.exit_code == 3
+
+
+def test_run_command_async_timeout():
+    """Test run_command_async with a command that times out."""
+    with pytest.raises(TimeoutError) as excinfo:
+        asyncio.run(run_command_async("sleep 5", timeout=0.1))
+
+    assert "Command timed out after 0.1 seconds" in str(excinfo.value)
@@ -0,0 +1,69 @@
+"""Unit tests for the backend session module."""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from ai_tools.backend import session
+from ai_tools.backend.session import (
+    OLLAMA_POOL_MAXSIZE,
+    OLLAMA_SESSION,
+    get_async_ollama_client,
+    run_async,
+)
+
+
+def test_ollama_session_pools_connections():
+    """Test that the shared session keeps a connection pool for Ollama."""
+    adapter = OLLAMA_SESSION.get_adapter("http://localhost:11434/api/generate")
+    
+    assert adapter._pool_maxsize == OLLAMA_POOL_MAXSIZE
+    assert OLLAMA_SESSION.headers["Connection"] == "keep-alive"
+    assert OLLAMA_SESSION.get_adapter("https://ollama.example/api/generate") is adapter
+
+
+def test_async_client_shared_within_loop():
+    """Test that requests on one event loop share a client that is closed afterwards."""
+    async def get_clients():
+        first = get_async_ollama_client()
+        await asyncio.sleep(0)
+        return first, get_async_ollama_client()
+
+    first, second = run_async(get_clients())
+
+    assert first is second
+    assert first.is_closed
+
+
+def test_async_client_per_loop():
+    """Test that each event loop gets its own client."""
+    async def get_client():
+        return get_async_ollama_client()
+
+    assert run_async(get_client()) is not run_async(get_client())
+
+
+def test_async_client_http2_needs_h2(monkeypatch):
+    """Test that OLLAMA_HTTP2 only enables HTTP/2 when the h2 package is installed."""
+    monkeypatch.setenv("OLLAMA_HTTP2", "true")
+    
+    with patch("importlib.util.find_spec", return_value=None):
+        assert session._use_http2() is False
+    with patch("importlib.util.find_spec", return_value=object()):
+        assert session._use_http2() is True
+    
+    monkeypatch.setenv("OLLAMA_HTTP2", "false")
+    assert session._use_http2() is False
+
+
+def test_run_async_closes_client_on_error():
+    """Test that the client is closed when the coroutine raises."""
+    clients = []
+
+    async def fail():
+        clients.append(get_async_ollama_client())
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        run_async(fail())
+
+    assert clients[0].is_closed
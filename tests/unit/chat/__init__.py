@@ -0,0 +1 @@
+"""Chat test package."""
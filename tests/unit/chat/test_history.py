@@ -0,0 +1,181 @@
+"""Unit tests for the chat history module."""
+import json
+import weakref
+from unittest.mock import patch
+
+import pytest
+
+from ai_tools.chat import history
+from ai_tools.chat.history import ChatHistoryManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """History manager storing sessions in a temporary directory."""
+    monkeypatch.setattr(history, "EXTERNAL_HISTORY_DB_ENABLED", False)
+    return ChatHistoryManager(history_dir=str(tmp_path))
+
+
+def _history_lines(tmp_path, session_id):
+    return (tmp_path / session_id / history.HISTORY_FILE).read_text().splitlines()
+
+
+def test_messages_appended_as_json_lines(manager, tmp_path):
+    """Test that each message is appended to history.jsonl as one line."""
+    manager.start_new_session("chat")
+    manager.add_message("user", "Hello")
+    manager.add_message("assistant", "Hi", context={"source": "test"})
+    
+    lines = _history_lines(tmp_path, "chat")
+    
+    assert [json.loads(line)["content"] for line in lines] == ["Hello", "Hi"]
+    assert json.loads(lines[1])["context"] == {"source": "test"}
+    assert json.loads(lines[1])["id"] == "msg_1"
+
+
+def test_session_reloaded_and_appended_to(manager, tmp_path):
+    """Test that a reloaded session has its messages back and new ones are appended after them."""
+    manager.start_new_session("chat")
+    manager.add_message("user", "Hello")
+    manager.add_message("assistant", "Hi")
+    
+    reloaded = ChatHistoryManager(history_dir=str(tmp_path))
+    assert reloaded.load_session("chat") is True
+    reloaded.add_message("user", "Again")
+    
+    assert [message["content"] for message in reloaded.get_messages()] == ["Hello", "Hi", "Again"]
+    assert len(_history_lines(tmp_path, "chat")) == 3
+    assert reloaded.get_formatted_history() == [("Hello", "Hi")]
+
+
+def test_legacy_history_converted(manager, tmp_path):
+    """Test that a session saved as a single JSON array is loaded and rewritten as JSONL."""
+    session_dir = tmp_path / "old"
+    session_dir.mkdir()
+    messages = [
+        {"id": "msg_0", "timestamp": "2024-01-01T00:00:00", "role": "user", "content": "Hello", "context": {}},
+        {"id": "msg_1", "timestamp": "2024-01-01T00:00:01", "role": "assistant", "content": "Hi", "context": {}},
+    ]
+    (session_dir / history.LEGACY_HISTORY_FILE).write_text(json.dumps(messages, indent=2))
+    
+    assert manager.load_session("old") is True
+    manager.add_message("user", "Again")
+    
+    assert not (session_dir / history.LEGACY_HISTORY_FILE).exists()
+    assert not (session_dir / (history.HISTORY_FILE + ".tmp")).exists()
+    lines = _history_lines(tmp_path, "old")
+    assert [json.loads(line) for line in lines[:2]] == messages
+    assert json.loads(lines[2])["content"] == "Again"
+
+
+def test_load_missing_session(manager, capsys):
+    """Test that loading an unknown session fails without changing the current one."""
+    manager.start_new_session("chat")
+    
+    assert manager.load_session("missing") is False
+    assert manager.session_id == "chat"
+    assert "Session missing not found" in capsys.readouterr().out
+
+
+def test_load_session_without_history_file(manager, tmp_path, capsys):
+    """Test that a session directory without any history file is reported."""
+    (tmp_path / "empty").mkdir()
+    
+    assert manager.load_session("empty") is False
+    assert "History file not found for session empty" in capsys.readouterr().out
+
+
+def _metadata(tmp_path, session_id):
+    return json.loads((tmp_path / session_id / "metadata.json").read_text())
+
+
+def test_metadata_flushed_every_interval(manager, tmp_path):
+    """Test that metadata.json is only rewritten once per flush interval of messages."""
+    manager.start_new_session("chat")
+    assert _metadata(tmp_path, "chat")["message_count"] == 0
+    
+    for i in range(history.METADATA_FLUSH_INTERVAL - 1):
+        manager.add_message("user", f"message {i}")
+    assert _metadata(tmp_path, "chat")["message_count"] == 0
+    
+    manager.add_message("user", "last")
+    assert _metadata(tmp_path, "chat")["message_count"] == history.METADATA_FLUSH_INTERVAL
+
+
+def test_close_flushes_pending_metadata(manager, tmp_path):
+    """Test that close writes metadata for messages since the last flush."""
+    manager.start_new_session("chat")
+    manager.add_message("user", "Hello")
+    manager.add_message("assistant", "Hi")
+    
+    manager.close()
+    
+    metadata = _metadata(tmp_path, "chat")
+    assert metadata["message_count"] == 2
+    assert metadata["last_updated"] == manager.current_history[-1]["timestamp"]
+
+
+def test_new_session_flushes_previous_metadata(manager, tmp_path):
+    """Test that starting another session writes the previous session's pending metadata."""
+    manager.start_new_session("first")
+    manager.add_message("user", "Hello")
+    
+    manager.start_new_session("second")
+    
+    assert _metadata(tmp_path, "first")["message_count"] == 1
+    assert _metadata(tmp_path, "second")["message_count"] == 0
+
+
+def test_close_at_exit_skips_collected_manager(manager):
+    """Test that the exit hook flushes a live manager and ignores a collected one."""
+    with patch.object(manager, "close") as mock_close:
+        history._close_at_exit(weakref.ref(manager))
+    mock_close.assert_called_once()
+    
+    history._close_at_exit(lambda: None)
+
+
+def test_list_sessions_skips_files_and_missing_metadata(manager, tmp_path):
+    """Test that list_sessions ignores stray files and directories without metadata."""
+    manager.start_new_session("older")
+    (tmp_path / "older" / "metadata.json").write_text(
+        json.dumps({"id": "older", "created_at": "2024-01-01T00:00:00", "message_count": 0})
+    )
+    manager.start_new_session("newer")
+    manager.add_message("user", "Hello")
+    (tmp_path / "notes.txt").write_text("not a session")
+    (tmp_path / "no_metadata").mkdir()
+    
+    sessions = manager.list_sessions()
+    
+    assert [session["id"] for session in sessions] == ["newer", "older"]
+    assert sessions[0]["message_count"] == 1
+
+
+def test_list_sessions_reports_corrupt_metadata(manager, tmp_path, capsys):
+    """Test that unreadable metadata is reported and the session skipped."""
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "metadata.json").write_text("{not json")
+    
+    assert manager.list_sessions() == []
+    assert "Error loading metadata for session broken" in capsys.readouterr().out
+
+
+def test_history_written_compactly(manager, tmp_path):
+    """Test that history and metadata are written without indentation."""
+    manager.start_new_session("chat")
+    manager.add_message("user", "Hello")
+    
+    assert "\n" not in (tmp_path / "chat" / "metadata.json").read_text()
+    assert ", " not in _history_lines(tmp_path, "chat")[0]
+
+
+def test_timestamp_formatted_once_per_second(monkeypatch):
+    """Test that _now_iso reuses the formatted string within the same second."""
+    monkeypatch.setattr(history, "_LAST_TIMESTAMP", (0, ""))
+    with patch.object(history.time, "time", side_effect=[100.2, 100.9, 101.0]):
+        first, second, third = history._now_iso(), history._now_iso(), history._now_iso()
+    
+    assert first is second
+    assert first == history.datetime.datetime.fromtimestamp(100).isoformat()
+    assert third == history.datetime.datetime.fromtimestamp(101).isoformat()
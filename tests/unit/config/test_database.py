@@ -7,7 +7,7 @@ import sys
 import tempfile
 import shutil
 
-from ai_tools.config.database import DatabaseConfig, db_config
+from ai_tools.config.database import DatabaseConfig, db_config, _SPEC
 
 
 # Fixtures for common test setup
@@ -70,6 +70,24 @@ def test_singleton_pattern(reset_singleton):
     assert config1 is config2
 
 
+def test_singleton_does_not_reinitialize(setup_env, reset_singleton):
+    """Test that repeated construction keeps the loaded configuration."""
+    config = DatabaseConfig()
+    os.environ['OLLAMA_DB_HOST'] = 'changed-host'
+    
+    with patch.object(DatabaseConfig, '_initialize') as mock_initialize:
+        assert DatabaseConfig() is config
+        mock_initialize.assert_not_called()
+    assert config.db_host == 'localhost'
+
+
+def test_default_data_paths(setup_env, reset_singleton):
+    """Test that local paths default to the package data directory."""
+    config = DatabaseConfig(force_init=True)
+    assert os.path.normpath(config.vector_db_path).endswith(os.path.join('data', 'vector_db'))
+    assert os.path.normpath(config.history_db_path).endswith(os.path.join('data', 'chat_history'))
+
+
 def test_default_configuration(setup_env, reset_singleton):
     """Test default configuration values."""
     config = DatabaseConfig()
@@ -119,6 +137,45 @@ def test_environment_variable_override(setup_env, reset_singleton):
     assert config.llm_model == 'test-model'
 
 
+@pytest.mark.parametrize("attr,key,default,cast", _SPEC, ids=[spec[1] for spec in _SPEC])
+def test_spec_defaults(setup_env, reset_singleton, monkeypatch, attr, key, default, cast):
+    """Test that every table-driven setting falls back to its parsed default."""
+    monkeypatch.delenv(key, raising=False)
+    assert getattr(DatabaseConfig(force_init=True), attr) == cast(default)
+
+
+@pytest.mark.parametrize("attr,key,raw,expected", [
+    ('vector_index_type', 'VECTOR_INDEX_TYPE', 'HNSW', 'hnsw'),
+    ('vector_hnsw_ef_search', 'VECTOR_HNSW_EF_SEARCH', '128', 128),
+    ('vector_ivf_nprobe', 'VECTOR_IVF_NPROBE', '16', 16),
+    ('chat_history_turns', 'CHAT_HISTORY_TURNS', '4', 4),
+    ('embedding_backend', 'EMBEDDING_BACKEND', 'ONNX', 'onnx'),
+    ('embedding_onnx_file', 'EMBEDDING_ONNX_FILE', 'onnx/model_quint8_avx2.onnx', 'onnx/model_quint8_avx2.onnx'),
+    ('prompt_cache_enabled', 'PROMPT_CACHE_ENABLED', 'true', True),
+    ('prompt_cache_similarity', 'PROMPT_CACHE_SIMILARITY', '0.92', 0.92),
+    ('prompt_cache_ttl', 'PROMPT_CACHE_TTL', '3600', 3600.0),
+    ('embedding_cache_enabled', 'EMBEDDING_CACHE_ENABLED', 'false', False),
+    ('warmup_enabled', 'AI_TOOLS_WARMUP', 'true', True),
+])
+def test_spec_overrides(setup_env, reset_singleton, monkeypatch, attr, key, raw, expected):
+    """Test that table-driven settings parse their environment variable."""
+    monkeypatch.setenv(key, raw)
+    assert getattr(DatabaseConfig(force_init=True), attr) == expected
+
+
+@pytest.mark.parametrize("attr,key,filename", [
+    ('prompt_cache_path', 'PROMPT_CACHE_PATH', 'prompt_cache.sqlite3'),
+    ('embedding_cache_path', 'EMBEDDING_CACHE_PATH', 'embedding_cache.sqlite3'),
+])
+def test_cache_paths(setup_env, reset_singleton, monkeypatch, attr, key, filename):
+    """Test that cache files default to the package data directory and can be moved."""
+    monkeypatch.delenv(key, raising=False)
+    assert getattr(DatabaseConfig(force_init=True), attr).endswith(os.path.join('data', filename))
+    
+    monkeypatch.setenv(key, '/tmp/cache.sqlite3')
+    assert getattr(DatabaseConfig(force_init=True), attr) == '/tmp/cache.sqlite3'
+
+
 def test_get_vector_db_config(setup_env, temp_dir, reset_singleton):
     """Test get_vector_db_config method."""
     # Set up test values
@@ -189,6 +246,17 @@ def test_get_llm_config(setup_env, reset_singleton):
     assert llm_config['api_key'] == 'test-api-key'
 
 
+def test_config_getters_return_shared_read_only_mappings(setup_env, reset_singleton):
+    """Test that config getters return the same read-only mapping on every call."""
+    config = DatabaseConfig(force_init=True)
+    
+    for getter in (config.get_vector_db_config, config.get_history_db_config, config.get_llm_config):
+        mapping = getter()
+        assert getter() is mapping
+        with pytest.raises(TypeError):
+            mapping['host'] = 'changed'
+
+
 def test_get_vector_table_name(setup_env, reset_singleton):
     """Test get_vector_table_name method."""
     os.environ['VECTOR_TABLE_PREFIX'] = 'v_'
@@ -1,19 +1,28 @@
 """Unit tests for the MCP actions module."""
+import io
 import os
 import json
+import time
 import pytest
+import subprocess
 from unittest.mock import patch, MagicMock
 
+import httpx
 import requests
 
+from ai_tools.backend.session import run_async
 from ai_tools.mcp.actions import (
     get_ollama_url,
+    get_ollama_tags_url,
     get_ollama_model,
+    get_ollama_keep_alive,
     ask_llm_to_explain_error,
     ask_llm_for_command,
     run_command,
     run_ai_command,
     prompt_ollama_http,
+    prompt_ollama_http_async,
+    prompt_ollama_batch,
     handle_mcp_action,
     MCP_ACTIONS
 )
@@ -59,6 +68,14 @@ def test_get_ollama_url(setup_env):
     expected_url = "http://test-host:8000/api/generate"
     assert get_ollama_url() == expected_url
 
+def test_get_ollama_tags_url(setup_env):
+    """Test that the tags URL follows the same host and port as the API URL."""
+    assert get_ollama_tags_url() == "http://localhost:11434/api/tags"
+    
+    os.environ['OLLAMA_HOST'] = 'test-host'
+    os.environ['OLLAMA_PORT'] = '8000'
+    assert get_ollama_tags_url() == "http://test-host:8000/api/tags"
+
 def test_get_ollama_model(setup_env):
     """Test the get_ollama_model function."""
     assert get_ollama_model() == 'test-model'
@@ -67,7 +84,16 @@ def test_get_ollama_model(setup_env):
     os.environ['OLLAMA_MODEL'] = 'different-model'
     assert get_ollama_model() == 'different-model'
 
-@patch('requests.post')
+def test_get_ollama_keep_alive(setup_env):
+    """Test the get_ollama_keep_alive function."""
+    with patch.dict(os.environ):
+        os.environ.pop('OLLAMA_KEEP_ALIVE', None)
+        assert get_ollama_keep_alive() == '1h'
+        
+        os.environ['OLLAMA_KEEP_ALIVE'] = '-1'
+        assert get_ollama_keep_alive() == '-1'
+
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
 def test_ask_llm_to_explain_error(mock_post, setup_env):
     """Test the ask_llm_to_explain_error function."""
     # Setup mock response
@@ -89,7 +115,17 @@ def test_ask_llm_to_explain_error(mock_post, setup_env):
     # Check the result
     assert result == "This is a test explanation"
 
-@patch('requests.post')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
+def test_ask_llm_to_explain_error_strips_markdown(mock_post, setup_env):
+    """Test that code fences and inline backticks are removed from the explanation."""
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"response": "```\nRun `ls -la` first\n```"}
+    mock_response.raise_for_status.return_value = None
+    mock_post.return_value = mock_response
+    
+    assert ask_llm_to_explain_error("test command", "test error") == "\nRun ls -la first\n"
+
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
 def test_ask_llm_to_explain_error_timeout(mock_post, setup_env):
     """Test the ask_llm_to_explain_error function when timeout occurs."""
     mock_post.side_effect = requests.exceptions.ReadTimeout()
@@ -97,7 +133,7 @@ def test_ask_llm_to_explain_error_timeout(mock_post, setup_env):
     result = ask_llm_to_explain_error("test command", "test error")
     assert result == "Error: The request to the Ollama server timed out."
 
-@patch('requests.post')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
 def test_ask_llm_to_explain_error_request_exception(mock_post, setup_env):
     """Test the ask_llm_to_explain_error function when request exception occurs."""
     mock_post.side_effect = requests.exceptions.RequestException("test exception")
@@ -105,7 +141,59 @@ def test_ask_llm_to_explain_error_request_exception(mock_post, setup_env):
     result = ask_llm_to_explain_error("test command", "test error")
     assert result == "Error: Failed to connect to the Ollama server. test exception"
 
-@patch('requests.post')
+@patch('ai_tools.mcp.actions.get_prompt_cache')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
+def test_ask_llm_to_explain_error_cached(mock_post, mock_get_cache, tmp_path, setup_env):
+    """Test that a repeated error explanation is served from the prompt cache."""
+    from ai_tools.storage.prompt_cache import PromptCache
+    mock_get_cache.return_value = PromptCache(str(tmp_path / "cache.sqlite3"))
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"response": "This is a test explanation"}
+    mock_post.return_value = mock_response
+    
+    first = ask_llm_to_explain_error("test command", "test error")
+    second = ask_llm_to_explain_error("test command", "test error")
+    
+    mock_post.assert_called_once()
+    assert first == second == "This is a test explanation"
+
+@patch('ai_tools.mcp.actions.get_prompt_cache')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
+def test_ask_llm_to_explain_error_caches_by_query(mock_post, mock_get_cache, setup_env):
+    """Test that near matches of an explanation are looked up by the command and error, not the instructions."""
+    cache = MagicMock()
+    cache.get.return_value = None
+    mock_get_cache.return_value = cache
+    mock_post.return_value.json.return_value = {"response": "explanation"}
+    
+    ask_llm_to_explain_error("ls /missing", "No such file")
+    
+    prompt, query = cache.get.call_args[0][1:]
+    assert query == "Command: ls /missing\n\nError: No such file"
+    assert query in prompt and prompt != query
+    cache.put.assert_called_once_with(cache.get.call_args[0][0], prompt, "explanation", query)
+
+@patch('ai_tools.mcp.actions.get_prompt_cache')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
+def test_ask_llm_to_explain_error_cache_expires(mock_post, mock_get_cache, tmp_path, setup_env):
+    """Test that a cached explanation older than the TTL is asked for again."""
+    from ai_tools.storage.prompt_cache import PromptCache
+    mock_get_cache.return_value = PromptCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"response": "This is a test explanation"}
+    mock_post.return_value = mock_response
+    
+    with patch('ai_tools.storage.prompt_cache.time.time', return_value=1000.0):
+        ask_llm_to_explain_error("test command", "test error")
+    with patch('ai_tools.storage.prompt_cache.time.time', return_value=1030.0):
+        ask_llm_to_explain_error("test command", "test error")
+    assert mock_post.call_count == 1
+    
+    with patch('ai_tools.storage.prompt_cache.time.time', return_value=1100.0):
+        ask_llm_to_explain_error("test command", "test error")
+    assert mock_post.call_count == 2
+
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
 def test_ask_llm_for_command(mock_post, setup_env):
     """Test the ask_llm_for_command function."""
     # Setup mock response
@@ -126,44 +214,134 @@ def test_ask_llm_for_command(mock_post, setup_env):
     # Check the result
     assert result == "ls -la"
 
-@patch('subprocess.check_output')
-def test_run_command_success(mock_check_output, setup_env):
+@patch('ai_tools.mcp.actions.get_prompt_cache')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
+def test_ask_llm_for_command_skips_prompt_cache(mock_post, mock_get_cache, setup_env):
+    """Test that a command cached for a similar prompt is never returned for execution."""
+    cache = MagicMock()
+    cache.get.return_value = "rm a.txt"
+    mock_get_cache.return_value = cache
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"response": "rm b.txt"}
+    mock_post.return_value = mock_response
+    
+    result = ask_llm_for_command("delete b.txt")
+    
+    assert result == "rm b.txt"
+    cache.get.assert_not_called()
+    cache.put.assert_not_called()
+
+def _fake_process(output: bytes, returncode: int = 0):
+    """Mock of a Popen process whose stdout yields the given output."""
+    process = MagicMock()
+    process.__enter__.return_value = process
+    process.stdout = io.BytesIO(output)
+    process.wait.return_value = returncode
+    return process
+
+@patch('ai_tools.backend.run.shutil.which', return_value='/bin/ls')
+@patch('subprocess.Popen')
+def test_run_command_success(mock_popen, mock_which, setup_env):
     """Test the run_command function on successful execution."""
-    mock_check_output.return_value = "command output"
+    mock_popen.return_value = _fake_process(b"command output\n")
     
     result = run_command("ls")
     
-    # Verify subprocess.check_output was called correctly
-    mock_check_output.assert_called_once_with(['/bin/bash', '-c', 'ls'], 
-                                              stderr=-2, 
-                                              text=True, 
-                                              timeout=5)
+    # Verify simple commands are executed directly, without a shell
+    mock_popen.assert_called_once_with(['ls'], 
+                                       stdout=subprocess.PIPE, 
+                                       stderr=subprocess.STDOUT,
+                                       start_new_session=(os.name == "posix"))
     
     # Check the result
     assert result == "command output"
 
-@patch('subprocess.check_output')
-def test_run_command_shell_function(mock_check_output, setup_env):
+@pytest.mark.parametrize("command", ["ls | wc -l", "ls *.py", "FOO=1 env", "echo $HOME"])
+@patch('subprocess.Popen')
+def test_run_command_uses_shell_when_needed(mock_popen, command, setup_env):
+    """Test that commands relying on shell features still run through bash."""
+    mock_popen.return_value = _fake_process(b"")
+    
+    run_command(command)
+    
+    assert mock_popen.call_args[0][0] == ['/bin/bash', '-c', command]
+
+@patch('subprocess.Popen')
+def test_run_command_shell_function(mock_popen, setup_env):
     """Test the run_command function with shell function."""
     result = run_command("return 0")
     
-    # Verify subprocess.check_output was not called
-    mock_check_output.assert_not_called()
+    # Verify no process was started
+    mock_popen.assert_not_called()
     
     # Check the result
     assert result == "Error: The command contains shell function syntax that cannot be executed directly."
 
-@patch('subprocess.check_output')
-def test_run_command_error(mock_check_output, setup_env):
+@patch('subprocess.Popen')
+def test_run_command_error(mock_popen, setup_env):
     """Test the run_command function when command execution fails."""
-    import subprocess
-    mock_check_output.side_effect = subprocess.CalledProcessError(1, "test", output="error output")
+    mock_popen.return_value = _fake_process(b"error output\n", returncode=1)
     
     result = run_command("invalid_command")
     
     # Check the result
     assert result == "Command error:\nerror output"
 
+@patch('subprocess.Popen')
+def test_run_command_keeps_output_tail(mock_popen, setup_env):
+    """Test that only the end of a large output is kept."""
+    mock_popen.return_value = _fake_process(b"x" * 200000 + b"\nlast line")
+    
+    result = run_command("cat big.log")
+    
+    assert result.startswith("[output truncated to the last 65536 bytes]\n")
+    assert result.endswith("x\nlast line")
+    assert len(result) < 65536 + 100
+
+def test_run_command_timeout(setup_env):
+    """Test that a command running past the timeout is killed."""
+    with patch('ai_tools.mcp.actions._COMMAND_TIMEOUT', 0.2):
+        result = run_command("sleep 10")
+    
+    assert result.startswith("Unexpected error:")
+    assert "timed out" in result
+
+@pytest.mark.skipif(os.name != "posix", reason="process groups are POSIX only")
+def test_run_command_timeout_kills_shell_children(setup_env):
+    """Test that a background child holding the output open is killed with the shell."""
+    start = time.monotonic()
+    with patch('ai_tools.mcp.actions._COMMAND_TIMEOUT', 0.5):
+        result = run_command("(sleep 10 &); echo done")
+    
+    assert time.monotonic() - start < 5
+    assert result == "done"
+
+class _ImmediateTimer:
+    """threading.Timer stand-in that fires as soon as it is started."""
+    
+    def __init__(self, interval, function):
+        self.function = function
+    
+    def start(self):
+        self.function()
+    
+    def cancel(self):
+        pass
+
+@patch('ai_tools.mcp.actions.os.killpg')
+@patch('subprocess.Popen')
+def test_run_command_timer_after_exit_is_not_a_timeout(mock_popen, mock_killpg, setup_env):
+    """Test that a timer firing after the command exited normally doesn't report a timeout."""
+    process = _fake_process(b"command output\n")
+    process.kill.side_effect = ProcessLookupError
+    mock_popen.return_value = process
+    mock_killpg.side_effect = ProcessLookupError
+    
+    with patch('ai_tools.mcp.actions.threading.Timer', _ImmediateTimer):
+        result = run_command("echo output")
+    
+    assert result == "command output"
+
 @patch('ai_tools.mcp.actions.ask_llm_for_command')
 @patch('ai_tools.mcp.actions.run_command')
 def test_run_ai_command(mock_run_command, mock_ask_llm, setup_env):
@@ -184,8 +362,8 @@ def test_run_ai_command(mock_run_command, mock_ask_llm, setup_env):
     assert command == "ls -la"
     assert output == "total 0\ndrwxr-xr-x 2 user user 40 Apr 17 10:00 ."
 
-@patch('requests.post')
-@patch('requests.get')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.get')
 def test_prompt_ollama_http_non_streaming(mock_get, mock_post, setup_env):
     """Test the prompt_ollama_http function in non-streaming mode."""
     # Setup mock response
@@ -203,11 +381,48 @@ def test_prompt_ollama_http_non_streaming(mock_get, mock_post, setup_env):
     assert call_args['json']['model'] == 'test-model'
     assert call_args['json']['prompt'] == 'test prompt'
     assert call_args['json']['stream'] == False
+    assert call_args['json']['keep_alive'] == get_ollama_keep_alive()
     
     # Check the result
     assert result == "This is a test response"
 
-@patch('requests.post')
+@patch('ai_tools.mcp.actions.get_prompt_cache', return_value=None)
+def test_prompt_ollama_http_streaming(mock_get_cache, ollama_transport, setup_env):
+    """Test the prompt_ollama_http function in streaming mode."""
+    requests_seen = []
+    
+    def generate(request):
+        requests_seen.append(json.loads(request.content))
+        body = b"\n".join([
+            json.dumps({"response": "Hello"}).encode(),
+            b"",
+            b"not json",
+            json.dumps({"response": " world"}).encode(),
+            json.dumps({"done": True}).encode(),
+        ])
+        return httpx.Response(200, stream=_Chunked(body))
+    
+    ollama_transport['/api/generate'] = generate
+    
+    result = prompt_ollama_http("test prompt", use_streaming=True)
+    
+    assert requests_seen[0]['stream'] == True
+    assert result == "Hello world"
+
+@patch('ai_tools.mcp.actions.get_prompt_cache', return_value=None)
+def test_prompt_ollama_http_streaming_server_down(mock_get_cache, ollama_transport, setup_env):
+    """Test that an unreachable server is reported from the request itself, without a probe."""
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+    
+    # Any other request, such as a probe of /api/tags, would fail the lookup
+    ollama_transport['/api/generate'] = refuse
+    
+    result = prompt_ollama_http("test prompt", use_streaming=True)
+    
+    assert result.startswith("Error: Could not connect to Ollama server.")
+
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
 def test_prompt_ollama_http_timeout(mock_post, setup_env):
     """Test the prompt_ollama_http function when timeout occurs."""
     mock_post.side_effect = requests.exceptions.ReadTimeout()
@@ -215,6 +430,161 @@ def test_prompt_ollama_http_timeout(mock_post, setup_env):
     result = prompt_ollama_http("test prompt", use_streaming=False)
     assert result.startswith("Error: The request to the Ollama server timed out.")
 
+class _Chunked(httpx.AsyncByteStream):
+    """Async response body that arrives in 5-byte reads."""
+    
+    def __init__(self, body):
+        self.body = body
+    
+    async def __aiter__(self):
+        for start in range(0, len(self.body), 5):
+            yield self.body[start:start + 5]
+    
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def ollama_transport():
+    """Route httpx.AsyncClient requests to a handler set by the test."""
+    routes = {}
+    
+    def handle(request):
+        return routes[request.url.path](request)
+    
+    real_client = httpx.AsyncClient
+    with patch('httpx.AsyncClient',
+               side_effect=lambda **kwargs: real_client(transport=httpx.MockTransport(handle), **kwargs)):
+        yield routes
+
+
+@patch('ai_tools.mcp.actions.get_prompt_cache', return_value=None)
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
+def test_verbose_prints_timeouts_in_use(mock_post, mock_get_cache, ollama_transport, capsys, setup_env):
+    """Test that verbose mode reports the timeout each kind of request actually uses."""
+    from ai_tools.backend.session import OLLAMA_ASYNC_TIMEOUT
+    
+    mock_post.return_value.json.return_value = {"response": "ok"}
+    prompt_ollama_http("test prompt", use_streaming=False, verbose=True)
+    assert f"Request timeout: {mock_post.call_args.kwargs['timeout']} seconds\n" in capsys.readouterr().out
+    
+    timeouts = []
+    
+    def generate(request):
+        timeouts.append(request.extensions["timeout"]["read"])
+        return httpx.Response(200, content=json.dumps({"response": "ok", "done": True}).encode())
+    
+    ollama_transport['/api/generate'] = generate
+    prompt_ollama_http("test prompt", verbose=True)
+    
+    assert timeouts == [OLLAMA_ASYNC_TIMEOUT]
+    assert f"Request timeout: {OLLAMA_ASYNC_TIMEOUT} seconds per read" in capsys.readouterr().out
+
+
+@patch('ai_tools.mcp.actions.get_prompt_cache', return_value=None)
+def test_prompt_ollama_http_async_streaming(mock_get_cache, ollama_transport, setup_env):
+    """Test the async prompt reads the streamed response as it arrives."""
+    requests_seen = []
+    
+    def generate(request):
+        requests_seen.append(json.loads(request.content))
+        lines = [json.dumps({"response": "Hello"}), "", "not json", "42",
+                 json.dumps({"response": " wörld"}), json.dumps({"done": True})]
+        # Sent in small pieces, so lines and characters are split across reads
+        body = "\r\n".join(lines).encode()
+        return httpx.Response(200, stream=_Chunked(body))
+    
+    ollama_transport['/api/generate'] = generate
+    chunks = []
+    
+    result = run_async(prompt_ollama_http_async("test prompt", on_chunk=chunks.append))
+    
+    assert result == "Hello wörld"
+    assert chunks == ["Hello", " wörld"]
+    assert requests_seen[0]['stream'] is True
+    assert requests_seen[0]['model'] == 'test-model'
+
+
+@patch('ai_tools.mcp.actions.get_prompt_cache', return_value=None)
+def test_prompt_ollama_http_async_server_down(mock_get_cache, ollama_transport, setup_env):
+    """Test the async prompt reports an unreachable server."""
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+    
+    ollama_transport['/api/generate'] = refuse
+    
+    result = run_async(prompt_ollama_http_async("test prompt"))
+    
+    assert result.startswith("Error: Could not connect to Ollama server.")
+
+
+@patch('ai_tools.mcp.actions.get_prompt_cache', return_value=None)
+def test_prompt_ollama_http_async_timeout(mock_get_cache, ollama_transport, setup_env):
+    """Test the async prompt reports a timed out stream."""
+    def time_out(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+    
+    ollama_transport['/api/generate'] = time_out
+    
+    result = run_async(prompt_ollama_http_async("test prompt"))
+    
+    assert result.startswith("Error: The request to the Ollama server timed out.")
+
+
+@patch('ai_tools.mcp.actions.get_prompt_cache', return_value=None)
+def test_prompt_ollama_batch(mock_get_cache, ollama_transport, setup_env):
+    """Test a batch of prompts gets one response per prompt, in order."""
+    def generate(request):
+        prompt = json.loads(request.content)['prompt']
+        if prompt == "fail":
+            return httpx.Response(500, json={"error": "model crashed"})
+        return httpx.Response(200, json={"response": f" {prompt.upper()} "})
+    
+    ollama_transport['/api/generate'] = generate
+    
+    result = prompt_ollama_batch(["one", "fail", "three"])
+    
+    assert result[0] == "ONE"
+    assert result[1].startswith("Error: Failed to connect to the Ollama server.")
+    assert result[2] == "THREE"
+
+
+@patch('ai_tools.mcp.actions.get_prompt_cache', return_value=None)
+def test_prompt_ollama_batch_coalesces_duplicates(mock_get_cache, ollama_transport, setup_env):
+    """Test identical prompts in a batch are sent to Ollama once."""
+    sent = []
+    
+    def generate(request):
+        sent.append(json.loads(request.content)['prompt'])
+        return httpx.Response(200, json={"response": sent[-1].upper()})
+    
+    ollama_transport['/api/generate'] = generate
+    
+    result = prompt_ollama_batch(["a", "b", "a", "a"])
+    
+    assert result == ["A", "B", "A", "A"]
+    assert sorted(sent) == ["a", "b"]
+
+
+def test_prompt_ollama_batch_action(setup_env):
+    """Test the batch prompt is available as an MCP action."""
+    assert MCP_ACTIONS["prompt_ollama_batch"] is prompt_ollama_batch
+
+
+@patch('ai_tools.mcp.actions.get_prompt_cache')
+@patch('ai_tools.mcp.actions.OLLAMA_SESSION.post')
+def test_prompt_ollama_http_skips_cache(mock_post, mock_get_cache, setup_env):
+    """Test prompt_ollama_http asks Ollama when the cache is not wanted."""
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"response": "fresh"}
+    mock_post.return_value = mock_response
+    
+    result = prompt_ollama_http("test prompt", use_streaming=False, use_cache=False)
+    
+    assert result == "fresh"
+    mock_get_cache.assert_not_called()
+
+
 def test_handle_mcp_action_unknown_action(setup_env):
     """Test handle_mcp_action with unknown action."""
     result = handle_mcp_action("unknown_action", {})
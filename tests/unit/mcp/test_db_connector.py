@@ -92,7 +92,7 @@ def test_mcp_vectorize_documents_success(mock_vectorize, mock_db_config, mock_ve
     result = mcp_vectorize_documents('/path/to/docs', 'test_db')
     
     # Verify function was called with correct arguments
-    mock_vectorize.assert_called_once_with('/path/to/docs', db_name='test_db')
+    mock_vectorize.assert_called_once_with('/path/to/docs', db_name='test_db', batch_size=None, use_cache=True)
     
     # Check the result
     assert result['status'] == 'success'
@@ -0,0 +1,111 @@
+"""Unit tests for the AI wrapper module."""
+import json
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from ai_tools.modules.ai import AiWrapper
+
+
+def _openai_chunk(content, choices=True):
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)] if choices else [])
+
+
+@pytest.fixture
+def openai_wrapper(monkeypatch):
+    """Wrapper using a mocked OpenAI client without RAG."""
+    monkeypatch.setenv("USE_OLLAMA", "false")
+    monkeypatch.setenv("USE_RAG", "false")
+    wrapper = AiWrapper()
+    wrapper.client = MagicMock()
+    return wrapper
+
+
+@pytest.fixture
+def ollama_wrapper(monkeypatch):
+    """Wrapper using Ollama without RAG."""
+    monkeypatch.setenv("USE_OLLAMA", "true")
+    monkeypatch.setenv("USE_RAG", "false")
+    return AiWrapper()
+
+
+def _ollama_response(lines):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.iter_lines.return_value = [json.dumps(line).encode() for line in lines]
+    return response
+
+
+def test_openai_stream_skips_empty_chunks(openai_wrapper):
+    """Test that chunks without choices or with None content are not yielded."""
+    openai_wrapper.client.chat.completions.create.return_value = iter([
+        _openai_chunk("Hello"),
+        _openai_chunk(None),
+        _openai_chunk(None, choices=False),
+        _openai_chunk(" there."),
+    ])
+    
+    chunks = list(openai_wrapper.get_ai_response_stream("Hi"))
+    
+    assert chunks == ["Hello", " there."]
+    assert openai_wrapper.ai_response == "Hello there."
+    assert openai_wrapper.client.chat.completions.create.call_args.kwargs["stream"] is True
+
+
+def test_stream_error_yielded_and_stored(openai_wrapper):
+    """Test that a failed request yields and stores the error message."""
+    openai_wrapper.client.chat.completions.create.side_effect = RuntimeError("down")
+    
+    chunks = list(openai_wrapper.get_ai_response_stream("Hi"))
+    
+    assert chunks == ["Error communicating with AI service: down"]
+    assert openai_wrapper.ai_response == chunks[0]
+
+
+def test_stream_messages_built_when_requested(openai_wrapper):
+    """Test that content set after starting a stream doesn't change its request."""
+    openai_wrapper.client.chat.completions.create.return_value = iter([_openai_chunk("Ok")])
+    
+    stream = openai_wrapper.get_ai_response_stream("First", system_content="Context")
+    openai_wrapper.get_ai_response_stream("Second", system_content="Other")
+    list(stream)
+    
+    messages = openai_wrapper.client.chat.completions.create.call_args.kwargs["messages"]
+    assert messages == [
+        {"role": "system", "content": "Context"},
+        {"role": "user", "content": "First"},
+    ]
+
+
+def test_ollama_stream(ollama_wrapper):
+    """Test that Ollama chunks are yielded until the done line and the text stored."""
+    response = _ollama_response([
+        {"message": {"content": "Hel"}},
+        {"message": {"content": ""}},
+        {"message": {"content": "lo."}},
+        {"done": True},
+        {"message": {"content": "ignored"}},
+    ])
+    with patch("ai_tools.backend.session.OLLAMA_SESSION") as mock_session:
+        mock_session.post.return_value = response
+        chunks = list(ollama_wrapper.get_ai_response_stream("Hi"))
+    
+    assert chunks == ["Hel", "lo."]
+    assert ollama_wrapper.ai_response == "Hello."
+    assert mock_session.post.call_args.kwargs["json"]["stream"] is True
+
+
+def test_ollama_stream_error_chunk(ollama_wrapper):
+    """Test that an error line in the Ollama stream ends it with the error message."""
+    response = _ollama_response([
+        {"message": {"content": "Partial"}},
+        {"error": "model crashed"},
+    ])
+    with patch("ai_tools.backend.session.OLLAMA_SESSION") as mock_session:
+        mock_session.post.return_value = response
+        chunks = list(ollama_wrapper.get_ai_response_stream("Hi"))
+    
+    assert chunks == ["Partial", "Error communicating with AI service: Ollama error: model crashed"]
+    assert ollama_wrapper.ai_response == chunks[-1]
@@ -1,9 +1,10 @@
 """Unit tests for the sim module."""
 import pytest
 import json
+import threading
 from unittest.mock import patch, MagicMock, call
 
-from ai_tools.modules.sim import GameSimAi
+from ai_tools.modules.sim import GameSimAi, main
 
 
 @patch('ai_tools.modules.sim.SpeechToText')
@@ -101,6 +102,76 @@ class TestGameSimAi:
         assert mock_audio_instance.check_for_audio.called
         mock_interface.stop_data_loop.assert_called_once()
 
+    @patch('ai_tools.modules.sim.time.time', side_effect=[0, 1, 1, 1])  # Control time progression
+    def test_start_speaks_response(self, mock_time, mock_ai, mock_audio, mock_speech):
+        """Test that the AI response is spoken before start returns."""
+        mock_audio_instance = MagicMock()
+        mock_audio.return_value = mock_audio_instance
+        mock_audio_instance.check_for_audio.return_value = True
+        mock_audio_instance.recognized_text = "Exit now"
+        mock_ai.return_value.get_ai_response_stream.return_value = iter(["Good", "bye"])
+        
+        game_sim = GameSimAi()
+        mock_interface = MagicMock()
+        mock_interface.get_game_data.return_value = json.dumps({"test_data": "value"})
+        game_sim.game_interface = mock_interface
+        
+        assert game_sim.start() is True
+        mock_ai.return_value.get_ai_response_stream.assert_called_once_with("Exit now")
+        mock_speech.return_value.speech_stream.assert_called_once_with(
+            mock_ai.return_value.get_ai_response_stream.return_value
+        )
+
+    @patch('ai_tools.modules.sim.time.time', return_value=0)
+    def test_start_ignores_speech_while_speaking(self, mock_time, mock_ai, mock_audio, mock_speech):
+        """Test that text recognized while a reply is being spoken is not sent to the AI."""
+        speaking = threading.Event()
+        released = threading.Event()
+        
+        def speak(chunks):
+            speaking.set()
+            released.wait(5)
+        
+        mock_speech.return_value.speech_stream.side_effect = speak
+        mock_audio_instance = mock_audio.return_value
+        checks = []
+        
+        def check_for_audio():
+            checks.append(None)
+            if len(checks) == 1:
+                mock_audio_instance.recognized_text = "status report"
+            else:
+                # The reply being spoken, picked up by the microphone
+                speaking.wait(5)
+                mock_audio_instance.recognized_text = "exit"
+                if len(checks) == 3:
+                    released.set()
+            return True
+        
+        mock_audio_instance.check_for_audio.side_effect = check_for_audio
+        game_sim = GameSimAi()
+        game_sim.game_interface = MagicMock()
+        
+        assert game_sim.start() is True
+        assert mock_ai.return_value.get_ai_response_stream.call_args_list == [
+            call("status report"),
+            call("exit"),
+        ]
+        assert len(checks) > 3
+
+    @patch('ai_tools.modules.sim.time.sleep')
+    @patch('ai_tools.modules.sim.time.time', return_value=0)
+    def test_start_waits_without_audio_stream(self, mock_time, mock_sleep, mock_ai, mock_audio, mock_speech):
+        """Test that the loop doesn't spin when there is no audio stream to block on."""
+        mock_audio_instance = mock_audio.return_value
+        mock_audio_instance.stream = None
+        mock_audio_instance.check_for_audio.side_effect = [False, False, KeyboardInterrupt()]
+        game_sim = GameSimAi()
+        game_sim.game_interface = MagicMock()
+        
+        assert game_sim.start() is False
+        assert mock_sleep.call_args_list == [call(0.1), call(0.1)]
+
     @patch('time.sleep', return_value=None)  # Prevent sleep from causing delays
     @patch('ai_tools.modules.sim.time.time', side_effect=[0, 1, 1, 1])  # Control time progression
     def test_start_keyboard_interrupt(self, mock_time, mock_sleep, mock_ai, mock_audio, mock_speech):
@@ -180,4 +251,21 @@ class TestGameSimAi:
         game_sim.game_interface = mock_interface
         has_warning, message = game_sim._check_warnings()
         assert has_warning is True
-        assert message == "¡Alerta de pérdida!"
\ No newline at end of file
+        assert message == "¡Alerta de pérdida!"
+
+
+@patch('ai_tools.modules.sim.GameSimAi')
+def test_main_starts_requested_game(mock_game_sim):
+    """Test the process entry point starts the requested simulator."""
+    assert main(['msfs']) == 0
+
+    mock_game_sim.assert_called_once_with(game_type='msfs')
+    mock_game_sim.return_value.start.assert_called_once()
+
+
+@patch('ai_tools.modules.sim.GameSimAi', side_effect=ValueError("Unsupported game type: bogus"))
+def test_main_reports_errors(mock_game_sim, capsys):
+    """Test the process entry point reports a failure with a non-zero status."""
+    assert main(['bogus']) == 1
+
+    assert "Unsupported game type: bogus" in capsys.readouterr().out
@@ -0,0 +1,199 @@
+"""Unit tests for the speech module."""
+import re
+from concurrent.futures import Future
+from unittest.mock import patch, call
+
+import pytest
+
+from ai_tools.modules import speech
+from ai_tools.modules.speech import SpeechToText
+
+
+# The original text clean-up, kept as the reference the compiled tables must match
+_BASELINE_EMOJI_RE = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"
+    "\U0001F300-\U0001F5FF"
+    "\U0001F680-\U0001F6FF"
+    "\U0001F700-\U0001F77F"
+    "\U0001F780-\U0001F7FF"
+    "\U0001F800-\U0001F8FF"
+    "\U0001F900-\U0001F9FF"
+    "\U0001FA00-\U0001FA6F"
+    "\U0001FA70-\U0001FAFF"
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "]+", flags=re.UNICODE
+)
+_BASELINE_REPLACEMENTS = {
+    '+': ' plus ', '=': ' equals ', '@': ' at ', '&': ' and ', '%': ' percent ', '/': ' slash ',
+    '...': ' ', '--': ' ', '—': ' ', '–': ' ',
+}
+_BASELINE_ABBREVIATIONS = {
+    'vs.': 'versus', 'e.g.': 'for example', 'i.e.': 'that is', 'etc.': 'etcetera',
+    'Dr.': 'Doctor', 'Mr.': 'Mister', 'Mrs.': 'Misses',
+    'AI': 'Artificial Intelligence', 'UI': 'User Interface', 'API': 'A P I',
+}
+
+
+def _baseline_sentences(text):
+    text = _BASELINE_EMOJI_RE.sub('', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[*_~`#|<>{}[\]\\]', ' ', text)
+    for char, replacement in _BASELINE_REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    for abbr, expansion in _BASELINE_ABBREVIATIONS.items():
+        text = text.replace(abbr, expansion)
+    sentences = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        if not sentence.strip():
+            continue
+        sentence = re.sub(r'[,;:!?()]', ' ', sentence)
+        sentence = sentence.replace('"', '').replace("'", '')
+        sentence = re.sub(r'\s+', ' ', sentence).strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+SAMPLES = [
+    "Hello there! 😀 How are you? 🚀🚀 Great ✨ news.",
+    "# Title\n\n**Bold** and _italic_ with `code`, ~strike~ | pipes <tags> {braces} [links] \\slash.",
+    "Dr. Smith vs. Mr. Jones and Mrs. Brown, e.g. the AI, UI and API etc. i.e. done.",
+    "1 + 1 = 2 @ 50% of A & B / C... wait -- really — yes – no....",
+    "\"Quoted\" (parens); colon: semi; 'single' it's fine?!  Next line.\nAnother\t\tone.",
+    "",
+    "   \n\t ",
+]
+
+
+@pytest.fixture
+def tts():
+    """Speech engine with synthesis and playback left to each test."""
+    return SpeechToText()
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_prepare_sentences_matches_baseline(tts, text):
+    """Test that cleaning and splitting gives the same sentences as the original clean-up."""
+    assert tts._prepare_sentences(text) == _baseline_sentences(text)
+
+
+def test_long_text_uses_numpy_and_matches_baseline(tts):
+    """Test that text above the NumPy threshold is filtered with NumPy with the same result."""
+    pytest.importorskip("numpy")
+    text = " ".join(SAMPLES) * (speech._EMOJI_NUMPY_MIN_CHARS // len(" ".join(SAMPLES)) + 1)
+    assert len(text) >= speech._EMOJI_NUMPY_MIN_CHARS
+    
+    with patch.object(speech, "_remove_emojis_numpy", wraps=speech._remove_emojis_numpy) as mock_numpy:
+        sentences = tts._prepare_sentences(text)
+    
+    mock_numpy.assert_called_once()
+    assert sentences == _baseline_sentences(text)
+
+
+def test_short_text_skips_numpy(tts):
+    """Test that text below the NumPy threshold only uses the regex."""
+    with patch.object(speech, "_remove_emojis_numpy") as mock_numpy:
+        assert tts._remove_emojis("Hi 😀") == "Hi "
+    mock_numpy.assert_not_called()
+
+
+@pytest.mark.parametrize("error", [ImportError, UnicodeError])
+def test_long_text_falls_back_to_regex(tts, error):
+    """Test that the regex is used when NumPy is missing or the text can't be encoded."""
+    text = "a😀" * speech._EMOJI_NUMPY_MIN_CHARS
+    with patch.object(speech, "_remove_emojis_numpy", side_effect=error):
+        assert tts._remove_emojis(text) == "a" * speech._EMOJI_NUMPY_MIN_CHARS
+
+
+def test_lone_surrogate_falls_back_to_regex(tts):
+    """Test that text NumPy can't encode is still cleaned by the regex."""
+    text = "\ud800😀" + "a" * speech._EMOJI_NUMPY_MIN_CHARS
+    assert tts._remove_emojis(text) == _BASELINE_EMOJI_RE.sub('', text)
+
+
+def test_stream_sentences_yielded_as_completed(tts):
+    """Test that streamed text yields each sentence once its end arrives."""
+    sentences = tts._iter_stream_sentences(iter(["Hello wor", "ld. How", " are you? Fine"]))
+    
+    assert next(sentences) == "Hello world."
+    assert next(sentences) == "How are you"
+    assert list(sentences) == ["Fine"]
+
+
+def test_stream_sentences_not_split_on_abbreviations(tts):
+    """Test that periods of abbreviations don't end a streamed sentence."""
+    chunks = ["Ask Dr. ", "Smith, e.g. ", "today. Then ", "rest etc. ", "now."]
+    
+    assert list(tts._iter_stream_sentences(chunks)) == [
+        "Ask Doctor Smith for example today.",
+        "Then rest etcetera now.",
+    ]
+
+
+def test_stream_sentences_not_split_on_ellipsis(tts):
+    """Test that an ellipsis pauses within a streamed sentence instead of ending it."""
+    chunks = ["Wait... ", "for it. Done"]
+    
+    assert list(tts._iter_stream_sentences(chunks)) == tts._prepare_sentences("Wait... for it. Done")
+
+
+def test_stream_sentences_match_whole_text(tts):
+    """Test that streaming a text in small pieces gives the same sentences as speaking it whole."""
+    text = " ".join(SAMPLES)
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+    
+    assert list(tts._iter_stream_sentences(chunks)) == tts._prepare_sentences(text)
+
+
+def _done(result=None, exception=None):
+    future = Future()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+    return future
+
+
+def test_play_in_order(tts):
+    """Test that audio is played in submission order and every file removed."""
+    with patch.object(tts, "_play_audio") as mock_play, \
+         patch.object(tts, "_remove_file") as mock_remove:
+        tts._play_in_order([_done("first.mp3"), _done("second.mp3"), _done("third.mp3")])
+    
+    assert mock_play.call_args_list == [call("first.mp3"), call("second.mp3"), call("third.mp3")]
+    assert mock_remove.call_args_list == [call("first.mp3"), call("second.mp3"), call("third.mp3")]
+
+
+def test_play_in_order_waits_for_earlier_sentence(tts):
+    """Test that a later sentence finishing first is not played before an earlier one."""
+    first, second = Future(), Future()
+    second.set_result("second.mp3")
+    played = []
+    
+    def play(audio_file):
+        played.append(audio_file)
+    
+    timer = speech.threading.Timer(0.05, first.set_result, args=("first.mp3",))
+    timer.start()
+    with patch.object(tts, "_play_audio", side_effect=play), \
+         patch.object(tts, "_remove_file"):
+        tts._play_in_order([first, second])
+    timer.join()
+    
+    assert played == ["first.mp3", "second.mp3"]
+
+
+def test_play_in_order_stops_on_failure(tts):
+    """Test that a failed synthesis stops playback, sets the stop event and discards later audio."""
+    pending = Future()
+    stop = speech.threading.Event()
+    with patch.object(tts, "_play_audio") as mock_play, \
+         patch.object(tts, "_remove_file") as mock_remove:
+        tts._play_in_order([_done("first.mp3"), _done(exception=RuntimeError("boom")), _done("third.mp3"), pending], stop)
+    
+        mock_play.assert_called_once_with("first.mp3")
+        assert stop.is_set()
+        assert pending.cancelled()
+        assert mock_remove.call_args_list == [call("first.mp3"), call("third.mp3")]
@@ -0,0 +1 @@
+"""Storage test package."""
@@ -0,0 +1,210 @@
+"""Unit tests for the document storage module."""
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from ai_tools.config.database import db_config
+from ai_tools.storage import docs
+
+
+def _store_index(tmp_path, monkeypatch):
+    """Create a source directory and the metadata of an index built from it with the current settings."""
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "notes.txt").write_text("Some notes")
+    
+    monkeypatch.setattr(docs, "VECTOR_DB_PATH", str(tmp_path / "vectors"))
+    db_path = tmp_path / "vectors" / "default"
+    db_path.mkdir(parents=True)
+    (db_path / "index.faiss").write_bytes(b"")
+    metadata = {
+        "source_hash": docs._directory_fingerprint(str(source)),
+        **docs._index_settings(docs.DEFAULT_EMBEDDING_MODEL),
+    }
+    (db_path / "metadata.json").write_text(json.dumps(metadata))
+    return str(source), str(db_path)
+
+
+@pytest.fixture
+def stored_index(tmp_path, monkeypatch):
+    """A source directory and a vector database built from it with the current settings."""
+    return _store_index(tmp_path, monkeypatch)
+
+
+def test_load_documents_in_spawned_workers(tmp_path):
+    """Test that several files are parsed by spawned, not forked, worker processes."""
+    (tmp_path / "a.txt").write_text("First file")
+    (tmp_path / "b.txt").write_text("Second file")
+    (tmp_path / "ignored.bin").write_bytes(b"\x00")
+    
+    with patch.object(docs, "ProcessPoolExecutor", wraps=docs.ProcessPoolExecutor) as mock_pool:
+        documents = docs.load_documents_from_directory(str(tmp_path))
+    
+    assert mock_pool.call_args.kwargs["mp_context"].get_start_method() == "spawn"
+    assert [document.page_content for document in documents] == ["First file", "Second file"]
+
+
+def _vectorize(source):
+    """Vectorize with no documents to load, so a rebuild returns None."""
+    with patch.object(docs, "load_documents_from_directory", return_value=[]) as mock_load:
+        result = docs.vectorize_documents(source)
+    return result, mock_load.called
+
+
+def test_vectorize_reuses_unchanged_index(stored_index):
+    """Test that an index built from the same files and settings is reused."""
+    source, db_path = stored_index
+    
+    assert _vectorize(source) == (db_path, False)
+
+
+@pytest.mark.parametrize("target, name, value", [
+    (db_config, "vector_index_type", "hnsw"),
+    (db_config, "embedding_backend", "onnx"),
+    (docs, "CHUNK_SIZE", 1024),
+    (docs, "CHUNK_OVERLAP", 0),
+])
+def test_vectorize_rebuilds_when_settings_change(stored_index, monkeypatch, target, name, value):
+    """Test that changing an index setting forces a rebuild."""
+    source, _ = stored_index
+    monkeypatch.setattr(target, name, value)
+    
+    assert _vectorize(source) == (None, True)
+
+
+def test_vectorize_rebuilds_when_onnx_file_changes(tmp_path, monkeypatch):
+    """Test that switching ONNX weights forces a rebuild of an ONNX-built index."""
+    monkeypatch.setattr(db_config, "embedding_backend", "onnx")
+    source, _ = _store_index(tmp_path, monkeypatch)
+    monkeypatch.setattr(db_config, "embedding_onnx_file", "onnx/model.onnx")
+    
+    assert _vectorize(source) == (None, True)
+
+
+def test_vectorize_rebuilds_when_files_change(stored_index):
+    """Test that a changed source directory forces a rebuild."""
+    source, _ = stored_index
+    with open(f"{source}/more.txt", "w") as f:
+        f.write("More notes")
+    
+    assert _vectorize(source) == (None, True)
+
+
+class _FakeEmbedder:
+    """Embedder giving each text a fixed pseudo-random 16-dimensional vector."""
+    
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+    
+    def embed_query(self, text):
+        seed = int.from_bytes(text.encode("utf-8")[-8:].rjust(8, b"\0"), "big")
+        return np.random.default_rng(seed).standard_normal(16).tolist()
+
+
+@pytest.fixture
+def index_env(tmp_path, monkeypatch):
+    """Empty vector database directory, a fake embedder and no caches."""
+    monkeypatch.setattr(docs, "VECTOR_DB_PATH", str(tmp_path / "vectors"))
+    monkeypatch.setattr(docs, "get_embedder", lambda model_name, batch_size=None: _FakeEmbedder())
+    monkeypatch.setattr(docs, "_VECTOR_STORE_CACHE", {})
+    docs._embed_query.cache_clear()
+    yield tmp_path
+    docs._embed_query.cache_clear()
+
+
+def _vectorize_texts(source_dir, count, index_type, monkeypatch):
+    """Build a database of documents 'document 0' .. 'document <count-1>' with the given index type."""
+    from langchain_core.documents import Document
+    
+    documents = [Document(page_content=f"document {i}", metadata={"id": i}) for i in range(count)]
+    monkeypatch.setattr(db_config, "vector_index_type", index_type)
+    with patch.object(docs, "load_documents_from_directory", return_value=documents):
+        return docs.vectorize_documents(str(source_dir), db_name=index_type, use_cache=False)
+
+
+@pytest.mark.parametrize("setting, count, expected", [
+    ("auto", 1, "flat"),
+    ("auto", docs.HNSW_MIN_VECTORS - 1, "flat"),
+    ("auto", docs.HNSW_MIN_VECTORS, "hnsw"),
+    ("auto", docs.IVFPQ_MIN_VECTORS - 1, "hnsw"),
+    ("auto", docs.IVFPQ_MIN_VECTORS, "ivfpq"),
+    ("sq8", 1, "sq8"),
+    ("flat", docs.IVFPQ_MIN_VECTORS, "flat"),
+    ("ivfpq", docs.IVFPQ_MIN_TRAINING_VECTORS, "ivfpq"),
+    ("ivfpq", docs.IVFPQ_MIN_TRAINING_VECTORS - 1, "flat"),
+])
+def test_select_index_type(monkeypatch, setting, count, expected):
+    """Test the index type chosen for each collection size and setting."""
+    monkeypatch.setattr(db_config, "vector_index_type", setting)
+    
+    assert docs._select_index_type(count) == expected
+
+
+@pytest.mark.parametrize("index_type, count, faiss_class", [
+    ("flat", 40, "IndexFlatIP"),
+    ("hnsw", 40, "IndexHNSWFlat"),
+    # PQ codebooks of 256 centroids need at least as many training vectors
+    ("ivfpq", 300, "IndexIVFPQ"),
+    ("sq8", 40, "IndexScalarQuantizer"),
+])
+def test_search_finds_nearest_document(index_env, monkeypatch, index_type, count, faiss_class):
+    """Test that each index type is built, saved, loaded and returns the matching document first."""
+    import faiss
+    
+    db_path = _vectorize_texts(index_env, count, index_type, monkeypatch)
+    monkeypatch.setattr(docs, "_VECTOR_STORE_CACHE", {})
+    
+    results = docs.search_documents("document 7", db_name=index_type, k=3)
+    
+    assert json.loads(Path(db_path, "metadata.json").read_text())["index_type"] == index_type
+    assert isinstance(docs.load_vector_db(index_type).index, getattr(faiss, faiss_class))
+    assert results[0]["content"] == "document 7"
+    assert results[0]["relevance_score"] == pytest.approx(1.0, abs=0.05)
+    assert len(results) == 3
+
+
+def test_forced_ivfpq_on_small_corpus_falls_back(index_env, monkeypatch, capsys):
+    """Test that a forced IVF-PQ index with too few vectors to train is built as a flat index."""
+    import faiss
+    
+    db_path = _vectorize_texts(index_env, 40, "ivfpq", monkeypatch)
+    monkeypatch.setattr(docs, "_VECTOR_STORE_CACHE", {})
+    
+    assert "using a flat index instead" in capsys.readouterr().out
+    assert json.loads(Path(db_path, "metadata.json").read_text())["index_type"] == "flat"
+    assert isinstance(docs.load_vector_db("ivfpq").index, faiss.IndexFlatIP)
+    assert docs.search_documents("document 7", db_name="ivfpq", k=1)[0]["content"] == "document 7"
+
+
+def test_hnsw_ef_search_applied_on_load(index_env, monkeypatch):
+    """Test that efSearch is taken from the settings when an HNSW index is loaded."""
+    _vectorize_texts(index_env, 40, "hnsw", monkeypatch)
+    monkeypatch.setattr(docs, "_VECTOR_STORE_CACHE", {})
+    monkeypatch.setattr(docs, "HNSW_EF_SEARCH", 77)
+    
+    assert docs.load_vector_db("hnsw").index.hnsw.efSearch == 77
+
+
+@pytest.mark.parametrize("nprobe, expected", [(3, 3), (10 ** 6, 17)])
+def test_ivf_nprobe_applied_on_load(index_env, monkeypatch, nprobe, expected):
+    """Test that nprobe is taken from the settings, capped at the number of lists."""
+    _vectorize_texts(index_env, 300, "ivfpq", monkeypatch)
+    monkeypatch.setattr(docs, "_VECTOR_STORE_CACHE", {})
+    monkeypatch.setattr(docs, "IVFPQ_NPROBE", nprobe)
+    
+    index = docs.load_vector_db("ivfpq").index
+    
+    # sqrt(300) inverted lists
+    assert index.nlist == 17
+    assert index.nprobe == expected
+
+
+def test_unknown_index_type(monkeypatch):
+    """Test that an unknown VECTOR_INDEX_TYPE is rejected."""
+    monkeypatch.setattr(db_config, "vector_index_type", "bogus")
+    
+    with pytest.raises(ValueError, match="Unknown vector index type: bogus"):
+        docs.build_vector_store([], _FakeEmbedder())
@@ -0,0 +1,109 @@
+"""Unit tests for the embedding cache module."""
+import numpy as np
+import pytest
+
+from ai_tools.config.database import db_config
+from ai_tools.storage.embedding_cache import EmbeddingCache
+
+
+class _FakeEmbedder:
+    """Embedder that records the texts it is asked for and embeds each as [len(text), 1]."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A fresh embedding cache."""
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+
+
+def test_misses_are_embedded_and_hits_are_not(cache):
+    """Test that only texts not seen before reach the embedder, and rows come back in order."""
+    embedder = _FakeEmbedder()
+    
+    first = cache.embed_documents(embedder, "model", ["a", "bb"])
+    second = cache.embed_documents(embedder, "model", ["ccc", "a", "bb"])
+    
+    assert embedder.calls == [["a", "bb"], ["ccc"]]
+    assert first.dtype == np.float32
+    np.testing.assert_array_equal(first, [[1, 1], [2, 1]])
+    np.testing.assert_array_equal(second, [[3, 1], [1, 1], [2, 1]])
+
+
+def test_duplicate_texts_are_embedded_once(cache):
+    """Test that repeated texts in one call are embedded once and returned for each position."""
+    embedder = _FakeEmbedder()
+    
+    vectors = cache.embed_documents(embedder, "model", ["a", "a", "bb", "a"])
+    
+    assert embedder.calls == [["a", "bb"]]
+    np.testing.assert_array_equal(vectors, [[1, 1], [1, 1], [2, 1], [1, 1]])
+
+
+def test_entries_persist_across_instances(cache):
+    """Test that another cache on the same file serves the stored vectors."""
+    cache.embed_documents(_FakeEmbedder(), "model", ["a"])
+    embedder = _FakeEmbedder()
+    
+    vectors = EmbeddingCache(cache.path).embed_documents(embedder, "model", ["a"])
+    
+    assert embedder.calls == []
+    np.testing.assert_array_equal(vectors, [[1, 1]])
+
+
+@pytest.mark.parametrize("name, value", [
+    ("model", "other-model"),
+    ("embedding_backend", "onnx"),
+])
+def test_key_includes_model_and_backend(cache, monkeypatch, name, value):
+    """Test that vectors are not shared between models or inference backends."""
+    cache.embed_documents(_FakeEmbedder(), "model", ["a"])
+    model = "model"
+    if name == "model":
+        model = value
+    else:
+        monkeypatch.setattr(db_config, name, value)
+    embedder = _FakeEmbedder()
+    
+    cache.embed_documents(embedder, model, ["a"])
+    
+    assert embedder.calls == [["a"]]
+
+
+def test_key_includes_onnx_file(cache, monkeypatch):
+    """Test that vectors from different ONNX weight files are kept apart."""
+    monkeypatch.setattr(db_config, "embedding_backend", "onnx")
+    cache.embed_documents(_FakeEmbedder(), "model", ["a"])
+    monkeypatch.setattr(db_config, "embedding_onnx_file", "onnx/model.onnx")
+    embedder = _FakeEmbedder()
+    
+    cache.embed_documents(embedder, "model", ["a"])
+    
+    assert embedder.calls == [["a"]]
+
+
+def test_lookups_span_parameter_batches(cache, monkeypatch):
+    """Test that more texts than fit in one SQLite statement are all found."""
+    monkeypatch.setattr("ai_tools.storage.embedding_cache._LOOKUP_BATCH", 2)
+    texts = ["a" * n for n in range(1, 6)]
+    cache.embed_documents(_FakeEmbedder(), "model", texts)
+    embedder = _FakeEmbedder()
+    
+    vectors = cache.embed_documents(embedder, "model", texts)
+    
+    assert embedder.calls == []
+    np.testing.assert_array_equal(vectors[:, 0], [1, 2, 3, 4, 5])
+
+
+def test_empty_input(cache):
+    """Test that nothing is embedded for an empty list."""
+    embedder = _FakeEmbedder()
+    
+    assert cache.embed_documents(embedder, "model", []).shape == (0, 0)
+    assert embedder.calls == []
@@ -0,0 +1,79 @@
+"""Unit tests for the numeric kernels module."""
+import importlib
+import sys
+import types
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import ai_tools.storage.kernels
+
+
+def _fake_numba():
+    """Stand-in for numba whose njit leaves the function as plain Python."""
+    module = types.ModuleType("numba")
+    module.njit = lambda **options: (lambda function: function)
+    module.prange = range
+    return module
+
+
+@pytest.fixture(params=["numpy", "loop", "numba"])
+def kernels(request):
+    """The kernels module with the NumPy fallback, the kernel loop run as Python, or real Numba."""
+    if request.param == "numba":
+        pytest.importorskip("numba")
+        replacement = {}
+    else:
+        replacement = {"numba": None if request.param == "numpy" else _fake_numba()}
+    with patch.dict(sys.modules, replacement):
+        module = importlib.reload(ai_tools.storage.kernels)
+    yield module
+    importlib.reload(ai_tools.storage.kernels)
+
+
+def _unit_rows(rng, count, dim):
+    matrix = rng.standard_normal((count, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True)
+
+
+@pytest.mark.parametrize("count, k", [(50, 1), (50, 5), (3, 10)])
+def test_topk_cosine_matches_numpy(kernels, count, k):
+    """Test that the top-k rows and scores match a NumPy reference."""
+    rng = np.random.default_rng(0)
+    matrix = _unit_rows(rng, count, 16)
+    query = _unit_rows(rng, 1, 16)[0]
+    
+    rows, scores = kernels.topk_cosine(query, matrix, k)
+    
+    reference = matrix @ query
+    expected = np.argsort(-reference)[:k]
+    np.testing.assert_array_equal(rows, expected)
+    np.testing.assert_allclose(scores, reference[expected], rtol=1e-5)
+
+
+def test_topk_cosine_accepts_float64_and_views(kernels):
+    """Test that non-float32 and non-contiguous inputs are converted."""
+    matrix = np.eye(4)[:, ::-1][::-1]
+    
+    rows, scores = kernels.topk_cosine(np.array([0.0, 0.0, 1.0, 0.0]), matrix, 1)
+    
+    assert rows.tolist() == [2]
+    assert scores.dtype == np.float32
+    assert scores[0] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_topk_cosine_empty(kernels, k):
+    """Test that no rows are returned for k <= 0."""
+    rows, scores = kernels.topk_cosine(np.ones(2, np.float32), np.ones((3, 2), np.float32), k)
+    
+    assert len(rows) == len(scores) == 0
+
+
+def test_warm_up_only_with_numba(kernels):
+    """Test that a compile thread is only started when the kernels are jitted."""
+    with patch("threading.Thread") as mock_thread:
+        kernels.warm_up_in_background()
+    
+    assert mock_thread.called == (kernels.njit is not None)
@@ -0,0 +1,130 @@
+"""Unit tests for the Ollama embeddings module."""
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from ai_tools.storage.ollama_embeddings import OllamaEmbeddings
+
+
+def _response(status_code=200, body=None):
+    """Mock HTTP response with a status code and JSON body."""
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = body
+    if status_code >= 400:
+        response.raise_for_status.side_effect = Exception(f"HTTP {status_code}")
+    return response
+
+
+@pytest.fixture
+def server():
+    """Embeddings client whose requests go to a fake Ollama server.
+    
+    Each text is embedded as [len(text), 1] and every request is recorded.
+    """
+    calls = []
+    embed_status = {"code": 200}
+    
+    def post(url, json, timeout):
+        calls.append((url.rsplit("/", 1)[1], json))
+        if url.endswith("/api/embed"):
+            if embed_status["code"] != 200:
+                return _response(embed_status["code"])
+            return _response(body={"embeddings": [[len(text), 1] for text in json["input"]]})
+        return _response(body={"embedding": [len(json["prompt"]), 1]})
+    
+    embeddings = OllamaEmbeddings("nomic-embed-text", "http://localhost:11434/", batch_size=2)
+    embeddings._session = MagicMock()
+    embeddings._session.post.side_effect = post
+    return embeddings, calls, embed_status
+
+
+def _expected(texts):
+    """Unit-length [len(text), 1] vectors."""
+    vectors = np.array([[len(text), 1] for text in texts], dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_embed_documents_in_batches(server):
+    """Test that texts are sent to /api/embed in batches of batch_size, in order."""
+    embeddings, calls, _ = server
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    
+    vectors = embeddings.embed_documents(texts)
+    
+    assert [endpoint for endpoint, _ in calls] == ["embed", "embed", "embed"]
+    assert [body["input"] for _, body in calls] == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert calls[0][1]["model"] == "nomic-embed-text"
+    np.testing.assert_allclose(vectors, _expected(texts), rtol=1e-6)
+
+
+def test_falls_back_to_per_text_endpoint_on_404(server):
+    """Test that a server without /api/embed is asked one text at a time, and only probed once."""
+    embeddings, calls, embed_status = server
+    embed_status["code"] = 404
+    
+    first = embeddings.embed_documents(["a", "bb", "ccc"])
+    second = embeddings.embed_query("dddd")
+    
+    endpoints = [endpoint for endpoint, _ in calls]
+    assert endpoints.count("embed") == 1
+    assert endpoints.count("embeddings") == 4
+    np.testing.assert_allclose(first, _expected(["a", "bb", "ccc"]), rtol=1e-6)
+    np.testing.assert_allclose(second, _expected(["dddd"])[0], rtol=1e-6)
+
+
+def test_plain_text_404_falls_back(server):
+    """Test that a 404 page that isn't JSON is taken as a missing batch endpoint."""
+    embeddings, _, _ = server
+    not_found = _response(404)
+    not_found.json.side_effect = ValueError("not JSON")
+    embeddings._session.post.side_effect = lambda url, json, timeout: (
+        not_found if url.endswith("/api/embed") else _response(body={"embedding": [1, 0]})
+    )
+    
+    assert embeddings.embed_documents(["a"]) == [[1.0, 0.0]]
+    assert embeddings._batch_supported is False
+
+
+def test_missing_model_404_does_not_disable_batching(server):
+    """Test that a 404 for a model that isn't pulled is raised and batching is kept."""
+    embeddings, calls, _ = server
+    missing_model = _response(404, {"error": 'model "nomic-embed-text" not found, try pulling it first'})
+    post = embeddings._session.post.side_effect
+    embeddings._session.post.side_effect = lambda url, json, timeout: missing_model
+    
+    with pytest.raises(Exception, match="HTTP 404"):
+        embeddings.embed_documents(["a"])
+    assert embeddings._batch_supported is None
+    
+    # Once the model is pulled, texts are still embedded in batches
+    embeddings._session.post.side_effect = post
+    embeddings.embed_documents(["a", "bb"])
+    assert [endpoint for endpoint, _ in calls] == ["embed"]
+
+
+def test_batch_errors_after_support_is_known_are_raised(server):
+    """Test that a 404 from a server known to support /api/embed is not mistaken for an old server."""
+    embeddings, calls, embed_status = server
+    embeddings.embed_documents(["a"])
+    embed_status["code"] = 404
+    
+    with pytest.raises(Exception, match="HTTP 404"):
+        embeddings.embed_documents(["bb"])
+
+
+def test_embed_documents_empty(server):
+    """Test that no request is made for an empty list."""
+    embeddings, calls, _ = server
+    
+    assert embeddings.embed_documents([]) == []
+    assert calls == []
+
+
+def test_zero_vector_is_not_normalized_to_nan(server):
+    """Test that an all-zero embedding stays zero instead of dividing by zero."""
+    embeddings, _, _ = server
+    embeddings._session.post.side_effect = lambda url, json, timeout: _response(body={"embeddings": [[0, 0]]})
+    
+    assert embeddings.embed_documents(["a"]) == [[0.0, 0.0]]
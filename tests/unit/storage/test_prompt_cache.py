@@ -0,0 +1,304 @@
+"""Unit tests for the prompt cache module."""
+import os
+from unittest.mock import patch
+
+import pytest
+
+from ai_tools.storage.prompt_cache import PromptCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Path of a fresh cache database."""
+    return str(tmp_path / "prompt_cache.sqlite3")
+
+
+def test_exact_hit_and_miss(cache_path):
+    """Test that responses are returned only for the same model and prompt."""
+    cache = PromptCache(cache_path)
+    cache.put("model-a", "prompt", "response")
+    
+    assert cache.get("model-a", "prompt") == "response"
+    assert cache.get("model-a", "other prompt") is None
+    assert cache.get("model-b", "prompt") is None
+
+
+@pytest.mark.parametrize("age, expected", [
+    (0, "response"),
+    (59, "response"),
+    (60, "response"),
+    (61, None),
+])
+def test_ttl_expiry(cache_path, age, expected):
+    """Test that entries older than the TTL are ignored."""
+    cache = PromptCache(cache_path, ttl=60)
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=1000.0):
+        cache.put("model", "prompt", "response")
+    
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=1000.0 + age):
+        assert cache.get("model", "prompt") == expected
+
+
+def test_no_ttl_keeps_entries(cache_path):
+    """Test that a TTL of 0 never expires entries."""
+    cache = PromptCache(cache_path)
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=0.0):
+        cache.put("model", "prompt", "response")
+    
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=1e9):
+        assert cache.get("model", "prompt") == "response"
+
+
+def test_expired_entry_is_replaced(cache_path):
+    """Test that a new response for an expired prompt is served again."""
+    cache = PromptCache(cache_path, ttl=60)
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=1000.0):
+        cache.put("model", "prompt", "old")
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=2000.0):
+        assert cache.get("model", "prompt") is None
+        cache.put("model", "prompt", "new")
+        assert cache.get("model", "prompt") == "new"
+
+
+def test_entries_persist_across_instances(cache_path):
+    """Test that responses are read back by another cache on the same file."""
+    PromptCache(cache_path).put("model", "prompt", "response")
+    
+    assert PromptCache(cache_path).get("model", "prompt") == "response"
+
+
+class _FakeEmbedder:
+    """Embedder returning fixed vectors for known prompts."""
+    
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+    
+    def embed_query(self, text):
+        self.calls.append(text)
+        return list(self.vectors[text])
+
+
+@pytest.fixture
+def embedder():
+    """Patch the prompt embedder with a _FakeEmbedder; tests fill in its vectors."""
+    fake = _FakeEmbedder({})
+    with patch("ai_tools.storage.embeddings.get_embedder", return_value=fake):
+        yield fake
+
+
+def test_vectors_round_trip_through_dimension_file(cache_path, embedder):
+    """Test that embeddings are appended to a per-dimension matrix file and read back by a new cache."""
+    import numpy as np
+    
+    embedder.vectors.update({"first": [3.0, 4.0, 0.0], "second": [0.0, 0.0, 2.0], "wide": [1.0, 0.0, 0.0, 0.0]})
+    cache = PromptCache(cache_path, similarity=0.9)
+    cache.put("model", "first", "response 1")
+    cache.put("model", "second", "response 2")
+    cache.put("model", "wide", "response 3")
+    
+    assert os.path.getsize(f"{cache_path}.3d.f32") == 2 * 3 * 4
+    assert os.path.getsize(f"{cache_path}.4d.f32") == 1 * 4 * 4
+    
+    reloaded = PromptCache(cache_path, similarity=0.9)
+    np.testing.assert_allclose(reloaded._load_vectors(3), [[0.6, 0.8, 0.0], [0.0, 0.0, 1.0]])
+    np.testing.assert_allclose(reloaded._load_vectors(4), [[1.0, 0.0, 0.0, 0.0]])
+    assert reloaded._load_vectors(5) is None
+
+
+def test_append_realigns_after_partial_write(cache_path):
+    """Test that a row cut short by an interrupted write is overwritten by the next one."""
+    import numpy as np
+    
+    cache = PromptCache(cache_path)
+    with open(f"{cache_path}.2d.f32", "wb") as f:
+        f.write(np.ones(2, np.float32).tobytes() + b"\x00\x00")
+    
+    assert cache._append_vector(np.zeros(2, np.float32)) == 1
+    np.testing.assert_array_equal(cache._load_vectors(2), [[1.0, 1.0], [0.0, 0.0]])
+
+
+@pytest.mark.parametrize("query, model, expected", [
+    ([1.0, 0.1, 0.0], "model", "cached"),   # cosine ~0.995
+    ([1.0, 1.0, 0.0], "model", None),       # cosine ~0.707
+    ([1.0, 0.1, 0.0], "other", None),       # similar, but another model's entry
+])
+def test_similarity_threshold(cache_path, embedder, query, model, expected):
+    """Test that a near match is only served at or above the threshold and for the same model."""
+    embedder.vectors.update({"stored": [1.0, 0.0, 0.0], "query": query})
+    cache = PromptCache(cache_path, similarity=0.9)
+    cache.put("model", "stored", "cached")
+    
+    assert cache.get(model, "query") == expected
+
+
+_TEMPLATE = "Answer briefly, in plain text, without markdown, in at most three lines.\n\nQuestion: {}\nAnswer:"
+
+
+def test_similarity_compares_only_the_query(cache_path, embedder):
+    """Test that different questions in the same long template are not near matches."""
+    embedder.vectors.update({
+        "How do I list files?": [1.0, 0.0],
+        "How do I delete a user?": [0.0, 1.0],
+    })
+    cache = PromptCache(cache_path, similarity=0.9)
+    cache.put("model", _TEMPLATE.format("How do I list files?"), "ls", query="How do I list files?")
+    
+    other = "How do I delete a user?"
+    assert cache.get("model", _TEMPLATE.format(other), query=other) is None
+    assert embedder.calls == ["How do I list files?", other]
+
+
+def test_similarity_requires_the_same_template(cache_path, embedder):
+    """Test that a near match is only served for a prompt built from the same template."""
+    embedder.vectors.update({"list files": [1.0, 0.0], "list the files": [1.0, 0.05]})
+    cache = PromptCache(cache_path, similarity=0.9)
+    cache.put("model", _TEMPLATE.format("list files"), "ls", query="list files")
+    
+    assert cache.get("model", _TEMPLATE.format("list the files"), query="list the files") == "ls"
+    assert cache.get("model", f"Explain: list the files", query="list the files") is None
+    assert cache.get("model", "list the files") is None
+
+
+def test_similarity_ignores_expired_entries(cache_path, embedder):
+    """Test that the TTL also applies to near matches."""
+    embedder.vectors.update({"stored": [1.0, 0.0], "query": [1.0, 0.05]})
+    cache = PromptCache(cache_path, similarity=0.9, ttl=60)
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=1000.0):
+        cache.put("model", "stored", "cached")
+    
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=1030.0):
+        assert cache.get("model", "query") == "cached"
+    with patch("ai_tools.storage.prompt_cache.time.time", return_value=1100.0):
+        assert cache.get("model", "query") is None
+
+
+def test_embedding_reused_between_lookup_and_store(cache_path, embedder):
+    """Test that a missed prompt is embedded once for both the lookup and the store."""
+    embedder.vectors.update({"prompt": [1.0, 0.0]})
+    cache = PromptCache(cache_path, similarity=0.9)
+    
+    assert cache.get("model", "prompt") is None
+    cache.put("model", "prompt", "response")
+    
+    assert embedder.calls == ["prompt"]
+
+
+def test_concurrent_stores_keep_their_own_embeddings(cache_path, embedder):
+    """Test that prompts looked up and stored from several threads get their own vectors."""
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    
+    prompts = [f"prompt {i}" for i in range(32)]
+    for i, prompt in enumerate(prompts):
+        vector = [0.0] * 32
+        vector[i] = 1.0
+        embedder.vectors[prompt] = vector
+    cache = PromptCache(cache_path, similarity=0.99)
+    
+    def ask(prompt):
+        if cache.get("model", prompt) is None:
+            cache.put("model", prompt, prompt.upper())
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(ask, prompts))
+    
+    for prompt in prompts:
+        assert cache.get("model", prompt) == prompt.upper()
+    rows = cache._conn.execute("SELECT response, vector_row FROM responses").fetchall()
+    vectors = cache._load_vectors(32)
+    for response, row in rows:
+        assert int(np.argmax(vectors[row])) == int(response.split()[1])
+
+
+# Prompts stored by each process; enough for the appends to interleave
+_PROCESS_PROMPTS = 500
+
+
+class _OneHotCache(PromptCache):
+    """Cache embedding "prompt <i>" as the i-th unit vector, without a model."""
+    
+    def _embed(self, key, prompt):
+        import numpy as np
+        
+        vector = np.zeros(_PROCESS_PROMPTS * 2, np.float32)
+        vector[int(prompt.split()[1])] = 1.0
+        return vector
+
+
+def _put_prompts(cache_path, first, start):
+    start.wait()
+    cache = _OneHotCache(cache_path, similarity=0.99)
+    for i in range(first, first + _PROCESS_PROMPTS):
+        cache.put("model", f"prompt {i}", f"PROMPT {i}")
+
+
+def test_concurrent_stores_from_processes(cache_path):
+    """Test that two processes storing at once never share or overwrite a vector row."""
+    import multiprocessing
+    import numpy as np
+    
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("needs the fork start method")
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    workers = [context.Process(target=_put_prompts, args=(cache_path, first, start)) for first in (0, _PROCESS_PROMPTS)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+    
+    cache = _OneHotCache(cache_path, similarity=0.99)
+    rows = cache._connect().execute("SELECT response, vector_row FROM responses").fetchall()
+    vectors = cache._load_vectors(_PROCESS_PROMPTS * 2)
+    assert len(rows) == _PROCESS_PROMPTS * 2
+    assert len({row for _, row in rows}) == _PROCESS_PROMPTS * 2
+    for response, row in rows:
+        assert int(np.argmax(vectors[row])) == int(response.split()[1])
+
+
+def test_old_blob_schema_is_replaced(cache_path):
+    """Test that a cache written with embeddings stored as BLOBs is recreated."""
+    import sqlite3
+    
+    with sqlite3.connect(cache_path) as conn:
+        conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, model TEXT, response TEXT, "
+                     "embedding BLOB, created_at REAL)")
+        conn.execute("INSERT INTO responses VALUES ('k', 'model', 'old', NULL, 0)")
+    
+    cache = PromptCache(cache_path)
+    cache.put("model", "prompt", "response")
+    
+    assert cache.get("model", "prompt") == "response"
+    assert cache._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 1
+
+
+def test_schema_without_template_is_replaced(cache_path):
+    """Test that a cache written before entries recorded their template is recreated."""
+    import sqlite3
+    
+    with sqlite3.connect(cache_path) as conn:
+        conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, "
+                     "vector_dim INTEGER, vector_row INTEGER, created_at REAL NOT NULL)")
+        conn.execute("INSERT INTO responses VALUES ('k', 'model', 'old', NULL, NULL, 0)")
+    
+    cache = PromptCache(cache_path)
+    cache.put("model", "prompt", "response")
+    
+    assert cache.get("model", "prompt") == "response"
+    assert cache._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 1
+
+
+def test_database_uses_wal(cache_path):
+    """Test that the cache is opened in WAL mode, so other processes can read during a write."""
+    import sqlite3
+    
+    cache = PromptCache(cache_path)
+    cache.put("model", "prompt", "response")
+    
+    assert cache._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # A second connection reads the committed entry while the first is open
+    with sqlite3.connect(cache_path) as reader:
+        assert reader.execute("SELECT response FROM responses").fetchone() == ("response",)
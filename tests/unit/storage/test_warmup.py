@@ -0,0 +1,67 @@
+"""Unit tests for the warm-up module."""
+from unittest.mock import MagicMock, patch
+
+from ai_tools.storage import warmup
+
+
+def test_warmup_runs_every_step(capsys):
+    """Test that all steps run in order and success is reported."""
+    calls = []
+    steps = tuple((name, lambda name=name: calls.append(name)) for name in ("one", "two"))
+    
+    with patch.object(warmup, "_STEPS", steps):
+        assert warmup.warmup(verbose=True) is True
+    
+    assert calls == ["one", "two"]
+    assert capsys.readouterr().out == "Warmed up one\nWarmed up two\n"
+
+
+def test_warmup_continues_after_a_failed_step(capsys):
+    """Test that a failing step is reported and the later steps still run."""
+    later = MagicMock()
+    steps = (("broken", MagicMock(side_effect=ImportError("no faiss"))), ("later", later))
+    
+    with patch.object(warmup, "_STEPS", steps):
+        assert warmup.warmup(verbose=True) is False
+    
+    later.assert_called_once()
+    assert "Could not warm up broken: no faiss" in capsys.readouterr().out
+
+
+def test_warmup_quiet_by_default(capsys):
+    """Test that nothing is printed unless verbose."""
+    with patch.object(warmup, "_STEPS", (("one", MagicMock()),)):
+        warmup.warmup()
+    
+    assert capsys.readouterr().out == ""
+
+
+def test_warm_up_in_background():
+    """Test that the warm-up runs on a daemon thread."""
+    step = MagicMock()
+    
+    with patch.object(warmup, "_STEPS", (("one", step),)):
+        thread = warmup.warm_up_in_background()
+        thread.join(timeout=5)
+    
+    assert thread.daemon
+    step.assert_called_once()
+
+
+def test_warm_kernels_and_faiss():
+    """Test that the kernel and FAISS steps run for real."""
+    warmup._warm_kernels()
+    warmup._warm_faiss()
+
+
+@patch("ai_tools.storage.prompt_cache.get_prompt_cache")
+def test_warm_prompt_cache(mock_get_cache):
+    """Test that the prompt cache is opened when enabled and skipped otherwise."""
+    mock_get_cache.return_value = None
+    warmup._warm_prompt_cache()
+    
+    cache = MagicMock()
+    mock_get_cache.return_value = cache
+    warmup._warm_prompt_cache()
+    
+    cache._connect.assert_called_once()
@@ -45,4 +45,18 @@ def test_main_not_called_on_import(mock_main):
     importlib.reload(ai_tools.__main__)
     
     # Verify main() was not called
-    mock_main.assert_not_called()
\ No newline at end of file
+    mock_main.assert_not_called()
+
+def test_freeze_support_called_before_main():
+    """Test that worker processes of a frozen build are handed to multiprocessing before the CLI runs."""
+    import runpy
+    
+    calls = []
+    with patch('multiprocessing.freeze_support', side_effect=lambda: calls.append("freeze_support")), \
+            patch('ai_tools.main.main', side_effect=lambda: calls.append("main")), \
+            patch.dict(sys.modules):
+        # Run fresh, as 'python -m ai_tools' would, rather than over the imported module
+        sys.modules.pop('ai_tools.__main__', None)
+        runpy.run_module('ai_tools.__main__', run_name='__main__')
+    
+    assert calls == ["freeze_support", "main"]
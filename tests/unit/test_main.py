@@ -1,27 +1,30 @@
 """Unit tests for the main module."""
 import os
 import sys
+import json
 import logging
+import argparse
 import pytest
-import psutil
 from unittest.mock import patch, MagicMock, call, mock_open
 from io import StringIO
 
 from ai_tools.main import (
     main,
     parse_args,
+    _build_parser,
+    _parse_simple_args,
     handle_run_command,
     handle_prompt_command,
     handle_error_command,
     handle_load_command,
     handle_speak_command,
     print_environment_info,
-    install_shell_integration_command,
     handle_sim_command,
     _get_sim_processes,
     _save_sim_process,
     _remove_sim_process,
-    _is_process_running
+    _is_process_running,
+    SIM_WORKER_COMMAND,
 )
 
 
@@ -79,6 +82,17 @@ def test_main_no_command(mock_print_help, mock_parse_args, argv_backup):
     mock_print_help.assert_called_once()
 
 
+@patch('ai_tools.main.argparse.ArgumentParser.parse_args')
+@patch('ai_tools.main.argparse.ArgumentParser.print_help', autospec=True)
+def test_main_no_command_reuses_parser(mock_print_help, mock_parse_args, argv_backup):
+    """Test that help is printed by the same parser that parsed the arguments."""
+    mock_parse_args.return_value = MagicMock(command=None, verbose=False, config=None)
+
+    main([])
+
+    assert mock_print_help.call_args.args[0] is _build_parser(None)
+
+
 @patch('ai_tools.main.argparse.ArgumentParser.parse_args')
 @patch('ai_tools.main.logging.basicConfig')
 def test_main_verbose_mode(mock_logging_config, mock_parse_args, argv_backup):
@@ -103,6 +117,15 @@ def test_main_verbose_mode(mock_logging_config, mock_parse_args, argv_backup):
     mock_print.assert_any_call("Starting AI Tools in verbose mode")
 
 
+@patch('ai_tools.main.logging.basicConfig')
+@patch('ai_tools.main.print_environment_info')
+def test_main_leaves_logging_unconfigured(mock_info, mock_logging_config):
+    """Test that logging is only configured in verbose mode."""
+    main(["info"])
+    
+    mock_logging_config.assert_not_called()
+
+
 @patch('ai_tools.main.argparse.ArgumentParser.parse_args')
 def test_main_with_config(mock_parse_args, argv_backup, capsys):
     """Test the main function with a config file."""
@@ -194,6 +217,28 @@ def test_main_error_command(mock_handle_error, mock_parse_args, argv_backup):
     mock_handle_error.assert_called_once_with(mock_args)
 
 
+@patch('ai_tools.main.parse_args')
+@patch('ai_tools.mcp.actions.ask_llm_to_explain_error')
+def test_main_error_command_without_output(mock_ask_llm, mock_parse_args, capsys):
+    """Test that 'error' with only a command bypasses argparse and uses a default message."""
+    mock_ask_llm.return_value = "Explained"
+
+    main(["error", "make"])
+
+    mock_parse_args.assert_not_called()
+    mock_ask_llm.assert_called_once_with("make", "Command failed with no output")
+    assert "Explained" in capsys.readouterr().out
+
+
+@patch('ai_tools.mcp.actions.ask_llm_to_explain_error')
+def test_main_error_command_missing_command(mock_ask_llm, capsys):
+    """Test that 'error' without a command reports the missing argument."""
+    main(["error"])
+
+    mock_ask_llm.assert_not_called()
+    assert "Missing command to analyze" in capsys.readouterr().out
+
+
 @patch('ai_tools.main.argparse.ArgumentParser.parse_args')
 @patch('ai_tools.main.handle_load_command')
 def test_main_load_command(mock_handle_load, mock_parse_args, argv_backup):
@@ -230,6 +275,109 @@ def test_main_info_command(mock_print_env, mock_parse_args, argv_backup):
     mock_print_env.assert_called_once()
 
 
+@patch('ai_tools.main.parse_args')
+@patch('ai_tools.main.print_environment_info')
+def test_main_info_command_skips_parser(mock_print_env, mock_parse_args):
+    """Test that a bare 'info' is dispatched without parsing arguments."""
+    main(["info"])
+
+    mock_print_env.assert_called_once()
+    mock_parse_args.assert_not_called()
+
+
+def test_parse_args_reuses_parser():
+    """Test that the parser is built once and reused across calls."""
+    assert parse_args(["run", "list", "files"]).prompt == ["list", "files"]
+    assert parse_args(["info"]).command == "info"
+    assert _build_parser(None) is _build_parser(None)
+
+
+def test_parse_args_builds_only_invoked_subparser():
+    """Test that only the invoked subcommand's parser is built."""
+    args = parse_args(["--config", "cfg.yaml", "sim", "msfs", "start"])
+    assert (args.config, args.command, args.game_type, args.action) == ("cfg.yaml", "sim", "msfs", "start")
+
+    subparsers = _build_parser("sim")._subparsers._group_actions[0]
+    assert list(subparsers.choices) == ["sim"]
+
+
+@pytest.mark.parametrize("argv, handler", [
+    (["error", "make", "failed"], "_handle_error_argv"),
+    (["info"], "print_environment_info"),
+    (["sim", "msfs", "start"], "handle_sim_command"),
+    (["sim", "stop"], "handle_sim_command"),
+])
+@patch('ai_tools.main._build_parser')
+def test_main_fast_paths_skip_parser(mock_build_parser, argv, handler):
+    """Test that the most common commands never build an argparse parser."""
+    with patch(f'ai_tools.main.{handler}') as mock_handler:
+        main(argv)
+    
+    mock_build_parser.assert_not_called()
+    mock_handler.assert_called_once()
+
+
+@patch('ai_tools.main._build_parser')
+@patch('ai_tools.main.handle_run_command')
+def test_main_simple_command_skips_parser(mock_handle_run, mock_build_parser):
+    """Test that a plain command with words is dispatched without argparse."""
+    main(["run", "list", "files"])
+
+    mock_build_parser.assert_not_called()
+    args = mock_handle_run.call_args.args[0]
+    assert (args.command, args.prompt, args.verbose, args.config) == ("run", ["list", "files"], False, None)
+
+
+@pytest.mark.parametrize("argv, uses_parser", [
+    (["prompt", "hello", "there"], False),
+    (["speak", "hi"], False),
+    (["info"], False),
+    (["prompt", "-v", "hello"], True),
+    (["run"], True),
+    (["info", "extra"], True),
+    (["-v", "run", "ls"], True),
+    (["load", "docs"], True),
+    (["prompt", "--no-cache", "hello"], True),
+    (["sim", "msfs", "start"], False),
+    (["sim", "stop"], False),
+    (["sim", "bogus", "start"], True),
+    (["sim", "msfs", "restart"], True),
+    (["sim"], True),
+    (["sim", "-v", "msfs", "start"], True),
+])
+def test_parse_simple_args(argv, uses_parser):
+    """Test which command lines are left to argparse."""
+    args = _parse_simple_args(argv)
+    assert (args is None) == uses_parser
+    if args is not None:
+        assert args == parse_args(argv)
+
+
+def test_parse_args_no_cache():
+    """Test the prompt and speak commands can skip the prompt cache."""
+    assert parse_args(["prompt", "hi"]).no_cache is False
+    assert parse_args(["prompt", "--no-cache", "hi"]).no_cache is True
+    assert parse_args(["speak", "hi", "--no-cache"]).no_cache is True
+
+
+def test_parse_args_load_batch_size(capsys):
+    """Test the load command's embedding batch size option."""
+    assert parse_args(["load", "docs"]).batch_size is None
+    assert parse_args(["load", "docs", "--batch-size", "16"]).batch_size == 16
+    
+    with pytest.raises(SystemExit):
+        parse_args(["load", "docs", "--batch-size", "0"])
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+def test_parse_args_unknown_command_uses_full_parser(capsys):
+    """Test that an unknown command is reported with every available choice."""
+    with pytest.raises(SystemExit):
+        parse_args(["bogus"])
+
+    assert "invalid choice: 'bogus'" in capsys.readouterr().err
+
+
 @patch('ai_tools.main.argparse.ArgumentParser.parse_args')
 @patch('ai_tools.main.handle_speak_command')
 def test_main_speak_command(mock_handle_speak, mock_parse_args, argv_backup):
@@ -249,7 +397,7 @@ def test_main_speak_command(mock_handle_speak, mock_parse_args, argv_backup):
 
 
 @patch('ai_tools.main.argparse.ArgumentParser.parse_args')
-@patch('ai_tools.main.install_shell_integration_command')
+@patch('ai_tools.modules.shell_tools.install_shell_integration_command')
 def test_main_install_shell_command(mock_install_shell, mock_parse_args, argv_backup):
     """Test the main function with install-shell command."""
     # Setup mock args
@@ -284,8 +432,8 @@ def test_main_unknown_command(mock_print_help, mock_parse_args, argv_backup):
     mock_print_help.assert_called_once()
 
 
-@patch('ai_tools.main.get_ollama_url')
-@patch('ai_tools.main.get_ollama_model')
+@patch('ai_tools.mcp.actions.get_ollama_url')
+@patch('ai_tools.mcp.actions.get_ollama_model')
 def test_print_environment_info(mock_get_model, mock_get_url, setup_env, capsys):
     """Test the print_environment_info function."""
     mock_get_model.return_value = "test-model"
@@ -301,7 +449,7 @@ def test_print_environment_info(mock_get_model, mock_get_url, setup_env, capsys)
     assert "API URL: http://localhost:11434/api/generate" in captured.out
 
 
-@patch('ai_tools.main.run_ai_command')
+@patch('ai_tools.mcp.actions.run_ai_command')
 def test_handle_run_command(mock_run_ai_command, capsys):
     """Test the handle_run_command function."""
     mock_run_ai_command.return_value = ("ls -la", "sample output")
@@ -322,7 +470,7 @@ def test_handle_run_command(mock_run_ai_command, capsys):
     assert "Output: sample output" in captured.out
 
 
-@patch('ai_tools.main.prompt_ollama_http')
+@patch('ai_tools.mcp.actions.prompt_ollama_http_async')
 @patch('ai_tools.main.db_config')
 def test_handle_prompt_command(mock_db_config, mock_prompt, capsys):
     """Test the handle_prompt_command function."""
@@ -332,12 +480,13 @@ def test_handle_prompt_command(mock_db_config, mock_prompt, capsys):
     args = MagicMock()
     args.prompt = ["hello", "world"]
     args.verbose = True
+    args.no_cache = False
     
     handle_prompt_command(args)
     
     # Verify function was called with correct arguments
     mock_db_config.set_verbose.assert_called_once_with(True)
-    mock_prompt.assert_called_once_with("hello world", use_streaming=True, verbose=True)
+    mock_prompt.assert_called_once_with("hello world", use_streaming=True, verbose=True, use_cache=True)
     
     # Check the output
     captured = capsys.readouterr()
@@ -346,7 +495,7 @@ def test_handle_prompt_command(mock_db_config, mock_prompt, capsys):
     assert "AI response" in captured.out
 
 
-@patch('ai_tools.main.ask_llm_to_explain_error')
+@patch('ai_tools.mcp.actions.ask_llm_to_explain_error')
 def test_handle_error_command(mock_ask_llm, capsys):
     """Test the handle_error_command function."""
     mock_ask_llm.return_value = "Command not found"
@@ -370,7 +519,7 @@ def test_handle_error_command(mock_ask_llm, capsys):
 
 @patch('os.path.exists')
 @patch('os.path.isdir')
-@patch('ai_tools.main.MCP_ACTIONS')
+@patch('ai_tools.mcp.actions.MCP_ACTIONS')
 @patch('ai_tools.main.db_config')
 def test_handle_load_command_success(mock_db_config, mock_actions, mock_isdir, mock_exists, capsys):
     """Test the handle_load_command function with successful load."""
@@ -389,6 +538,8 @@ def test_handle_load_command_success(mock_db_config, mock_actions, mock_isdir, m
     args = MagicMock()
     args.directory = "/test/docs"
     args.verbose = True
+    args.batch_size = 32
+    args.no_cache = False
     
     handle_load_command(args)
     
@@ -397,7 +548,7 @@ def test_handle_load_command_success(mock_db_config, mock_actions, mock_isdir, m
     mock_isdir.assert_called_once_with("/test/docs")
     mock_db_config.set_verbose.assert_called_once_with(True)
     mock_actions.get.assert_called_once_with("vectorize_documents")
-    mock_vectorize.assert_called_once_with("/test/docs", db_name="knowledge")
+    mock_vectorize.assert_called_once_with("/test/docs", db_name="knowledge", batch_size=32, use_cache=True)
     
     # Check the output
     captured = capsys.readouterr()
@@ -426,7 +577,7 @@ def test_handle_load_command_invalid_dir(mock_isdir, mock_exists, capsys):
 
 @patch('os.path.exists')
 @patch('os.path.isdir')
-@patch('ai_tools.main.MCP_ACTIONS')
+@patch('ai_tools.mcp.actions.MCP_ACTIONS')
 def test_handle_load_command_action_not_available(mock_actions, mock_isdir, mock_exists, capsys):
     """Test the handle_load_command function when vectorize_documents is not available."""
     # Setup mocks
@@ -448,7 +599,7 @@ def test_handle_load_command_action_not_available(mock_actions, mock_isdir, mock
 
 @patch('os.path.exists')
 @patch('os.path.isdir')
-@patch('ai_tools.main.MCP_ACTIONS')
+@patch('ai_tools.mcp.actions.MCP_ACTIONS')
 def test_handle_load_command_failure(mock_actions, mock_isdir, mock_exists, capsys):
     """Test the handle_load_command function when vectorize_documents fails."""
     # Setup mocks
@@ -474,14 +625,20 @@ def test_handle_load_command_failure(mock_actions, mock_isdir, mock_exists, caps
     assert "Error: Failed to process documents" in captured.out
 
 
-@patch('ai_tools.main.prompt_ollama_http')
-@patch('ai_tools.main.SpeechToText')
+@patch('ai_tools.mcp.actions.prompt_ollama_http_async')
+@patch('ai_tools.modules.speech.SpeechToText')
 @patch('ai_tools.main.db_config')
 def test_handle_speak_command(mock_db_config, mock_speech, mock_prompt, capsys):
     """Test the handle_speak_command function."""
     # Setup mocks
-    mock_prompt.return_value = "AI response"
+    def stream_response(prompt, use_streaming, verbose, on_chunk, use_cache):
+        for chunk in ["AI ", "response"]:
+            on_chunk(chunk)
+        return "AI response"
+    mock_prompt.side_effect = stream_response
+    spoken = []
     mock_speech_instance = MagicMock()
+    mock_speech_instance.speech_stream.side_effect = lambda chunks: spoken.extend(chunks)
     mock_speech.return_value = mock_speech_instance
     
     # Create mock args
@@ -494,16 +651,63 @@ def test_handle_speak_command(mock_db_config, mock_speech, mock_prompt, capsys):
     # Verify functions were called with correct arguments
     mock_db_config.set_verbose.assert_called_once_with(False)
     mock_speech.assert_called_once()
-    mock_prompt.assert_called_once_with("tell me a joke", use_streaming=False, verbose=False)
-    mock_speech_instance.speech.assert_called_once_with("AI response")
+    mock_prompt.assert_called_once()
+    assert mock_prompt.call_args.args == ("tell me a joke",)
+    assert mock_prompt.call_args.kwargs["use_streaming"] is True
+    # The streamed chunks were handed to the speech engine as they arrived
+    assert spoken == ["AI ", "response"]
     
     # Check the output
     captured = capsys.readouterr()
     assert "Sending prompt to Ollama: 'tell me a joke'" in captured.out
     assert "Please wait while getting response..." in captured.out
-    assert "Response:" in captured.out
-    assert "AI response" in captured.out
     assert "Speaking response..." in captured.out
+    assert "Done speaking." in captured.out
+
+
+@patch('ai_tools.mcp.actions.prompt_ollama_http_async')
+@patch('ai_tools.modules.speech.SpeechToText')
+@patch('ai_tools.main.db_config')
+def test_handle_speak_command_error(mock_db_config, mock_speech, mock_prompt):
+    """Test that an error returned instead of a stream is still spoken."""
+    mock_prompt.return_value = "Error: Could not connect to Ollama server."
+    spoken = []
+    mock_speech_instance = MagicMock()
+    mock_speech_instance.speech_stream.side_effect = lambda chunks: spoken.extend(chunks)
+    mock_speech.return_value = mock_speech_instance
+    
+    args = MagicMock()
+    args.prompt = ["hello"]
+    args.verbose = False
+    
+    handle_speak_command(args)
+    
+    assert spoken == ["Error: Could not connect to Ollama server."]
+
+
+@patch('ai_tools.mcp.actions.prompt_ollama_http_async')
+@patch('ai_tools.modules.speech.SpeechToText')
+@patch('ai_tools.main.db_config')
+def test_handle_speak_command_announces_first_chunk(mock_db_config, mock_speech, mock_prompt, capsys):
+    """Test that speaking is announced when the first chunk arrives, not after the response."""
+    announced = []
+    
+    def stream_response(prompt, use_streaming, verbose, on_chunk, use_cache):
+        on_chunk("Hello. ")
+        announced.append("Speaking response..." in capsys.readouterr().out)
+        on_chunk("World.")
+        return "Hello. World."
+    mock_prompt.side_effect = stream_response
+    mock_speech.return_value.speech_stream.side_effect = lambda chunks: list(chunks)
+    
+    args = MagicMock()
+    args.prompt = ["hello"]
+    args.verbose = False
+    
+    handle_speak_command(args)
+    
+    assert announced == [True]
+    assert "Speaking response..." not in capsys.readouterr().out
 
 
 @patch('ai_tools.main.argparse.ArgumentParser.parse_args')
@@ -524,6 +728,37 @@ def test_main_sim_command(mock_handle_sim, mock_parse_args, argv_backup):
     mock_handle_sim.assert_called_once_with(mock_args)
 
 
+@patch('ai_tools.storage.warmup.warmup', return_value=True)
+def test_main_warmup_command(mock_warmup, capsys):
+    """Test the warmup command runs the warm-up in the foreground."""
+    main(["warmup"])
+
+    mock_warmup.assert_called_once_with(verbose=True)
+    assert "Warm-up complete." in capsys.readouterr().out
+
+
+@patch('ai_tools.storage.warmup.warmup', return_value=False)
+def test_main_warmup_command_failure(mock_warmup):
+    """Test the warmup command exits non-zero when a step fails."""
+    with pytest.raises(SystemExit) as excinfo:
+        main(["warmup"])
+
+    assert excinfo.value.code == 1
+
+
+@patch('ai_tools.main.handle_run_command')
+@patch('ai_tools.storage.warmup.warm_up_in_background')
+@patch('ai_tools.main.db_config')
+def test_main_starts_background_warmup(mock_db_config, mock_warm, mock_handle_run):
+    """Test that AI_TOOLS_WARMUP starts the warm-up alongside a command."""
+    mock_db_config.warmup_enabled = True
+
+    main(["run", "list", "files"])
+
+    mock_warm.assert_called_once()
+    mock_handle_run.assert_called_once()
+
+
 def test_parse_args_default():
     """Test parse_args with default arguments."""
     args = parse_args([])
@@ -666,14 +901,14 @@ def test_parse_args_sim_command():
 
 @patch('ai_tools.main._get_sim_processes')
 @patch('ai_tools.main._is_process_running')
-@patch('os.fork')
+@patch('subprocess.Popen')
 @patch('ai_tools.main._save_sim_process')
-def test_handle_sim_command_start_new_process(mock_save_process, mock_fork, 
+def test_handle_sim_command_start_new_process(mock_save_process, mock_popen, 
                                              mock_is_running, mock_get_processes, capsys):
     """Test handle_sim_command starting a new process."""
     # Setup mocks
     mock_get_processes.return_value = {}
-    mock_fork.return_value = 12345  # Parent process gets PID
+    mock_popen.return_value.pid = 12345
     
     # Create mock args
     args = MagicMock()
@@ -684,7 +919,9 @@ def test_handle_sim_command_start_new_process(mock_save_process, mock_fork,
     
     # Verify process handling
     mock_get_processes.assert_called_once()
-    mock_fork.assert_called_once()
+    mock_popen.assert_called_once_with(
+        [sys.executable, "-m", "ai_tools.modules.sim", "dummy"], start_new_session=True
+    )
     mock_save_process.assert_called_once_with('dummy', 12345)
     
     # Check output
@@ -693,6 +930,48 @@ def test_handle_sim_command_start_new_process(mock_save_process, mock_fork,
     assert "Started dummy simulator process with PID: 12345" in captured.out
 
 
+@patch('ai_tools.main._get_sim_processes', return_value={})
+@patch('subprocess.Popen')
+@patch('ai_tools.main._save_sim_process')
+def test_handle_sim_command_start_frozen(mock_save_process, mock_popen, mock_get_processes, monkeypatch):
+    """Test that a frozen binary starts the simulator through its hidden subcommand."""
+    monkeypatch.setattr(sys, "frozen", True, raising=False)
+    mock_popen.return_value.pid = 12345
+    
+    handle_sim_command(argparse.Namespace(game_type='msfs', action='start'))
+    
+    mock_popen.assert_called_once_with(
+        [sys.executable, SIM_WORKER_COMMAND, "msfs"], start_new_session=True
+    )
+
+
+@pytest.mark.parametrize("game_type, message", [
+    ("iracing", "Error: iRacing support is not yet implemented"),
+    ("bogus", "Error: Unsupported game type: bogus"),
+])
+@patch('ai_tools.main._get_sim_processes', return_value={})
+@patch('subprocess.Popen')
+@patch('ai_tools.main._save_sim_process')
+def test_handle_sim_command_start_unsupported(mock_save_process, mock_popen, mock_get_processes,
+                                              game_type, message, capsys):
+    """Test that an unsupported game type is rejected before a process is started."""
+    handle_sim_command(argparse.Namespace(game_type=game_type, action='start'))
+    
+    mock_popen.assert_not_called()
+    mock_save_process.assert_not_called()
+    assert message in capsys.readouterr().out
+
+
+@patch('ai_tools.modules.sim.main', return_value=0)
+def test_main_sim_worker(mock_sim_main):
+    """Test that the hidden worker subcommand runs the simulator in this process."""
+    with pytest.raises(SystemExit) as exit_info:
+        main([SIM_WORKER_COMMAND, "dummy"])
+    
+    assert exit_info.value.code == 0
+    mock_sim_main.assert_called_once_with(["dummy"])
+
+
 @patch('ai_tools.main._get_sim_processes')
 @patch('ai_tools.main._is_process_running')
 def test_handle_sim_command_start_already_running(mock_is_running, mock_get_processes, capsys):
@@ -799,84 +1078,118 @@ def test_handle_sim_command_stop_stale_process(mock_remove_process, mock_is_runn
     assert "Process with PID 12345 is no longer running" in captured.out
 
 
-@patch('os.path.exists')
-@patch('builtins.open', new_callable=mock_open, read_data='{"msfs": 12345}')
-def test_get_sim_processes_existing_file(mock_file, mock_exists):
+@pytest.fixture
+def sim_process_file(tmp_path, monkeypatch):
+    """Point the sim process file at a temporary path."""
+    path = tmp_path / "aitools_sim_processes.json"
+    monkeypatch.setattr('ai_tools.main.SIM_PROCESS_INFO_FILE', str(path))
+    monkeypatch.setattr('ai_tools.main._sim_processes_cache', None)
+    return path
+
+
+def test_get_sim_processes_existing_file(sim_process_file):
     """Test _get_sim_processes with existing file."""
-    mock_exists.return_value = True
+    sim_process_file.write_text('{"msfs": 12345}')
     
     result = _get_sim_processes()
     
     assert result == {"msfs": 12345}
-    mock_exists.assert_called_once()
-    mock_file.assert_called_once()
 
 
-@patch('os.path.exists')
-def test_get_sim_processes_no_file(mock_exists):
+def test_get_sim_processes_no_file(sim_process_file):
     """Test _get_sim_processes with no file."""
-    mock_exists.return_value = False
-    
     result = _get_sim_processes()
     
     assert result == {}
-    mock_exists.assert_called_once()
 
 
-@patch('os.makedirs')
-@patch('builtins.open', new_callable=mock_open)
-@patch('json.dump')
-@patch('ai_tools.main._get_sim_processes')
-def test_save_sim_process(mock_get_processes, mock_json_dump, mock_file, mock_makedirs):
+def test_get_sim_processes_reads_file_once(sim_process_file):
+    """Test _get_sim_processes only parses the file again after it changes."""
+    sim_process_file.write_text('{"msfs": 12345}')
+    
+    with patch('ai_tools.main.json.load', wraps=json.load) as mock_load:
+        assert _get_sim_processes() == {"msfs": 12345}
+        assert _get_sim_processes() == {"msfs": 12345}
+    
+    mock_load.assert_called_once()
+
+
+def test_save_sim_process(sim_process_file):
     """Test _save_sim_process function."""
-    # Setup mock
-    mock_get_processes.return_value = {"msfs": 12345}
+    sim_process_file.write_text('{"msfs": 12345}')
     
     _save_sim_process("dummy", 54321)
     
-    # Verify the function behavior
-    mock_get_processes.assert_called_once()
-    mock_makedirs.assert_called_once()
-    mock_file.assert_called_once()
-    mock_json_dump.assert_called_once_with({"msfs": 12345, "dummy": 54321}, mock_file())
+    # The file is replaced whole and no temporary file is left behind
+    assert json.loads(sim_process_file.read_text()) == {"msfs": 12345, "dummy": 54321}
+    assert os.listdir(sim_process_file.parent) == [sim_process_file.name]
 
 
-@patch('builtins.open', new_callable=mock_open)
-@patch('json.dump')
-@patch('ai_tools.main._get_sim_processes')
-def test_remove_sim_process(mock_get_processes, mock_json_dump, mock_file):
+def test_remove_sim_process(sim_process_file):
     """Test _remove_sim_process function."""
-    # Setup mock
-    mock_get_processes.return_value = {"msfs": 12345, "dummy": 54321}
+    sim_process_file.write_text('{"msfs": 12345, "dummy": 54321}')
     
     _remove_sim_process("msfs")
     
-    # Verify the function behavior
-    mock_get_processes.assert_called_once()
-    mock_file.assert_called_once()
-    mock_json_dump.assert_called_once_with({"dummy": 54321}, mock_file())
+    assert json.loads(sim_process_file.read_text()) == {"dummy": 54321}
+    assert _get_sim_processes() == {"dummy": 54321}
 
 
-@patch('psutil.Process')
-def test_is_process_running_true(mock_process):
-    """Test _is_process_running when process is running."""
-    # Setup mock
-    process_instance = MagicMock()
-    process_instance.is_running.return_value = True
-    process_instance.status.return_value = "running"
-    mock_process.return_value = process_instance
+def test_save_sim_process_failure(sim_process_file, capsys):
+    """Test _save_sim_process reports a failed write."""
+    with patch('ai_tools.main.os.replace', side_effect=OSError("disk full")):
+        _save_sim_process("dummy", 54321)
     
-    result = _is_process_running(12345)
+    assert "Warning: Could not save process information: disk full" in capsys.readouterr().out
+    assert not sim_process_file.exists()
+
+
+def test_is_process_running_true():
+    """Test _is_process_running when process is running."""
+    assert _is_process_running(os.getpid()) is True
+
+
+@pytest.mark.parametrize("exists, status, expected", [
+    (True, "running", True),
+    (True, "zombie", False),
+    (False, None, False),
+])
+@patch('ai_tools.main.os.kill')
+def test_is_process_running_windows(mock_kill, exists, status, expected):
+    """Test _is_process_running asks psutil rather than signalling the process off POSIX."""
+    import psutil
+    
+    with patch('ai_tools.main.os.name', 'nt'), patch('psutil.Process') as mock_process:
+        if exists:
+            mock_process.return_value.is_running.return_value = True
+            mock_process.return_value.status.return_value = status
+        else:
+            mock_process.side_effect = psutil.NoSuchProcess(12345)
+        
+        assert _is_process_running(12345) is expected
     
-    assert result is True
-    mock_process.assert_called_once_with(12345)
-    process_instance.is_running.assert_called_once()
+    mock_kill.assert_not_called()
 
 
-@patch('psutil.Process', side_effect=psutil.NoSuchProcess(12345))
-def test_is_process_running_no_process(mock_process):
+@patch('ai_tools.main.os.kill', side_effect=ProcessLookupError)
+def test_is_process_running_no_process(mock_kill):
     """Test _is_process_running when process doesn't exist."""
     result = _is_process_running(12345)
     
     assert result is False
-    mock_process.assert_called_once_with(12345)
\ No newline at end of file
+    mock_kill.assert_called_once_with(12345, 0)
+
+
+@patch('ai_tools.main.os.kill', side_effect=PermissionError)
+def test_is_process_running_other_user(mock_kill):
+    """Test _is_process_running when the process belongs to another user."""
+    with patch('builtins.open', side_effect=PermissionError):
+        assert _is_process_running(1) is True
+
+
+@patch('ai_tools.main.os.kill')
+@patch('builtins.open', new_callable=mock_open, read_data=b'12345 (sim (msfs)) Z 1 12345')
+def test_is_process_running_zombie(mock_file, mock_kill):
+    """Test _is_process_running rejects a zombie process."""
+    assert _is_process_running(12345) is False
+    mock_file.assert_called_once_with("/proc/12345/stat", "rb")